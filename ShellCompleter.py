@@ -0,0 +1,120 @@
+from bisect import bisect_left
+from collections import OrderedDict
+import os
+import readline
+
+from VfsNodes import NodeType
+
+HISTORY_FILE = os.path.join(os.path.expanduser("~"), ".unix_shell_emulator_history")
+HISTORY_LENGTH = 1000
+DIR_CACHE_SIZE = 64  # Директорий, для которых хранятся отсортированные имена
+COMPLETER_DELIMS = " \t\n;|<>"  # Путь дополняется целиком, вместе с '/'
+COMMAND_SEPARATORS = ";|"
+
+
+def _prefix_range(names, prefix):
+    """Имена отсортированного списка, начинающиеся с prefix: двоичный поиск начала и проход по совпадениям"""
+    start = bisect_left(names, prefix)
+    end = start
+    while end < len(names) and names[end].startswith(prefix):
+        end += 1
+    return names[start:end]
+
+
+class ShellCompleter:
+    """Дополнение по Tab для readline: имена команд, пути VFS и хоста; история команд между сеансами
+
+    Имена директории хранятся отсортированным списком (директории - с '/' на конце), и
+    дополнение префикса - это двоичный поиск в нем. Список строится заново, только когда
+    директория изменилась: у директории VFS - время изменения поддерева или число детей,
+    у директории хоста - время изменения.
+    """
+
+    def __init__(self, shell, history_file=HISTORY_FILE):
+        self.shell = shell
+        self.history_file = history_file
+        self._dir_names = OrderedDict()  # Ключ директории -> (отметка изменения, отсортированные имена)
+        self._matches = []
+
+    def install(self):
+        """Подключает дополнение к readline и загружает историю команд"""
+        readline.set_completer(self.complete)
+        readline.set_completer_delims(COMPLETER_DELIMS)
+        if "libedit" in (readline.__doc__ or ""):
+            readline.parse_and_bind("bind ^I rl_complete")  # readline на основе libedit (macOS)
+        else:
+            readline.parse_and_bind("tab: complete")
+        readline.set_history_length(HISTORY_LENGTH)
+        try:
+            readline.read_history_file(self.history_file)
+        except OSError:
+            pass  # Первый запуск - истории еще нет
+
+    def save_history(self):
+        """Сохраняет историю команд для следующих сеансов"""
+        try:
+            readline.write_history_file(self.history_file)
+        except OSError:
+            pass
+
+    def complete(self, text, state):
+        """Функция дополнения readline: state-й вариант для text или None"""
+        if state == 0:
+            line = readline.get_line_buffer()
+            self._matches = self.matches(line[:readline.get_begidx()], text)
+        return self._matches[state] if state < len(self._matches) else None
+
+    def matches(self, before, text):
+        """Варианты дополнения text; before - часть строки перед ним"""
+        last_separator = max(before.rfind(separator) for separator in COMMAND_SEPARATORS)
+        if not before[last_separator + 1:].strip():
+            # Первое слово команды
+            return [f"{name} " for name in sorted(self.shell.commands) if name.startswith(text)]
+
+        dir_part, _, prefix = text.rpartition("/")
+        if text.startswith("/") and not dir_part:
+            dir_part = "/"
+        head = text[:len(text) - len(prefix)]
+        names = self._vfs_names(dir_part) if self.shell.in_vfs_mode else self._host_names(dir_part)
+        names = _prefix_range(names, prefix)
+        return [head + name if name.endswith("/") else f"{head}{name} " for name in names]
+
+    def _cached(self, key, stamp, build):
+        """Отсортированные имена директории из кэша; build() - если директория изменилась"""
+        cached = self._dir_names.get(key)
+        if cached is not None and cached[0] == stamp:
+            self._dir_names.move_to_end(key)
+            return cached[1]
+        names = sorted(build())
+        self._dir_names[key] = (stamp, names)
+        if len(self._dir_names) > DIR_CACHE_SIZE:
+            self._dir_names.popitem(last=False)
+        return names
+
+    def _vfs_names(self, dir_path):
+        """Отсортированные имена директории VFS"""
+        found = self.shell.vfs.stat(dir_path or ".")
+        if found is None or found[1].type is not NodeType.DIRECTORY:
+            return []
+        abs_path, node = found
+        children = node.children
+        # Изменение содержимого директории обновляет ее время изменения (и число детей)
+        stamp = (node, node.modified, len(children))
+        return self._cached(("vfs", abs_path), stamp, lambda: (
+            f"{name}/" if child.type is NodeType.DIRECTORY else name for name, child in children.items()))
+
+    def _host_names(self, dir_path):
+        """Отсортированные имена директории хоста"""
+        path = os.path.join(self.shell.current_dir, os.path.expanduser(dir_path) or ".")
+        try:
+            stamp = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+
+        def scan():
+            try:
+                with os.scandir(path) as entries:
+                    return [f"{entry.name}/" if entry.is_dir() else entry.name for entry in entries]
+            except OSError:
+                return []
+        return self._cached(("host", os.path.abspath(path)), stamp, scan)
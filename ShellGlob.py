@@ -0,0 +1,154 @@
+from functools import lru_cache
+import fnmatch
+import os
+import re
+
+from ShellParser import GLOB_CHARS
+from VfsNodes import NodeType
+
+
+@lru_cache(maxsize=1024)
+def compile_segment(segment):
+    """Компилирует шаблон одного компонента пути в функцию сопоставления имени (один раз на шаблон)"""
+    return re.compile(fnmatch.translate(segment)).match
+
+
+def has_magic(segment):
+    """Есть ли в компоненте пути символы glob"""
+    return not GLOB_CHARS.isdisjoint(segment)
+
+
+def _join(path, name):
+    """Соединяет путь результата с именем: пустой путь - текущая директория"""
+    if not path:
+        return name
+    return f"{path}{name}" if path.endswith("/") else f"{path}/{name}"
+
+
+class VfsGlobSource:
+    """Директории VFS для раскрытия шаблонов: дескриптор - узел дерева"""
+
+    def __init__(self, vfs):
+        self.vfs = vfs
+
+    def resolve(self, path):
+        """Узел по литеральному префиксу шаблона (одно обращение к плоскому индексу) или None"""
+        found = self.vfs.stat(path or ".")
+        return None if found is None else found[1]
+
+    def entries(self, node):
+        """Пары (имя, дескриптор) содержимого директории"""
+        return node.children.items()
+
+    def is_dir(self, node, follow_links=True):
+        """Является ли узел директорией"""
+        return node.type is NodeType.DIRECTORY
+
+    def child(self, node, name):
+        """Дескриптор дочерней записи или None, если ее нет"""
+        return node.children.get(name)
+
+
+class HostGlobSource:
+    """Директории хоста для раскрытия шаблонов: дескриптор - путь или DirEntry (тип без отдельного stat)"""
+
+    def __init__(self, current_dir):
+        self.current_dir = current_dir
+
+    def resolve(self, path):
+        """Путь хоста по литеральному префиксу шаблона или None, если его нет"""
+        host_path = os.path.join(self.current_dir, path)
+        return host_path if os.path.lexists(host_path) else None
+
+    def entries(self, handle):
+        """Пары (имя, дескриптор) содержимого директории"""
+        try:
+            with os.scandir(handle) as entries:
+                return [(entry.name, entry) for entry in entries]
+        except OSError:
+            return ()
+
+    def is_dir(self, handle, follow_links=True):
+        """Является ли запись директорией; follow_links=False - ссылки не считаются (обход ** не зацикливается)"""
+        if isinstance(handle, os.DirEntry):
+            return handle.is_dir(follow_symlinks=follow_links)
+        return os.path.isdir(handle) if follow_links else not os.path.islink(handle) and os.path.isdir(handle)
+
+    def child(self, handle, name):
+        """Дескриптор дочерней записи или None, если ее нет"""
+        child = os.path.join(handle, name)
+        return child if os.path.lexists(child) else None
+
+
+def expand_glob(pattern, source):
+    """Раскрывает шаблон пути (*, ?, [...], ** - любое число директорий) в отсортированный список путей
+
+    Литеральный префикс шаблона разрешается сразу, остальные компоненты сопоставляются
+    с содержимым только тех директорий, до которых дошло сопоставление. Имена, начинающиеся
+    с '.', совпадают только с компонентом, который тоже начинается с '.'.
+    """
+    segments = [segment for segment in pattern.split("/") if segment]
+    prefix = "/" if pattern.startswith("/") else ""
+    dirs_only = pattern.endswith("/")  # "*/" - только директории
+
+    literal = 0
+    while literal < len(segments) and not has_magic(segments[literal]):
+        literal += 1
+    for segment in segments[:literal]:
+        prefix = _join(prefix, segment)
+    root = source.resolve(prefix)
+    if root is None or not source.is_dir(root):
+        return []
+
+    is_dir = source.is_dir
+    directories = [(prefix, root)]  # Директории, в которых сопоставляется следующий компонент
+    matches = []
+    last = len(segments) - 1
+    for number in range(literal, len(segments)):
+        segment = segments[number]
+        final = number == last
+        found = []
+        if segment == "**":
+            # Сама директория и все поддиректории; последний ** - все записи поддерева
+            for path, handle in directories:
+                if not final:
+                    found.append((path, handle))
+                found.extend(_descendants(source, path, handle, final))
+        elif has_magic(segment):
+            match = compile_segment(segment)
+            show_hidden = segment.startswith(".")
+            for path, handle in directories:
+                for name, child in source.entries(handle):
+                    if match(name) and (show_hidden or name[0] != ".") and (final or is_dir(child)):
+                        found.append((_join(path, name), child))
+        else:
+            for path, handle in directories:
+                child = source.child(handle, segment)
+                if child is not None and (final or is_dir(child)):
+                    found.append((_join(path, segment), child))
+        if final:
+            matches = found
+        else:
+            directories = found
+
+    # Несколько ** могут прийти к одному пути разными способами
+    if dirs_only:
+        return sorted({_join(path, "") for path, handle in matches if is_dir(handle)})
+    return sorted({path for path, _ in matches})
+
+
+def _descendants(source, path, handle, include_files):
+    """Записи поддерева директории (без скрытых): только директории или все записи"""
+    is_dir = source.is_dir
+    stack = [(path, handle)]
+    while stack:
+        dir_path, dir_handle = stack.pop()
+        for name, child in source.entries(dir_handle):
+            if name[0] == ".":
+                continue
+            if is_dir(child, False):
+                child_path = _join(dir_path, name)
+                stack.append((child_path, child))
+                yield child_path, child
+            elif include_files:
+                yield _join(dir_path, name), child
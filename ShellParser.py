@@ -0,0 +1,146 @@
+class Operator(str):
+    """Оператор командной строки: '|', '>', '>>', '<' или ';'"""
+
+
+class Pattern(str):
+    """Слово с неэкранированными символами glob (*, ?, [...]), раскрываемое в пути при выполнении
+
+    Значение строки - само слово: оно передается команде, если совпадений нет. В pattern символы
+    glob из кавычек и экранирования заключены в [], чтобы совпадать буквально.
+    """
+
+    def __new__(cls, text, pattern):
+        word = super().__new__(cls, text)
+        word.pattern = pattern
+        return word
+
+
+SPECIAL_CHARS = frozenset('\'"\\|<>;')
+GLOB_CHARS = frozenset('*?[')
+GLOB_ESCAPES = str.maketrans({'*': '[*]', '?': '[?]', '[': '[[]'})
+
+
+class Command:
+    """Простая команда конвейера с перенаправлениями"""
+    __slots__ = ("name", "args", "stdin_path", "stdout_path", "append")
+
+    def __init__(self, name, args, stdin_path=None, stdout_path=None, append=False):
+        self.name = name
+        self.args = args
+        self.stdin_path = stdin_path    # < файл
+        self.stdout_path = stdout_path  # > файл или >> файл
+        self.append = append
+
+
+def tokenize(line):
+    """Разбивает строку на слова и операторы с учетом кавычек и экранирования"""
+    tokens = []
+    word = []
+    pattern = []  # То же слово с экранированными для glob символами из кавычек
+    in_word = False
+    magic = False  # В слове есть неэкранированные символы glob
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if char == "'":
+            end = line.find("'", i + 1)
+            if end < 0:
+                raise ValueError("незакрытая кавычка '")
+            word.append(line[i + 1:end])
+            pattern.append(word[-1].translate(GLOB_ESCAPES))
+            in_word = True
+            i = end + 1
+        elif char == '"':
+            i += 1
+            start = len(word)
+            while i < len(line) and line[i] != '"':
+                if line[i] == '\\' and i + 1 < len(line) and line[i + 1] in '"\\':
+                    i += 1
+                word.append(line[i])
+                i += 1
+            if i >= len(line):
+                raise ValueError('незакрытая кавычка "')
+            pattern.append(''.join(word[start:]).translate(GLOB_ESCAPES))
+            in_word = True
+            i += 1
+        elif char == '\\' and i + 1 < len(line):
+            word.append(line[i + 1])
+            pattern.append(line[i + 1].translate(GLOB_ESCAPES))
+            in_word = True
+            i += 2
+        elif char.isspace() or char in '|><;':
+            if in_word:
+                tokens.append(Pattern(''.join(word), ''.join(pattern)) if magic else ''.join(word))
+                word = []
+                pattern = []
+                in_word = False
+                magic = False
+            if not char.isspace():
+                operator = '>>' if line.startswith('>>', i) else char
+                tokens.append(Operator(operator))
+                i += len(operator)
+            else:
+                i += 1
+        else:
+            word.append(char)
+            pattern.append(char)
+            in_word = True
+            magic = magic or char in GLOB_CHARS
+            i += 1
+
+    if in_word:
+        tokens.append(Pattern(''.join(word), ''.join(pattern)) if magic else ''.join(word))
+    return tokens
+
+
+def parse(line):
+    """Разбирает строку в список конвейеров; конвейер - список Command"""
+    if SPECIAL_CHARS.isdisjoint(line):
+        # Быстрый путь: простая команда без кавычек и операторов
+        words = line.split()
+        if not GLOB_CHARS.isdisjoint(line):
+            words = [word if GLOB_CHARS.isdisjoint(word) else Pattern(word, word) for word in words]
+        return [[Command(words[0], words[1:])]] if words else []
+
+    pipelines = []
+    pipeline = []
+    words = []
+    redirects = {}
+    tokens = tokenize(line)
+
+    def finish_command(operator):
+        if not words:
+            if redirects or pipeline or operator == '|':
+                raise ValueError(f"синтаксическая ошибка рядом с '{operator}'")
+            return
+        pipeline.append(Command(words[0], words[1:], redirects.get('<'),
+                                redirects.get('>') or redirects.get('>>'), '>>' in redirects))
+        words.clear()
+        redirects.clear()
+
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if not isinstance(token, Operator):
+            words.append(token)
+        elif token in ('>', '>>', '<'):
+            if i + 1 >= len(tokens) or isinstance(tokens[i + 1], Operator):
+                raise ValueError(f"синтаксическая ошибка рядом с '{token}'")
+            if token != '<':
+                redirects.pop('>', None)
+                redirects.pop('>>', None)
+            redirects[token] = tokens[i + 1]
+            i += 1
+        elif token == '|':
+            finish_command(token)
+        else:  # ';'
+            finish_command(token)
+            if pipeline:
+                pipelines.append(pipeline)
+                pipeline = []
+        i += 1
+
+    finish_command('|' if pipeline and not words else ';')
+    if pipeline:
+        pipelines.append(pipeline)
+    return pipelines
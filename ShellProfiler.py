@@ -0,0 +1,172 @@
+import math
+import time
+
+
+def percentile(sorted_values, fraction):
+    """Процентиль отсортированного списка методом ближайшего ранга"""
+    if not sorted_values:
+        return 0
+    rank = max(1, math.ceil(len(sorted_values) * fraction))
+    return sorted_values[rank - 1]
+
+
+class CommandStats:
+    """Накопленные замеры одной команды"""
+    __slots__ = ("wall", "cpu", "lookups", "normalizations")
+
+    def __init__(self):
+        self.wall = []  # Время каждого вызова, нс
+        self.cpu = 0
+        self.lookups = 0
+        self.normalizations = 0
+
+
+_counted_classes = {}  # Класс VFS -> его подкласс со счетчиками
+
+
+def _counted_class(cls):
+    """Подкласс VFS, считающий разрешения путей в профилировщике self._profiler
+
+    Поиск - каждое разрешение пути в узел: вызов _node и попадание _lookup или stat в плоский индекс
+    (промах в индекс доходит до _node). Разбор - вызовы _normalize: путь, найденный в индексе как есть,
+    не разбирается.
+    """
+    if cls in _counted_classes.values():
+        return cls  # Экземпляр уже со счетчиками
+    counted = _counted_classes.get(cls)
+    if counted is None:
+        def _node(self, abs_path):
+            self._profiler.lookups += 1
+            return cls._node(self, abs_path)
+
+        def _lookup(self, path):
+            if path in self._index:
+                self._profiler.lookups += 1
+            return cls._lookup(self, path)
+
+        def stat(self, path):
+            if path in self._index:
+                self._profiler.lookups += 1
+            return cls.stat(self, path)
+
+        def _normalize(self, path):
+            self._profiler.normalizations += 1
+            return cls._normalize(self, path)
+
+        counted = _counted_classes[cls] = type(f"Counted{cls.__name__}", (cls,),
+                                               {"_node": _node, "_lookup": _lookup, "stat": stat,
+                                                "_normalize": _normalize})
+    return counted
+
+
+class CommandProfiler:
+    """Профилировщик команд: время (wall/CPU), число вызовов и разрешений путей VFS
+
+    cprofile_path и tracemalloc_path включают запись профиля cProfile и снимка памяти tracemalloc при завершении.
+    """
+
+    def __init__(self, cprofile_path=None, tracemalloc_path=None):
+        self.commands = {}
+        self.lookups = 0         # Разрешения путей VFS в узлы (см. _counted_class)
+        self.normalizations = 0  # Вызовы VirtualFileSystem._normalize (разбор пути)
+        self._assigned = [0, 0, 0, 0]  # Собственные замеры всех завершенных шагов команд (см. track)
+        self.cprofile_path = cprofile_path
+        self.tracemalloc_path = tracemalloc_path
+        self._cprofile = None
+
+        if cprofile_path:
+            import cProfile
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        if tracemalloc_path:
+            import tracemalloc
+            tracemalloc.start()
+
+    def instrument_vfs(self, vfs):
+        """Переводит экземпляр VFS на подкласс со счетчиками разрешения путей
+
+        Счетчики - методы класса, а не обертки на экземпляре: ответвление VFS (copy.copy) сохраняет
+        класс и считает обращения к собственному дереву. VFS без профилировщика не замедляется.
+        """
+        vfs.__class__ = _counted_class(type(vfs))
+        vfs._profiler = self
+
+    def _sample(self):
+        """Текущие значения замеряемых величин: wall, CPU, поиск, разбор"""
+        return time.perf_counter_ns(), time.process_time_ns(), self.lookups, self.normalizations
+
+    def track(self, command, chunks):
+        """Оборачивает генератор вывода команды замером того, что происходит внутри него
+
+        Замеряются только шаги генератора: работа потребителя вывода (следующей стадии конвейера,
+        записи в файл) не учитывается, а шаги вложенных замеряемых генераторов (предыдущей стадии,
+        читаемой как stdin) вычитаются - в cat f | grep x у каждой команды только ее собственное время.
+        """
+        stats = self.commands.get(command)
+        if stats is None:
+            stats = self.commands[command] = CommandStats()
+
+        own = [0, 0, 0, 0]
+        assigned = self._assigned
+        try:
+            while True:
+                before = assigned[:]
+                start = self._sample()
+                try:
+                    chunk = next(chunks)
+                except StopIteration as stop:
+                    return stop.value
+                finally:
+                    for i, end in enumerate(self._sample()):
+                        elapsed = end - start[i]
+                        own[i] += elapsed - (assigned[i] - before[i])  # Без вложенных шагов
+                        assigned[i] = before[i] + elapsed
+                yield chunk
+        finally:
+            chunks.close()
+            stats.wall.append(own[0])
+            stats.cpu += own[1]
+            stats.lookups += own[2]
+            stats.normalizations += own[3]
+
+    def reset(self):
+        """Сбрасывает накопленные замеры"""
+        self.commands.clear()
+
+    def report(self):
+        """Таблица замеров по командам: строки текста"""
+        # Команды без завершенных вызовов (например, сам stats) не выводятся
+        measured = [(command, stats) for command, stats in self.commands.items() if stats.wall]
+        if not measured:
+            return ["Нет замеров\n"]
+
+        lines = [f"{'команда':<10} {'вызовов':>8} {'всего, мс':>11} {'p50, мс':>9} {'p99, мс':>9} "
+                 f"{'CPU, мс':>9} {'поиск':>8} {'разбор':>8}\n"]
+        for command, stats in sorted(measured, key=lambda item: -sum(item[1].wall)):
+            wall = sorted(stats.wall)
+            lines.append(f"{command:<10} {len(wall):>8} {sum(wall) / 1e6:>11.3f} {percentile(wall, 0.5) / 1e6:>9.3f} "
+                         f"{percentile(wall, 0.99) / 1e6:>9.3f} {stats.cpu / 1e6:>9.3f} "
+                         f"{stats.lookups:>8} {stats.normalizations:>8}\n")
+        return lines
+
+    def finish(self):
+        """Записывает профиль cProfile и снимок tracemalloc в файлы; возвращает сообщения"""
+        messages = []
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self.cprofile_path)
+            self._cprofile = None
+            messages.append(f"Профиль cProfile записан в {self.cprofile_path}\n")
+
+        if self.tracemalloc_path:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                with open(self.tracemalloc_path, 'w', encoding='utf-8') as f:
+                    f.write(f"Текущая память: {current} байт, пик: {peak} байт\n")
+                    for stat in snapshot.statistics('lineno')[:50]:
+                        f.write(f"{stat}\n")
+                messages.append(f"Снимок tracemalloc записан в {self.tracemalloc_path}\n")
+        return messages
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import stat
+
+from ShellParser import parse
+from UnixShellEmulator import UnixShellEmulator
+from VirtualFileSystem import VirtualFileSystem
+
+DEFAULT_HOST = "127.0.0.1"
+BACKLOG = 1024  # Очередь подключений: сотни сеансов подключаются одновременно
+SOCKET_MODE = 0o600  # Unix-сокет доступен только владельцу сервера
+
+
+class SessionOutput:
+    """Поток вывода сеанса: текст кодируется и передается в буфер сокета без ожидания"""
+
+    def __init__(self, writer):
+        self._writer = writer
+
+    def write(self, text):
+        self._writer.write(text.encode('utf-8'))
+
+    def flush(self):
+        pass
+
+
+class ShellSession:
+    """Сеанс сервера: свой эмулятор и своя текущая директория в общей VFS
+
+    Подключения не аутентифицируются, поэтому сеанс работает только с VFS: файлы хоста
+    (режим хоста, перенаправления в файлы хоста, vfs convert) ему недоступны.
+    """
+
+    def __init__(self, vfs, lock, writer):
+        self.vfs = vfs
+        self.lock = lock  # Блокировка общей VFS: ее держит сеанс, команда которого сейчас выполняется
+        self.writer = writer
+        self.out = SessionOutput(writer)
+        self.shell = UnixShellEmulator(vfs_path=vfs.vfs_path, out=self.out, vfs=vfs, host_access=False)
+        self.vfs_dir = "/"
+        self.holding = False  # Держит ли сеанс блокировку (ее нет после отмены посреди ожидания)
+        self.closed = False
+
+    async def execute(self, line):
+        """Выполняет строку команд и выводит приглашение; команда exit закрывает сеанс
+
+        VFS используется только под блокировкой. Между частями вывода команда отпускает ее и
+        передает управление циклу событий (при полном буфере сокета - до его опустошения), поэтому
+        сеансы перемежаются целыми шагами команд, а вывод не копится в памяти сервера.
+        """
+        await self._acquire()
+        try:
+            if line is not None:
+                await self._run_line(line)
+            self.out.write(self.shell.get_prompt())
+        except SystemExit:
+            self.closed = True
+        finally:
+            self._release()
+
+    async def _run_line(self, line):
+        """UnixShellEmulator.run_line с передачей вывода по частям"""
+        try:
+            pipelines = parse(line)
+        except ValueError as e:
+            self.out.write(f"Ошибка парсинга: {e}\n")
+            return
+        try:
+            for pipeline in pipelines:
+                chunks, _ = self.shell.open_pipeline(pipeline, self.out)
+                if chunks is not None:
+                    await self._send(chunks)
+        finally:
+            self.vfs.commit()
+
+    async def _send(self, chunks):
+        """Передает вывод команды по частям, отпуская VFS другим сеансам после каждой части"""
+        try:
+            for chunk in chunks:
+                self.out.write(chunk)
+                self._release()
+                await self.writer.drain()  # При полном буфере сокета - до его опустошения; разрыв - ConnectionError
+                await asyncio.sleep(0)
+                await self._acquire()
+        finally:
+            chunks.close()
+
+    async def _acquire(self):
+        """Захватывает общую VFS и восстанавливает в ней состояние сеанса: текущую директорию и поток сообщений"""
+        await self.lock.acquire()
+        self.holding = True
+        if not self.vfs.change_directory(self.vfs_dir):
+            self.vfs.change_directory("/")  # Директорию удалили или архив перечитан другим сеансом
+        self.vfs.out = self.out
+
+    def _release(self):
+        """Запоминает текущую директорию сеанса и отпускает общую VFS, если сеанс ее держит"""
+        if self.holding:
+            self.vfs_dir = self.vfs.current_vfs_dir
+            self.holding = False
+            self.lock.release()
+
+
+class ShellServer:
+    """Asyncio-сервер сеансов эмулятора над одной загруженной VFS"""
+
+    def __init__(self, vfs_path=None, lazy_vfs=False, vfs_workers=1, vfs_index=False, vfs_journal=False,
+                 autosave=False):
+        self.vfs = VirtualFileSystem(vfs_path, lazy=lazy_vfs, workers=vfs_workers, search_index=vfs_index,
+                                     journal=vfs_journal)
+        self.autosave = autosave
+        self.lock = asyncio.Lock()
+
+    async def handle(self, reader, writer):
+        """Обслуживает одно подключение: строки команд до exit или закрытия сокета"""
+        session = ShellSession(self.vfs, self.lock, writer)
+        try:
+            await session.execute(None)
+            while not session.closed:
+                line = await reader.readline()
+                if not line:
+                    break
+                await session.execute(line.decode('utf-8', errors='replace').rstrip('\r\n'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except asyncio.CancelledError:
+            # Сервер останавливается: вывод, который клиент не читает, не ждем, а сеанс завершаем
+            # без исключения (иначе asyncio.streams выводит его трассировку)
+            writer.transport.abort()
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def serve(self, address):
+        """Принимает подключения по адресу: путь Unix-сокета (содержит '/') или [хост:]порт"""
+        if "/" in address:
+            try:
+                mode = os.lstat(address).st_mode
+            except FileNotFoundError:
+                mode = None
+            if mode is not None:
+                if not stat.S_ISSOCK(mode):
+                    raise FileExistsError(f"{address}: файл существует и не является сокетом")
+                os.unlink(address)  # Сокет, оставшийся от прежнего запуска
+            umask = os.umask(0o777 & ~SOCKET_MODE)  # Права задаются при создании сокета, без окна до chmod
+            try:
+                server = await asyncio.start_unix_server(self.handle, address, backlog=BACKLOG)
+            finally:
+                os.umask(umask)
+        else:
+            host, _, port = address.rpartition(":")
+            server = await asyncio.start_server(self.handle, host or DEFAULT_HOST, int(port),
+                                                backlog=BACKLOG)
+
+        listening = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Сервер эмулятора слушает {listening}", flush=True)
+        async with server:
+            await server.serve_forever()
+
+    def run(self, address):
+        """Запускает сервер до прерывания; при автосохранении сохраняет изменения VFS; возвращает код завершения"""
+        try:
+            asyncio.run(self.serve(address))
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            print(f"Ошибка сервера: {e}")
+            return 1
+        finally:
+            if self.autosave and self.vfs.has_changes():
+                success, message = self.vfs.sync()
+                print(f"Автосохранение VFS: {message}")
+        return 0
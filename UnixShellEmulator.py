@@ -1,24 +1,166 @@
+import codecs
+from functools import cached_property
 import os
-import socket
+import sys
+import time
 
-from IPython.core.display_functions import display
+from ShellParser import Command, Pattern, parse, tokenize
+from VfsNodes import NodeType, ns_to_display, ns_to_iso
 
-from VirtualFileSystem import VirtualFileSystem
+CAT_CHUNK_SIZE = 64 * 1024
+LS_WORKERS = 16  # Потоков ls -R на хосте: обход сетевых ФС упирается в задержку, а не в CPU
+LS_STAT_OPTIONS = frozenset("ltS")  # Флаги ls, которым нужен stat каждой записи
+SIZE_UNITS = {'c': 1, 'k': 1024, 'M': 1024 * 1024}  # Суффиксы размера для find -size
+
+
+def iter_line_blocks(chunks):
+    """Разбивает поток частей текста на списки целых строк (без '\\n'); в буфере только незавершенная строка"""
+    pending = []
+    for chunk in chunks:
+        end = chunk.rfind("\n") + 1
+        if not end:
+            pending.append(chunk)
+            continue
+        if pending:
+            pending.append(chunk[:end])
+            text = "".join(pending)
+            pending = []
+        else:
+            text = chunk[:end]
+        if end < len(chunk):
+            pending.append(chunk[end:])
+        yield text[:-1].split("\n")
+    if pending:
+        yield ["".join(pending)]
+
+
+def parse_size_test(value):
+    """Разбирает аргумент find -size ([+|-]N[c|k|M]) в функцию проверки размера в байтах"""
+    sign = value[:1] if value[:1] in "+-" else ""
+    number = value[len(sign):]
+    unit = SIZE_UNITS.get(number[-1:])
+    if unit is not None:
+        number = number[:-1]
+    if not number.isdigit():
+        return None
+    limit = int(number) * (unit or 1)
+    if sign == "+":
+        return lambda size: size > limit
+    if sign == "-":
+        return lambda size: size < limit
+    return lambda size: size == limit
+
+
+def format_size(size):
+    """Размер в удобном для чтения виде: 512, 1.5K, 20M"""
+    for unit in ("", "K", "M", "G"):
+        if size < 1024 or unit == "G":
+            return f"{size}{unit}" if isinstance(size, int) else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def format_long_line(kind, size, modified_ns, name):
+    """Строка ls -l: тип (d, l или -), размер, время изменения и имя"""
+    return f"{kind} {size:>10} {ns_to_display(modified_ns)} {name}\n"
+
+
+def format_long_entry(name, node):
+    """Строка ls -l для узла VFS: размер директории - суммарный размер поддерева"""
+    if node.type is NodeType.DIRECTORY:
+        return format_long_line("d", node.total_size, node.modified, f"\033[93m{name}/\033[0m")
+    return format_long_line("-", node.size, node.modified, name)
+
+
+def scan_host_directory(path, options):
+    """Читает директорию хоста через os.scandir и сортирует записи по флагам ls
+
+    Тип записи берется из DirEntry без отдельного stat; stat (для -l, -t, -S) запрашивается здесь же,
+    чтобы при ls -R он выполнялся в потоке пула. Возвращает список DirEntry.
+    """
+    show_hidden = 'a' in options
+    with os.scandir(path) as entries:
+        entries = [entry for entry in entries if show_hidden or not entry.name.startswith('.')]
+    if not LS_STAT_OPTIONS.isdisjoint(options):
+        for entry in entries:
+            entry.stat(follow_symlinks=False)  # DirEntry кэширует результат
+
+    if 'U' in options:
+        return entries  # Порядок каталога, без сортировки
+    entries.sort(key=lambda entry: entry.name)
+    if 't' in options:
+        entries.sort(key=lambda entry: entry.stat(follow_symlinks=False).st_mtime_ns, reverse=True)
+    elif 'S' in options:
+        entries.sort(key=lambda entry: entry.stat(follow_symlinks=False).st_size, reverse=True)
+    if 'r' in options:
+        entries.reverse()
+    return entries
+
+
+def format_host_entry(entry, long_format):
+    """Строка ls для записи DirEntry директории хоста"""
+    name = f"\033[93m{entry.name}/\033[0m" if entry.is_dir() else entry.name
+    if not long_format:
+        return f"{name}\n"
+    stat = entry.stat(follow_symlinks=False)
+    kind = "l" if entry.is_symlink() else "d" if entry.is_dir(follow_symlinks=False) else "-"
+    return format_long_line(kind, stat.st_size, stat.st_mtime_ns, name)
+
+
+def iter_lines(chunks):
+    """Разбивает поток частей текста на строки с '\\n'"""
+    for block in iter_line_blocks(chunks):
+        for line in block:
+            yield line + "\n"
 
 
 class UnixShellEmulator:
-    def __init__(self, vfs_path=None, startup_script=None):
+    def __init__(self, vfs_path=None, startup_script=None, lazy_vfs=False, autosave=False, vfs_workers=1,
+                 vfs_index=False, vfs_journal=False, out=None, profiler=None, vfs=None, host_access=True):
+        self.out = out or sys.stdout  # Поток вывода команд
         self.current_dir = os.getcwd()
         self.username = os.getenv('USER') or os.getenv('USERNAME') or 'user'
-        self.hostname = socket.gethostname()
         self.vfs_path = vfs_path
         self.startup_script = startup_script
 
-        # Инициализируем VFS
-        self.vfs = VirtualFileSystem(vfs_path)
-        self.in_vfs_mode = False
+        # VFS создается при первом обращении: одноразовым скриптам без VFS она не нужна
+        self._vfs_options = {'lazy': lazy_vfs, 'workers': vfs_workers, 'search_index': vfs_index,
+                             'journal': vfs_journal}
+        if vfs is not None:
+            self.vfs = vfs  # Общая VFS нескольких сеансов (режим сервера)
+        # Без доступа к хосту (сеансы сервера) эмулятор работает только с VFS
+        self.host_access = host_access
+        self.in_vfs_mode = not host_access
+        self.autosave = autosave
+
+        # Профилировщик подменяет диспетчеризацию команд; без него вызов команд ничем не замедляется
+        self.profiler = profiler
+        if profiler is not None:
+            self.iter_command = self._profiled_command
+
+    @cached_property
+    def hostname(self):
+        """Имя хоста; модуль socket загружается только при первом обращении"""
+        import socket
+        return socket.gethostname()
+
+    @cached_property
+    def vfs(self):
+        """Виртуальная файловая система; архив загружается при первом обращении"""
+        from VirtualFileSystem import VirtualFileSystem
+        vfs = VirtualFileSystem(self.vfs_path, out=self.out, **self._vfs_options)
+        if self.profiler is not None:
+            self.profiler.instrument_vfs(vfs)
+        return vfs
+
+    @property
+    def vfs_loaded(self):
+        """Создана ли уже VFS"""
+        return 'vfs' in self.__dict__
 
-        self.commands = {
+    @cached_property
+    def commands(self):
+        """Таблица команд: имя -> метод; строится при первом выполнении команды"""
+        return {
             'ls': self.cmd_ls,
             'cd': self.cmd_cd,
             'exit': self.cmd_exit,
@@ -30,6 +172,18 @@ class UnixShellEmulator:
             'cat': self.cmd_cat,
             'touch': self.cmd_touch,
             'rm': self.cmd_rm,
+            'cp': self.cmd_cp,
+            'mv': self.cmd_mv,
+            'mkdir': self.cmd_mkdir,
+            'rmdir': self.cmd_rmdir,
+            'grep': self.cmd_grep,
+            'find': self.cmd_find,
+            'du': self.cmd_du,
+            'stat': self.cmd_stat,
+            'head': self.cmd_head,
+            'wc': self.cmd_wc,
+            'time': self.cmd_time,
+            'stats': self.cmd_stats,
         }
 
     def get_prompt(self):
@@ -50,60 +204,156 @@ class UnixShellEmulator:
         return f"{self.username}@{self.hostname}:{display_dir}$ "
 
     def parse_input(self, user_input):
-        """Парсит ввод пользователя на команду и аргументы"""
+        """Парсит ввод пользователя на команду и аргументы (без конвейеров и перенаправлений)"""
         try:
-            parts = user_input.strip().split()
+            parts = tokenize(user_input.strip())
             if not parts or not parts[0]:
                 return None, []
             command = parts[0]
             args = parts[1:]
             return command, args
         except Exception as e:
-            print(f"Ошибка парсинга: {e}")
+            print(f"Ошибка парсинга: {e}", file=self.out)
             return None, []
 
-    def cmd_ls(self, args):
-        """Команда ls - вывод информации о файлах"""
+    def cmd_ls(self, args, stdin=None):
+        """Команда ls - вывод информации о файлах
+
+        Как в GNU ls: сначала ошибки недоступных путей, затем файлы-операнды по именам, затем
+        содержимое директорий (при нескольких операндах - с заголовком пути).
+        """
+        flags = [arg for arg in args if arg.startswith('-') and len(arg) > 1]
+        options = set("".join(flag[1:] for flag in flags))
+        operands = [arg for arg in args if arg not in flags] or ["."]
+        if len(operands) == 1:
+            # Один операнд - без заголовков и разбора на группы
+            found = self._ls_stat(operands[0])
+            if found is None:
+                yield f"ls: невозможно получить доступ к '{operands[0]}': Нет такого файла или каталога\n"
+                return 1
+            return (yield from self._ls_operand(operands[0], found[1], options))
+
+        status = 0
+        files, dirs = [], []
+        for path in operands:
+            found = self._ls_stat(path)
+            if found is None:
+                yield f"ls: невозможно получить доступ к '{path}': Нет такого файла или каталога\n"
+                status = 1
+            else:
+                is_dir, node = found
+                (dirs if is_dir else files).append((path, node))
+
+        for path, node in files:
+            status = (yield from self._ls_operand(path, node, options)) or status
+        for number, (path, node) in enumerate(dirs):
+            if number or files:
+                yield "\n"
+            if len(operands) > 1 and 'R' not in options:
+                yield f"{path}:\n"  # ls -R выводит заголовки директорий сам
+            status = (yield from self._ls_operand(path, node, options)) or status
+        return status
+
+    def _ls_stat(self, path):
+        """Операнд ls: (директория ли, узел VFS или None на хосте) или None, если пути нет"""
         if self.in_vfs_mode:
-            path = args[0] if args else "."
-            items = self.vfs.list_directory(path)
-            if items is None:
-                print(f"ls: невозможно получить доступ к '{path}': Нет такого файла или каталога")
-                return
+            found = self.vfs.stat(path)
+            return None if found is None else (found[1].type is NodeType.DIRECTORY, found[1])
+        target = os.path.join(self.current_dir, path)
+        if os.path.isdir(target):
+            return True, None
+        return (False, None) if os.path.lexists(target) else None
 
-            for name, item_type in items:
-                if item_type == "directory":
-                    print(f"\033[93m{name}/\033[0m")
-                else:
-                    print(name)
+    def _ls_operand(self, path, node, options):
+        """ls одного операнда: в режиме VFS - по уже найденному узлу, на хосте - по пути"""
+        if not self.in_vfs_mode:
+            return (yield from self._ls_host(path, options))
+
+        if node.type is NodeType.FILE:
+            yield format_long_entry(path, node) if 'l' in options else f"{path}\n"
+            return
+
+        if 'R' in options:
+            directories = ((dir_path, dir_node.children.items())
+                           for dir_path, dir_node in self.vfs.iter_directories(path))
         else:
-            target_dir = self.current_dir
-            if args:
-                target_dir = os.path.join(self.current_dir, args[0])
+            directories = [(None, node.children.items())]
 
-            try:
-                if not os.path.exists(target_dir):
-                    print(f"ls: невозможно получить доступ к '{args[0]}': Нет такого файла или каталога")
-                    return
-
-                if os.path.isfile(target_dir):
-                    print(args[0])
-                    return
-
-                items = os.listdir(target_dir)
-                for item in items:
-                    item_path = os.path.join(target_dir, item)
-                    if os.path.isdir(item_path):
-                        print(f"\033[93m{item}/\033[0m")
-                    else:
-                        print(item)
-
-            except PermissionError:
-                print(f"ls: невозможно открыть каталог '{args[0] if args else '.'}': Отказано в доступе")
-            except Exception as e:
-                print(f"ls: ошибка: {e}")
+        for number, (dir_path, entries) in enumerate(directories):
+            if dir_path is not None:
+                # ls -R: заголовок с путем перед содержимым каждой директории
+                yield f"\n{dir_path}:\n" if number else f"{dir_path}:\n"
+            if 'l' in options:
+                yield "".join(format_long_entry(name, node) for name, node in entries)
+            else:
+                yield "".join(f"\033[93m{name}/\033[0m\n" if node.type is NodeType.DIRECTORY else f"{name}\n"
+                              for name, node in entries)
 
-    def cmd_cd(self, args):
+    def _ls_host(self, path, options):
+        """ls вне режима VFS: os.scandir без stat каждой записи; -R читает поддеревья в пуле потоков"""
+        target_dir = os.path.join(self.current_dir, path)
+        long_format = 'l' in options
+        try:
+            if not os.path.isdir(target_dir):
+                if not os.path.lexists(target_dir):
+                    yield f"ls: невозможно получить доступ к '{path}': Нет такого файла или каталога\n"
+                    return 1
+                if long_format:
+                    stat = os.lstat(target_dir)
+                    yield format_long_line("-", stat.st_size, stat.st_mtime_ns, path)
+                else:
+                    yield f"{path}\n"
+                return
+
+            if 'R' not in options:
+                entries = scan_host_directory(target_dir, options)
+                yield "".join(format_host_entry(entry, long_format) for entry in entries)
+                return
+        except PermissionError:
+            yield f"ls: невозможно открыть каталог '{path}': Отказано в доступе\n"
+            return 1
+        except Exception as e:
+            yield f"ls: ошибка: {e}\n"
+            return 1
+
+        # ls -R: директории читаются в пуле заранее, по мере того как становятся известны,
+        # а выводятся в прямом порядке обхода - вывод не зависит от порядка завершения потоков
+        from concurrent.futures import ThreadPoolExecutor  # Заметно замедляет импорт модуля
+        pool = ThreadPoolExecutor(LS_WORKERS)
+        try:
+            pending = {target_dir: pool.submit(scan_host_directory, target_dir, options)}
+            stack = [(path, target_dir)]
+            status = 0
+            header = "{}:\n"
+            while stack:
+                display_dir, dir_path = stack.pop()
+                try:
+                    entries = pending.pop(dir_path).result()
+                except PermissionError:
+                    yield f"ls: невозможно открыть каталог '{display_dir}': Отказано в доступе\n"
+                    status = 1
+                    continue
+                except OSError as e:
+                    yield f"ls: ошибка: {e}\n"
+                    status = 1
+                    continue
+
+                yield header.format(display_dir) + "".join(format_host_entry(entry, long_format)
+                                                           for entry in entries)
+                header = "\n{}:\n"  # Пустая строка перед каждой следующей директорией
+
+                # Символические ссылки на директории не обходятся, как в ls -R
+                subdirs = [(os.path.join(display_dir, entry.name), entry.path) for entry in entries
+                           if entry.is_dir(follow_symlinks=False)]
+                for _, subdir_path in subdirs:
+                    pending[subdir_path] = pool.submit(scan_host_directory, subdir_path, options)
+                stack.extend(reversed(subdirs))
+            return status
+        finally:
+            # Вывод могли прервать (ls -R | head): незапущенные чтения отменяются
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def cmd_cd(self, args, stdin=None):
         """Команда cd - смена директории"""
         if self.in_vfs_mode:
             if not args:
@@ -112,13 +362,13 @@ class UnixShellEmulator:
                 path = args[0]
 
             if not self.vfs.change_directory(path):
-                print(f"cd: {path}: Нет такого файла или каталога")
+                yield f"cd: {path}: Нет такого файла или каталога\n"
+                return 1
             return
 
         if not args:
             new_dir = os.path.expanduser("~")
             self.current_dir = new_dir
-            os.chdir(new_dir)
             return
         target = args[0]
 
@@ -136,183 +386,807 @@ class UnixShellEmulator:
             new_dir = os.path.abspath(new_dir)
 
             if not os.path.exists(new_dir):
-                print(f"cd: {target}: Нет такого файла или каталога")
-                return
+                yield f"cd: {target}: Нет такого файла или каталога\n"
+                return 1
 
             if not os.path.isdir(new_dir):
-                print(f"cd: {target}: Не является каталогом")
-                return
+                yield f"cd: {target}: Не является каталогом\n"
+                return 1
 
+            # Рабочий каталог процесса не меняется: пути хоста разрешаются относительно current_dir,
+            # поэтому у каждого сеанса сервера он свой
             self.current_dir = new_dir
-            os.chdir(new_dir)
 
         except Exception as e:
-            print(f"cd: ошибка: {e}")
+            yield f"cd: ошибка: {e}\n"
+            return 1
 
-    def cmd_pwd(self, args):
+    def cmd_pwd(self, args, stdin=None):
         """Команда pwd - вывод текущей директории"""
         if self.in_vfs_mode:
-            print(self.vfs.current_vfs_dir)
+            yield f"{self.vfs.current_vfs_dir}\n"
         else:
-            print(self.current_dir)
+            yield f"{self.current_dir}\n"
 
-    def cmd_echo(self, args):
+    def cmd_echo(self, args, stdin=None):
         """Команда echo - вывод текста"""
-        print(' '.join(args))
+        yield f"{' '.join(args)}\n"
 
-    def cmd_whoami(self, args):
+    def cmd_whoami(self, args, stdin=None):
         """Команда whoami - вывод имени пользователя"""
-        print(self.username)
+        yield f"{self.username}\n"
 
-    def cmd_hostname(self, args):
+    def cmd_hostname(self, args, stdin=None):
         """Команда hostname - вывод имени хоста"""
-        print(self.hostname)
+        yield f"{self.hostname}\n"
 
-    def cmd_vfs(self, args):
+    def cmd_vfs(self, args, stdin=None):
         """Команда vfs - управление виртуальной файловой системой"""
         if not args:
-            print("Использование: vfs [on|off|status]")
-            return
+            yield "Использование: vfs [on|off|status|save|sync|compact|index|snapshot|restore|fork|convert]\n"
+            return 1
 
         subcommand = args[0]
         if subcommand == "on":
             self.in_vfs_mode = True
-            print("Режим VFS включен")
+            yield "Режим VFS включен\n"
+        elif subcommand in ("off", "convert") and not self.host_access:
+            yield f"vfs {subcommand}: доступ к файлам хоста в этом сеансе запрещен\n"
+            return 1
         elif subcommand == "off":
             self.in_vfs_mode = False
-            print("Режим VFS выключен")
+            yield "Режим VFS выключен\n"
         elif subcommand == "status":
             status = "включен" if self.in_vfs_mode else "выключен"
-            print(f"Режим VFS: {status}")
+            yield f"Режим VFS: {status}\n"
             if self.vfs_path:
-                print(f"VFS загружена из: {self.vfs_path}")
+                yield f"VFS загружена из: {self.vfs_path}\n"
+                if self.vfs.image_format:
+                    yield "Формат: образ VFS (отображен в память, директории разворачиваются по обращению)\n"
             else:
-                print("Используется VFS по умолчанию")
+                yield "Используется VFS по умолчанию\n"
+            if self.vfs.has_changes():
+                yield "Есть несохраненные изменения\n"
+            if self.vfs.search_index is not None:
+                yield "Поисковый индекс построен\n"
+            if self.vfs.snapshots:
+                yield f"Снимки: {', '.join(self.vfs.snapshots)}\n"
+            journal = self.vfs.journal
+            if journal is not None:
+                yield f"Журнал изменений: {journal.path}, записей {journal.records}, {format_size(journal.size)}\n"
+            blobs = self.vfs.blobs
+            if blobs.references:
+                yield (f"Содержимое файлов: файлов {blobs.references}, уникальных {blobs.unique_count()}, "
+                       f"{format_size(blobs.logical_size)} -> {format_size(blobs.stored_size)} "
+                       f"(дедупликация {blobs.dedup_ratio():.2f}x)\n")
+        elif subcommand in ("save", "sync"):
+            success, message = self.vfs.sync()
+            yield f"vfs {subcommand}: {message}\n"
+            return 0 if success else 1
+        elif subcommand == "compact":
+            success, message = self.vfs.compact()
+            yield f"vfs compact: {message}\n"
+            return 0 if success else 1
+        elif subcommand == "index":
+            count = self.vfs.build_search_index()
+            yield f"vfs index: проиндексировано узлов: {count}\n"
+        elif subcommand == "snapshot":
+            name = args[1] if len(args) > 1 else "default"
+            self.vfs.snapshot(name)
+            yield f"vfs snapshot: снимок '{name}' создан\n"
+        elif subcommand == "restore":
+            name = args[1] if len(args) > 1 else "default"
+            if not self.vfs.restore(name):
+                yield f"vfs restore: нет снимка '{name}'\n"
+                return 1
+            yield f"vfs restore: VFS восстановлена из снимка '{name}'\n"
+        elif subcommand == "convert":
+            if len(args) != 3:
+                yield "Использование: vfs convert <источник> <назначение.vfsimg|назначение.zip>\n"
+                return 1
+            from VirtualFileSystem import convert_vfs
+            success, message = convert_vfs(os.path.join(self.current_dir, args[1]),
+                                           os.path.join(self.current_dir, args[2]))
+            yield f"vfs convert: {message}\n"
+            return 0 if success else 1
+        elif subcommand == "fork":
+            # Дальнейшие изменения видит только этот эмулятор (в режиме сервера - только этот сеанс)
+            self.vfs = self.vfs.fork()
+            yield "vfs fork: работа продолжается с собственной копией VFS\n"
         else:
-            print(f"vfs: неизвестная подкоманда: {subcommand}")
+            yield f"vfs: неизвестная подкоманда: {subcommand}\n"
+            return 1
+
+    def _decode_chunks(self, view):
+        """Декодирует memoryview по частям, не копируя содержимое файла целиком"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for start in range(0, len(view), CAT_CHUNK_SIZE):
+            yield decoder.decode(view[start:start + CAT_CHUNK_SIZE])
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def _read_host_chunks(self, path):
+        """Читает текстовый файл хоста частями"""
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            while chunk := f.read(CAT_CHUNK_SIZE):
+                yield chunk
 
-    def cmd_cat(self, args):
-        """Команда cat - вывод содержимого файла"""
+    def file_chunks(self, path):
+        """Возвращает генератор частей текста файла (VFS или хоста) или None, если файла нет"""
+        if self.in_vfs_mode:
+            view = self.vfs.read_file_view(path)
+            return None if view is None else self._decode_chunks(view)
+
+        path = os.path.join(self.current_dir, path)
+        return self._read_host_chunks(path) if os.path.isfile(path) else None
+
+    def cmd_cat(self, args, stdin=None):
+        """Команда cat - вывод содержимого файла или стандартного ввода"""
         if not args:
-            print("Использование: cat <файл>")
+            if stdin is None:
+                yield "Использование: cat <файл>\n"
+                return 1
+            yield from stdin
             return
 
-        filename = args[0]
-        if self.in_vfs_mode:
-            content = self.vfs.read_file(filename)
-            if content is None:
-                print(f"cat: {filename}: Нет такого файла или каталога")
-            else:
-                print(content)
-        else:
+        status = 0
+        for filename in args:
+            chunks = self.file_chunks(filename)
+            if chunks is None:
+                yield f"cat: {filename}: Нет такого файла или каталога\n"
+                status = 1
+                continue
             try:
-                with open(filename, 'r', encoding='utf-8') as f:
-                    print(f.read())
-            except FileNotFoundError:
-                print(f"cat: {filename}: Нет такого файла или каталога")
+                last = ""
+                for chunk in chunks:
+                    yield chunk
+                    last = chunk
+                if not last.endswith("\n"):
+                    yield "\n"
             except Exception as e:
-                print(f"cat: ошибка: {e}")
+                yield f"cat: ошибка: {e}\n"
+                status = 1
+        return status
+
+    def _input_sources(self, files, stdin, command):
+        """Источники ввода (имя, части текста): файлы или стандартный ввод; об отсутствующих файлах сообщает"""
+        if not files:
+            yield None, stdin or ()
+            return
+        for filename in files:
+            chunks = self.file_chunks(filename)
+            if chunks is None:
+                self.out.write(f"{command}: {filename}: Нет такого файла или каталога\n")
+                continue
+            yield filename, chunks
 
-    def cmd_touch(self, args):
+    def _input_lines(self, files, stdin, command):
+        """Строки всех источников ввода подряд"""
+        for _, chunks in self._input_sources(files, stdin, command):
+            yield from iter_lines(chunks)
+
+    def _grep_targets(self, operands, pattern, ignore_case=False):
+        """Раскрывает пути для grep -r в список файлов; в VFS кандидаты отбираются поисковым индексом"""
+        targets = []
+        for operand in operands or ["."]:
+            if self.in_vfs_mode:
+                paths = self.vfs.grep_candidates(operand, pattern, ignore_case)
+                if paths is None:
+                    self.out.write(f"grep: {operand}: Нет такого файла или каталога\n")
+                targets.extend(paths or ())
+                continue
+
+            root = os.path.join(self.current_dir, operand)
+            if os.path.isfile(root):
+                targets.append(operand)
+            elif not os.path.isdir(root):
+                self.out.write(f"grep: {operand}: Нет такого файла или каталога\n")
+            for dir_path, dir_names, file_names in os.walk(root):
+                dir_names.sort()
+                relative = os.path.relpath(dir_path, root)
+                for file_name in sorted(file_names):
+                    targets.append(os.path.normpath(os.path.join(operand, relative, file_name)))
+        return targets
+
+    def cmd_grep(self, args, stdin=None):
+        """Команда grep - вывод строк, соответствующих регулярному выражению"""
+        flags = [arg for arg in args if arg.startswith('-') and len(arg) > 1]
+        operands = [arg for arg in args if arg not in flags]
+        options = set("".join(flag[1:] for flag in flags))  # -rl равносильно -r -l
+        if not operands:
+            yield "Использование: grep [-i] [-v] [-c] [-l] [-r] <шаблон> [файл ...]\n"
+            return 2
+
+        import re  # Модуль регулярных выражений нужен только grep
+        try:
+            pattern = re.compile(operands[0], re.IGNORECASE if 'i' in options else 0)
+        except re.error as e:
+            yield f"grep: неверный шаблон: {e}\n"
+            return 2
+
+        invert = 'v' in options
+        files = operands[1:]
+        recursive = 'r' in options
+        if recursive:
+            # При -v подходящая строка может быть в любом файле, а -c выводит и нулевые счетчики -
+            # индекс не сужает поиск
+            files = self._grep_targets(files, None if invert or 'c' in options else operands[0], 'i' in options)
+        show_names = recursive or len(files) > 1
+        total = 0
+        search = pattern.search
+        for filename, chunks in self._input_sources(files, stdin, "grep"):
+            prefix = f"{filename}:" if show_names else ""
+            count = 0
+            # Строки фильтруются блоками: одна запись в вывод на каждую часть входа
+            for block in iter_line_blocks(chunks):
+                selected = [line for line in block if (search(line) is None) == invert]
+                count += len(selected)
+                if 'l' in options:
+                    if count:
+                        break
+                elif selected and 'c' not in options:
+                    yield "".join(f"{prefix}{line}\n" for line in selected)
+            if 'l' in options:
+                if count:
+                    yield f"{filename or '(стандартный ввод)'}\n"
+            elif 'c' in options:
+                yield f"{prefix}{count}\n"
+            total += count
+        return 0 if total else 1
+
+    def cmd_find(self, args, stdin=None):
+        """Команда find - поиск файлов и директорий по имени, типу и размеру"""
+        usage = "Использование: find [путь] [-name|-iname <шаблон>] [-type f|d] [-size [+|-]N[c|k|M]]\n"
+        path = "."
+        if args and not args[0].startswith('-'):
+            path = args[0]
+            args = args[1:]
+
+        name = None
+        ignore_case = False
+        node_type = None
+        size_test = None
+        i = 0
+        while i < len(args):
+            option = args[i]
+            if i + 1 >= len(args):
+                yield usage
+                return 1
+            value = args[i + 1]
+            if option in ('-name', '-iname'):
+                name = value
+                ignore_case = option == '-iname'
+            elif option == '-type' and value in ('f', 'd'):
+                node_type = NodeType.FILE if value == 'f' else NodeType.DIRECTORY
+            elif option == '-size':
+                size_test = parse_size_test(value)
+                if size_test is None:
+                    yield f"find: неверный размер: '{value}'\n"
+                    return 1
+            else:
+                yield usage
+                return 1
+            i += 2
+
+        if self.in_vfs_mode:
+            def predicate(node):
+                if node_type is not None and node.type is not node_type:
+                    return False
+                return size_test is None or (node.type is NodeType.FILE and size_test(node.size))
+
+            paths = self.vfs.find(path, name, ignore_case, predicate)
+            if paths is None:
+                yield f"find: '{path}': Нет такого файла или каталога\n"
+                return 1
+            for start in range(0, len(paths), 1024):
+                yield "".join(f"{found}\n" for found in paths[start:start + 1024])
+            return
+
+        import fnmatch
+        root = os.path.join(self.current_dir, path)
+        if not os.path.exists(root):
+            yield f"find: '{path}': Нет такого файла или каталога\n"
+            return 1
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names.sort()
+            entries = [(dir_path, NodeType.DIRECTORY)] if dir_path == root else []
+            entries += [(os.path.join(dir_path, entry), NodeType.DIRECTORY) for entry in dir_names]
+            entries += [(os.path.join(dir_path, entry), NodeType.FILE) for entry in sorted(file_names)]
+            for entry_path, entry_type in entries:
+                entry_name = os.path.basename(entry_path)
+                if name is not None and not fnmatch.fnmatchcase(
+                        entry_name.lower() if ignore_case else entry_name, name.lower() if ignore_case else name):
+                    continue
+                if node_type is not None and entry_type is not node_type:
+                    continue
+                if size_test is not None and (entry_type is not NodeType.FILE or not size_test(os.path.getsize(entry_path))):
+                    continue
+                yield f"{os.path.normpath(os.path.join(path, os.path.relpath(entry_path, root)))}\n"
+
+    def cmd_head(self, args, stdin=None):
+        """Команда head - вывод первых строк (по умолчанию 10)"""
+        limit = 10
+        files = []
+        i = 0
+        while i < len(args):
+            if args[i] == '-n' and i + 1 < len(args) and args[i + 1].isdigit():
+                limit = int(args[i + 1])
+                i += 1
+            else:
+                files.append(args[i])
+            i += 1
+
+        if limit == 0:
+            return
+        for number, line in enumerate(self._input_lines(files, stdin, "head"), 1):
+            yield line
+            if number >= limit:
+                break
+
+    def cmd_wc(self, args, stdin=None):
+        """Команда wc - подсчет строк, слов и символов"""
+        flags = [arg for arg in args if arg in ('-l', '-w', '-c')]
+        files = [arg for arg in args if arg not in flags]
+        lines = words = chars = 0
+
+        def counted(chunks):
+            """Пропускает части текста, считая символы и переводы строк (последняя строка может быть без '\\n')"""
+            nonlocal lines, chars
+            for chunk in chunks:
+                lines += chunk.count("\n")
+                chars += len(chunk)
+                yield chunk
+
+        for _, chunks in self._input_sources(files, stdin, "wc"):
+            for block in iter_line_blocks(counted(chunks)):
+                words += len("\n".join(block).split())
+
+        counts = {'-l': lines, '-w': words, '-c': chars}
+        selected = [counts[flag] for flag in ('-l', '-w', '-c') if flag in flags] or counts.values()
+        yield " ".join(str(value) for value in selected) + "\n"
+
+    def cmd_du(self, args, stdin=None):
+        """Команда du - размер директорий по сводным данным VFS"""
+        if not self.in_vfs_mode:
+            yield "du: команда доступна только в режиме VFS\n"
+            return 1
+
+        flags = [arg for arg in args if arg.startswith('-') and len(arg) > 1]
+        options = set("".join(flag[1:] for flag in flags))
+        size_text = format_size if 'h' in options else str
+        status = 0
+        for path in [arg for arg in args if arg not in flags] or ["."]:
+            found = self.vfs.stat(path)
+            if found is None:
+                yield f"du: невозможно получить доступ к '{path}': Нет такого файла или каталога\n"
+                status = 1
+                continue
+            abs_path, node = found
+            if 's' in options or node.type is NodeType.FILE:
+                yield f"{size_text(node.size)}\t{abs_path}\n"
+                continue
+            # Вложенные директории выводятся раньше родительских, как в du
+            directories = list(self.vfs.iter_directories(abs_path))
+            yield "".join(f"{size_text(dir_node.total_size)}\t{dir_path}\n"
+                          for dir_path, dir_node in reversed(directories))
+        return status
+
+    def cmd_stat(self, args, stdin=None):
+        """Команда stat - метаданные файла или директории VFS"""
+        if not args:
+            yield "Использование: stat <путь> [путь ...]\n"
+            return 1
+
+        if not self.in_vfs_mode:
+            yield "stat: команда доступна только в режиме VFS\n"
+            return 1
+
+        status = 0
+        for path in args:
+            found = self.vfs.stat(path)
+            if found is None:
+                yield f"stat: невозможно выполнить stat для '{path}': Нет такого файла или каталога\n"
+                status = 1
+                continue
+            abs_path, node = found
+            yield f"  Файл: {abs_path}\n"
+            if node.type is NodeType.DIRECTORY:
+                yield (f"  Тип: каталог\n"
+                       f"  Размер: {node.total_size} (файлов: {node.file_count})\n"
+                       f"  Элементов: {len(node.children)}\n"
+                       f"  Изменен: {ns_to_iso(node.modified)}\n")
+            else:
+                yield (f"  Тип: файл\n"
+                       f"  Размер: {node.size}\n"
+                       f"  Создан: {ns_to_iso(node.created)}\n"
+                       f"  Изменен: {ns_to_iso(node.modified)}\n")
+        return status
+
+    def cmd_touch(self, args, stdin=None):
         """Создает новые файлы или обновляет время модификации существующих"""
         if not args:
-            print("Использование: touch <файл1> [-d(--display) - вывод даты создания и модификации]")
-            return
+            yield "Использование: touch <файл1> [-d(--display) - вывод даты создания и модификации]\n"
+            return 1
 
         if not self.in_vfs_mode:
-            print("touch: команда доступна только в режиме VFS")
-            return
+            yield "touch: команда доступна только в режиме VFS\n"
+            return 1
 
         display_time = '-d' in args or '--display' in args
 
+        status = 0
         for path in args:
             if path == '-d' or path == '--display':
                 continue
             success, message = self.vfs.create_file(path, display_time=display_time)
             if success:
-                print(f"touch: {message}: '{path}'")
+                yield f"touch: {message}: '{path}'\n"
             else:
-                print(f"touch: невозможно создать '{path}': {message}")
+                yield f"touch: невозможно создать '{path}': {message}\n"
+                status = 1
+        return status
 
-    def cmd_rm(self, args):
-        """Удаляет файлы из VFS"""
+    def cmd_rm(self, args, stdin=None):
+        """Удаляет файлы из VFS; -r - директории со всем содержимым"""
+        flags = [arg for arg in args if arg.startswith('-') and len(arg) > 1]
+        recursive = not {'r', 'R'}.isdisjoint("".join(flags))
+        args = [arg for arg in args if arg not in flags]
         if not args:
-            print("Использование: rm <файл1> [файл2 ...]")
-            return
+            yield "Использование: rm [-r] <файл1> [файл2 ...]\n"
+            return 1
 
         if not self.in_vfs_mode:
-            print("rm: команда доступна только в режиме VFS")
-            return
+            yield "rm: команда доступна только в режиме VFS\n"
+            return 1
 
+        status = 0
         for filename in args:
-            success, message = self.vfs.remove_file(filename)
+            found = self.vfs.stat(filename) if recursive else None
+            if found is not None and found[1].type is NodeType.DIRECTORY:
+                success, message = self.vfs.remove_directory(filename, recursive=True)
+            else:
+                success, message = self.vfs.remove_file(filename)
             if success:
-                print(f"rm: {message}: '{filename}'")
+                yield f"rm: {message}: '{filename}'\n"
             else:
-                print(f"rm: невозможно удалить '{filename}': {message}")
+                yield f"rm: невозможно удалить '{filename}': {message}\n"
+                status = 1
+        return status
+
+    def cmd_cp(self, args, stdin=None):
+        """Копирует файлы VFS (-r - директории); копия ссылается на то же содержимое"""
+        flags = [arg for arg in args if arg.startswith('-') and len(arg) > 1]
+        recursive = not {'r', 'R'}.isdisjoint("".join(flags))
+        args = [arg for arg in args if arg not in flags]
+        if len(args) < 2:
+            yield "Использование: cp [-r] <источник> [источник ...] <назначение>\n"
+            return 1
+
+        if not self.in_vfs_mode:
+            yield "cp: команда доступна только в режиме VFS\n"
+            return 1
+
+        *sources, target = args
+        found = self.vfs.stat(target)
+        if len(sources) > 1 and (found is None or found[1].type is not NodeType.DIRECTORY):
+            yield f"cp: назначение '{target}' не является директорией\n"
+            return 1
+
+        status = 0
+        for source in sources:
+            if recursive:
+                success, message = self.vfs.copy_directory(source, target)
+            else:
+                success, message = self.vfs.copy_file(source, target)
+            if not success:
+                yield f"cp: невозможно скопировать '{source}': {message}\n"
+                status = 1
+        return status
+
+    def cmd_mv(self, args, stdin=None):
+        """Перемещает или переименовывает файлы и директории VFS"""
+        if len(args) < 2:
+            yield "Использование: mv <источник> [источник ...] <назначение>\n"
+            return 1
+
+        if not self.in_vfs_mode:
+            yield "mv: команда доступна только в режиме VFS\n"
+            return 1
+
+        *sources, target = args
+        found = self.vfs.stat(target)
+        if len(sources) > 1 and (found is None or found[1].type is not NodeType.DIRECTORY):
+            yield f"mv: назначение '{target}' не является директорией\n"
+            return 1
+
+        status = 0
+        for source in sources:
+            success, message = self.vfs.move(source, target)
+            if not success:
+                yield f"mv: невозможно переместить '{source}': {message}\n"
+                status = 1
+        return status
+
+    def cmd_mkdir(self, args, stdin=None):
+        """Создает директории VFS; -p - вместе с родительскими, без ошибки для существующих"""
+        parents = '-p' in args
+        args = [arg for arg in args if arg != '-p']
+        if not args:
+            yield "Использование: mkdir [-p] <директория1> [директория2 ...]\n"
+            return 1
+
+        if not self.in_vfs_mode:
+            yield "mkdir: команда доступна только в режиме VFS\n"
+            return 1
+
+        status = 0
+        for path in args:
+            success, message = self.vfs.make_directory(path, parents=parents)
+            if not success:
+                yield f"mkdir: невозможно создать директорию '{path}': {message}\n"
+                status = 1
+        return status
+
+    def cmd_rmdir(self, args, stdin=None):
+        """Удаляет пустые директории VFS"""
+        if not args:
+            yield "Использование: rmdir <директория1> [директория2 ...]\n"
+            return 1
+
+        if not self.in_vfs_mode:
+            yield "rmdir: команда доступна только в режиме VFS\n"
+            return 1
+
+        status = 0
+        for path in args:
+            success, message = self.vfs.remove_directory(path)
+            if not success:
+                yield f"rmdir: не удалось удалить '{path}': {message}\n"
+                status = 1
+        return status
 
+    def save_on_exit(self):
+        """Сохраняет изменения VFS при выходе, если включено автосохранение"""
+        if self.autosave and self.vfs_loaded and self.vfs.has_changes():
+            success, message = self.vfs.sync()
+            yield f"Автосохранение VFS: {message}\n"
 
-    def cmd_exit(self, args):
+    def finish_session(self):
+        """Завершение сеанса: автосохранение VFS и отчет профилировщика"""
+        yield from self.save_on_exit()
+        if self.profiler is not None:
+            yield from self.profiler.report()
+            yield from self.profiler.finish()
+
+    def cmd_time(self, args, stdin=None):
+        """Команда time - выполняет команду и выводит затраченное время
+
+        Замеры пишутся в поток эмулятора, а не в вывод команды: перенаправление и конвейер
+        получают только вывод самой команды, как со stderr в bash.
+        """
+        if not args:
+            yield "Использование: time <команда> [аргументы ...]\n"
+            return 1
+
+        start = time.perf_counter()
+        times_start = os.times()
+        status = yield from self.iter_command(args[0], args[1:], stdin)
+        times_end = os.times()
+        timings = (("real", time.perf_counter() - start),
+                   ("user", times_end.user - times_start.user),
+                   ("sys", times_end.system - times_start.system))
+        self.out.write("".join(f"{label}\t{int(seconds // 60)}m{seconds % 60:.3f}s\n" for label, seconds in timings))
+        return status
+
+    def cmd_stats(self, args, stdin=None):
+        """Команда stats - замеры профилировщика по командам (reset - сбросить)"""
+        if self.profiler is None:
+            yield "stats: профилирование выключено (запустите эмулятор с флагом --profile)\n"
+            return 1
+        if args and args[0] == "reset":
+            self.profiler.reset()
+            yield "stats: замеры сброшены\n"
+            return
+        yield from self.profiler.report()
+
+    def cmd_exit(self, args, stdin=None):
         """Завершает работу эмулятора"""
-        print("Выход из эмулятора командной строки")
-        exit(0)
+        yield from self.finish_session()
+        yield "Выход из эмулятора командной строки\n"
+        sys.exit(0)
+
+    def write_output(self, chunks, out=None):
+        """Записывает части вывода команды в поток и возвращает ее код завершения"""
+        write = (out or self.out).write
+        try:
+            while True:
+                write(next(chunks))
+        except StopIteration as stop:
+            return stop.value or 0
 
-    def execute_command(self, command, args):
-        """Выполняет команду или сообщает об ошибке если команда не найдена"""
+    def iter_command(self, command, args, stdin=None):
+        """Возвращает генератор частей вывода команды; stdin - итератор частей входного текста"""
         if command in self.commands:
-            self.commands[command](args)
+            return self.commands[command](args, stdin)
+        return self._command_not_found(command)
+
+    def _profiled_command(self, command, args, stdin=None):
+        """iter_command с замером времени и разрешений путей VFS (включается профилировщиком)"""
+        return self.profiler.track(command, UnixShellEmulator.iter_command(self, command, args, stdin))
+
+    def _command_not_found(self, command):
+        """Вывод для неизвестной команды"""
+        yield f"{command}: команда не найдена\n"
+        return 127
+
+    def execute_command(self, command, args, out=None):
+        """Выполняет команду, записывая ее вывод в out (по умолчанию self.out); возвращает код завершения"""
+        return self.run_pipeline([Command(command, args)], out)
+
+    def _redirect_output(self, chunks, path, append):
+        """Записывает вывод команды в файл (VFS или хоста) и возвращает код завершения команды"""
+        status = []
+
+        def tracked():
+            status.append((yield from chunks) or 0)
+
+        if self.in_vfs_mode:
+            success, message = self.vfs.write_file(path, tracked(), append=append)
+            if not success:
+                self.out.write(f"{path}: {message}\n")
+                return 1
         else:
-            print(f"{command}: команда не найдена")
+            try:
+                with open(os.path.join(self.current_dir, path), 'a' if append else 'w', encoding='utf-8') as f:
+                    f.writelines(tracked())
+            except OSError as e:
+                self.out.write(f"{path}: {e.strerror}\n")
+                return 1
+        return status[0] if status else 0
+
+    def expand_globs(self, args):
+        """Раскрывает аргументы-шаблоны (*, ?, [...], **) в пути VFS или хоста; без совпадений шаблон остается как есть"""
+        if not any(isinstance(arg, Pattern) for arg in args):
+            return args
+
+        from ShellGlob import HostGlobSource, VfsGlobSource, expand_glob  # Тянет за собой re и fnmatch
+        source = VfsGlobSource(self.vfs) if self.in_vfs_mode else HostGlobSource(self.current_dir)
+        expanded = []
+        for arg in args:
+            if isinstance(arg, Pattern):
+                expanded.extend(expand_glob(arg.pattern, source) or [str(arg)])
+            else:
+                expanded.append(arg)
+        return expanded
+
+    def run_pipeline(self, pipeline, out=None):
+        """Выполняет конвейер: стадии соединены ленивыми генераторами; возвращает код последней стадии"""
+        out = out or self.out
+        saved_out, self.out = self.out, out
+        if self.vfs_loaded:
+            self.vfs.out = out  # Сообщения VFS идут в тот же поток
+        try:
+            chunks, status = self.open_pipeline(pipeline, out)
+            if chunks is not None:
+                status = self.write_output(chunks, out)
+            return status
+        finally:
+            self.out = saved_out
+            if self.vfs_loaded:
+                self.vfs.out = saved_out  # VFS могла быть создана внутри конвейера
+
+    def open_pipeline(self, pipeline, out):
+        """Соединяет стадии конвейера; возвращает генератор вывода последней стадии (None - вывод
+        перенаправлен) и код завершения, известный к этому моменту"""
+        status = 0
+        chunks = None
+        for stage in pipeline:
+            stdin = chunks
+            if stage.stdin_path is not None:
+                stdin = self.file_chunks(stage.stdin_path)
+                if stdin is None:
+                    out.write(f"{stage.stdin_path}: Нет такого файла или каталога\n")
+                    return None, 1
+
+            chunks = self.iter_command(stage.name, self.expand_globs(stage.args), stdin)
+            if stage.stdout_path is not None:
+                status = self._redirect_output(chunks, stage.stdout_path, stage.append)
+                chunks = None
+        return chunks, status
+
+    def run_line(self, line, out=None):
+        """Выполняет строку с конвейерами '|', перенаправлениями и ';'; возвращает первый ненулевой код"""
+        try:
+            pipelines = parse(line)
+        except ValueError as e:
+            (out or self.out).write(f"Ошибка парсинга: {e}\n")
+            return 2
+
+        status = 0
+        try:
+            for pipeline in pipelines:
+                result = self.run_pipeline(pipeline, out)
+                status = status or result
+        finally:
+            if self.vfs_loaded:
+                self.vfs.commit()  # Изменения строки сбрасываются в журнал одним fsync
+        return status
 
     def run_startup_script(self):
         """Выполняет команды из стартового скрипта"""
-        print("Выполнение стартового скрипта:")
-        print("-" * 50)
+        print("Выполнение стартового скрипта:", file=self.out)
+        print("-" * 50, file=self.out)
 
         try:
             for com in self.startup_script:
-                print(f"{self.get_prompt()}\033[92m{com}\033[0m")
-                command, args = self.parse_input(com)
-
-                if command is None:
-                    continue
+                print(f"{self.get_prompt()}\033[92m{com}\033[0m", file=self.out)
+                self.run_line(com)
+        finally:
+            print("-" * 50, file=self.out)
+            print("Стартовый скрипт выполнен", file=self.out)
+            print(file=self.out)
 
-                self.execute_command(command, args)
+    def run_batch(self, commands, echo=False):
+        """Выполняет команды без интерактивного цикла и возвращает код завершения"""
+        failed = 0
+        try:
+            for com in commands:
+                if echo:
+                    self.out.write(f"{self.get_prompt()}{com}\n")
+                if self.run_line(com):
+                    failed += 1
+            self.write_output(self.finish_session())
+        except SystemExit as e:  # Команда exit
+            if e.code:
+                return e.code
         finally:
-            print("-" * 50)
-            print("Стартовый скрипт выполнен")
-            print()
+            self.out.flush()
+        return 1 if failed else 0
 
     def run(self):
         """Основной цикл работы эмулятора: чтение-выполнение-вывод"""
-        print("Добро пожаловать в эмулятор командной строки UNIX!")
+        print("Добро пожаловать в эмулятор командной строки UNIX!", file=self.out)
         if self.vfs_path:
-            print(f"VFS путь: {self.vfs_path}")
+            print(f"VFS путь: {self.vfs_path}", file=self.out)
         else:
-            print("VFS: используется файловая система по умолчанию")
+            print("VFS: используется файловая система по умолчанию", file=self.out)
 
         if self.startup_script:
-            print(f"Выполняется стартовый скрипт с {len(self.startup_script)} командами")
+            print(f"Выполняется стартовый скрипт с {len(self.startup_script)} командами", file=self.out)
 
-        print("Доступные команды: ls, cd, pwd, echo, whoami, hostname, vfs, cat, touch, rm, exit")
-        print("Для выхода введите 'exit'")
-        print("-" * 50)
+        print(f"Доступные команды: {', '.join(self.commands)}", file=self.out)
+        print("Для выхода введите 'exit'", file=self.out)
+        print("-" * 50, file=self.out)
 
         if self.startup_script:
             self.run_startup_script()
 
-        while True:
-            try:
-                user_input = input(self.get_prompt())
-                command, args = self.parse_input(user_input)
-
-                if command is None:
-                    continue
+        completer = self._install_completion()
+        try:
+            while True:
+                try:
+                    user_input = input(self.get_prompt())
+                    self.run_line(user_input)
 
-                self.execute_command(command, args)
+                except KeyboardInterrupt:
+                    print("\n\nДля выхода введите 'exit'", file=self.out)
+                except EOFError:
+                    self.write_output(self.finish_session())
+                    print("\nВыход из эмулятора", file=self.out)
+                    break
+        finally:
+            if completer is not None:
+                completer.save_history()
 
-            except KeyboardInterrupt:
-                print("\n\nДля выхода введите 'exit'")
-            except EOFError:
-                print("\nВыход из эмулятора")
-                break
+    def _install_completion(self):
+        """Дополнение по Tab и история команд для интерактивного ввода; None - без терминала или readline"""
+        if not sys.stdin.isatty():
+            return None
+        try:
+            from ShellCompleter import ShellCompleter  # readline есть не на всех платформах
+        except ImportError:
+            return None
+        completer = ShellCompleter(self)
+        completer.install()
+        return completer
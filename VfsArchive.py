@@ -0,0 +1,125 @@
+from functools import lru_cache
+import io
+import mmap
+import os
+import struct
+import threading
+import time
+import zipfile
+import zlib
+
+# Локальный заголовок файла ZIP: сигнатура, поля фиксированной длины, затем имя и extra-поле
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+LOCAL_HEADER_SIGNATURE = b"PK\003\004"
+ZIP_EPOCH = 315532800  # 1980-01-01: минимальная дата, представимая в ZIP
+
+
+class VfsArchive:
+    """ZIP-архив VFS, отображенный в память: несжатые файлы отдаются срезами mmap без копирования"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._zip = zipfile.ZipFile(self._file, 'r')
+        self._zip_lock = threading.Lock()  # ZipFile читает через общий файловый объект
+
+    def infolist(self):
+        """Возвращает список ZipInfo из центрального каталога"""
+        return self._zip.infolist()
+
+    def is_zero_copy(self, file_info):
+        """Можно ли отдать файл срезом mmap: несжатый и не зашифрованный"""
+        return file_info.compress_type == zipfile.ZIP_STORED and not file_info.flag_bits & 0x1
+
+    def data_offset(self, file_info):
+        """Смещение данных файла в архиве: после локального заголовка, имени и extra-поля"""
+        header = LOCAL_HEADER.unpack_from(self._mmap, file_info.header_offset)
+        if header[0] != LOCAL_HEADER_SIGNATURE:
+            raise zipfile.BadZipFile(f"Неверный локальный заголовок: {file_info.filename}")
+        name_length, extra_length = header[-2], header[-1]
+        return file_info.header_offset + LOCAL_HEADER.size + name_length + extra_length
+
+    def read(self, file_info):
+        """Возвращает содержимое файла: memoryview для несжатых файлов, bytes для сжатых"""
+        if self.is_zero_copy(file_info):
+            start = self.data_offset(file_info)
+            return self._view[start:start + file_info.file_size]
+
+        if file_info.compress_type == zipfile.ZIP_DEFLATED and not file_info.flag_bits & 0x1:
+            # Распаковка прямо из mmap: zlib отпускает GIL, поэтому чтение можно вести из нескольких потоков
+            start = self.data_offset(file_info)
+            content = zlib.decompress(self._view[start:start + file_info.compress_size],
+                                      -zlib.MAX_WBITS, max(file_info.file_size, 1))
+            if zlib.crc32(content) != file_info.CRC:
+                raise zipfile.BadZipFile(f"Неверная контрольная сумма: {file_info.filename}")
+            return content
+
+        with self._zip_lock:
+            return self._zip.read(file_info)
+
+    def close(self):
+        """Закрывает архив; отображение освобождается, когда на него не останется срезов"""
+        self._zip.close()
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # Срезы содержимого еще используются узлами VFS
+        self._file.close()
+
+
+def _zip_info(name, modified_ns, compression):
+    """Создает ZipInfo для записи файла или директории (имя с '/')"""
+    date_time = time.localtime(max(modified_ns // 1_000_000_000, ZIP_EPOCH))[:6]
+    info = zipfile.ZipInfo(name, date_time)
+    if name.endswith("/"):
+        info.external_attr = 0o40755 << 16 | 0x10
+    else:
+        info.compress_type = compression
+        info.external_attr = 0o644 << 16
+    return info
+
+
+@lru_cache(maxsize=None)
+def can_remove_members():
+    """Может ли append_members исключить файлы из каталога, не дописывая новых
+
+    Публичного способа перезаписать центральный каталог у zipfile нет: ZipFile.close() пишет его,
+    только если установлен внутренний флаг _didModify (CPython 3.x, проверено до 3.13). Если
+    флаг исчезнет, удаление без новых файлов сохраняется перезаписью архива (write_archive).
+    """
+    with zipfile.ZipFile(io.BytesIO(), 'w') as zip_ref:
+        return hasattr(zip_ref, "_didModify")
+
+
+def append_members(path, members, removed, compression=zipfile.ZIP_DEFLATED):
+    """Дописывает members (имя, содержимое, mtime в нс) в конец архива и убирает removed из каталога
+
+    Без новых файлов удаление требует can_remove_members().
+    """
+    if not members and not can_remove_members():
+        raise NotImplementedError("zipfile не позволяет перезаписать центральный каталог без новых файлов")
+    with zipfile.ZipFile(path, 'a') as zip_ref:
+        # Старые версии файлов исключаются из центрального каталога, но их данные
+        # остаются в архиве недостижимыми до сжатия (write_archive)
+        replaced = set(removed) | {name for name, _, _ in members}
+        zip_ref.filelist = [info for info in zip_ref.filelist if info.filename not in replaced]
+        for name in replaced:
+            zip_ref.NameToInfo.pop(name, None)
+        if not members:
+            # Внутренний флаг CPython (см. can_remove_members): каталог перезаписывается при close()
+            zip_ref._didModify = True
+
+        for name, content, modified_ns in members:
+            zip_ref.writestr(_zip_info(name, modified_ns, compression), content)
+
+
+def write_archive(path, members, compression=zipfile.ZIP_DEFLATED):
+    """Записывает архив целиком во временный файл и атомарно заменяет им path"""
+    tmp_path = f"{path}.tmp"
+    with zipfile.ZipFile(tmp_path, 'w') as zip_ref:
+        for name, content, modified_ns in members:
+            zip_ref.writestr(_zip_info(name, modified_ns, compression), content)
+    os.replace(tmp_path, path)
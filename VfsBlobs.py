@@ -0,0 +1,93 @@
+class BlobStore:
+    """Хранилище содержимого файлов с адресацией по содержимому: одинаковое содержимое хранится один раз
+
+    Ключ словаря - само содержимое: dict хэширует его (SipHash, хэш кэшируется в объекте bytes
+    и memoryview) и при совпадении хэшей сравнивает данные, поэтому отдельный дайджест не хранится
+    и коллизии невозможны. Счетчики ссылок учитывают файлы дерева VFS; снимки и ответвления
+    хранят копию хранилища вместе со своим деревом. Срезы mmap (memoryview на несжатые файлы архива) только
+    учитываются: они и так общие через страничный кэш, а хэширование прочитало бы весь архив.
+    """
+
+    def __init__(self):
+        self.blobs = {}  # Содержимое (bytes) -> его общий экземпляр
+        self.refs = {}   # Общий экземпляр -> число ссылок; блобы с одной ссылкой не хранятся
+        self.views = {}  # id среза mmap -> число ссылок (срез жив, пока на него ссылается узел)
+        self.references = 0    # Файлов с содержимым в хранилище
+        self.logical_size = 0  # Суммарный размер этих файлов, байт
+        self.stored_size = 0   # Размер уникального содержимого, байт
+
+    def add(self, content):
+        """Добавляет ссылку на содержимое; возвращает общий экземпляр, который должен хранить узел"""
+        if isinstance(content, memoryview):
+            self._count_view(content, 1)
+            return content
+        stored = self.blobs.setdefault(content, content)
+        if stored is content:
+            self.stored_size += len(content)
+        else:
+            self.refs[stored] = self.refs.get(stored, 1) + 1
+        self.references += 1
+        self.logical_size += len(stored)
+        return stored
+
+    def acquire(self, content):
+        """Добавляет ссылку на содержимое узла (копирование файла) без хэширования и копирования данных"""
+        if isinstance(content, memoryview):
+            if id(content) not in self.views:
+                return False
+            self._count_view(content, 1)
+            return True
+        if content is None or self.blobs.get(content) is not content:
+            return False  # Содержимое не из этого хранилища - считать нечего
+        self.refs[content] = self.refs.get(content, 1) + 1
+        self.references += 1
+        self.logical_size += len(content)
+        return True
+
+    def release(self, content):
+        """Убирает ссылку узла на содержимое; блоб без ссылок удаляется из хранилища"""
+        if isinstance(content, memoryview):
+            if id(content) in self.views:
+                self._count_view(content, -1)
+            return
+        if content is None or self.blobs.get(content) is not content:
+            return
+        self.references -= 1
+        self.logical_size -= len(content)
+        count = self.refs.pop(content, 1) - 1
+        if count > 1:
+            self.refs[content] = count
+        elif not count:
+            del self.blobs[content]
+            self.stored_size -= len(content)
+
+    def _count_view(self, view, delta):
+        """Меняет число ссылок на срез mmap; срез учитывается в stored_size, пока на него есть ссылки"""
+        count = self.views.get(id(view), 0) + delta
+        self.references += delta
+        self.logical_size += delta * len(view)
+        if count:
+            self.views[id(view)] = count
+        else:
+            del self.views[id(view)]
+        if count == (delta > 0):  # Первая ссылка или последняя снятая
+            self.stored_size += delta * len(view)
+
+    def copy(self):
+        """Копия хранилища для снимка или ответвления: словари копируются без повторного хэширования"""
+        store = BlobStore()
+        store.blobs = dict(self.blobs)
+        store.refs = dict(self.refs)
+        store.views = dict(self.views)
+        store.references = self.references
+        store.logical_size = self.logical_size
+        store.stored_size = self.stored_size
+        return store
+
+    def unique_count(self):
+        """Число уникальных экземпляров содержимого"""
+        return len(self.blobs) + len(self.views)
+
+    def dedup_ratio(self):
+        """Во сколько раз содержимое файлов больше хранимого"""
+        return self.logical_size / self.stored_size if self.stored_size else 1.0
@@ -0,0 +1,217 @@
+from bisect import bisect_left
+import hashlib
+import mmap
+import os
+import struct
+
+from VfsNodes import DirNode, FileNode, NodeType
+
+IMAGE_SUFFIX = ".vfsimg"
+PAGE_SIZE = mmap.PAGESIZE
+
+# Заголовок: сигнатура, число узлов, смещения таблицы узлов, секции имен (и ее размер) и секции данных
+HEADER = struct.Struct("<8s6Q")
+MAGIC = b"VFSIMG01"
+# Узел: родитель, смещение и длина имени, тип, первый ребенок и число детей,
+# размер (у директории - суммарный), смещение данных файла или число файлов директории, время создания и изменения
+NODE = struct.Struct("<IIHBxIIQQqq")
+KIND_FILE = 0
+KIND_DIR = 1
+
+
+def is_image(path):
+    """Является ли файл образом VFS (по сигнатуре, а не по расширению)"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _align(offset, alignment):
+    """Смещение, выровненное вверх до кратного alignment"""
+    return -(-offset // alignment) * alignment
+
+
+class ImageDirNode(DirNode):
+    """Директория образа: дочерние узлы создаются из таблицы узлов при первом обращении к children"""
+    __slots__ = ("image", "index")
+
+    def __init__(self, image, index, total_size, file_count, modified):
+        _children_slot.__set__(self, None)
+        self.total_size = total_size
+        self.file_count = file_count
+        self.modified = modified
+        self.owner = None
+        self.image = image
+        self.index = index
+
+    @property
+    def children(self):
+        """Словарь имя -> узел; при первом обращении строится из записей детей в образе"""
+        children = _children_slot.__get__(self)
+        if children is None:
+            children = self.image.children(self.index)
+            _children_slot.__set__(self, children)
+        return children
+
+    @children.setter
+    def children(self, value):
+        _children_slot.__set__(self, value)
+
+    def child(self, name):
+        """Дочерний узел по имени; пока директория не развернута - двоичным поиском в образе"""
+        children = _children_slot.__get__(self)
+        if children is not None:
+            return children.get(name)
+        return self.image.child(self.index, name)
+
+
+_children_slot = DirNode.children  # Слот DirNode, который свойство ImageDirNode.children заполняет лениво
+
+
+class VfsImage:
+    """Образ VFS, отображенный в память: дерево не строится при открытии
+
+    Узлы хранятся в порядке обхода в ширину, дети каждой директории - подряд и по возрастанию
+    имени, поэтому директория разворачивается одним срезом таблицы, а путь ищется двоичным
+    поиском среди детей. Содержимое файлов отдается срезами mmap без копирования.
+
+    Узел, найденный поиском, запоминается по номеру и попадает в словарь детей при разворачивании
+    директории: у каждой записи образа один узел, и изменения VFS не расходятся между копиями.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._found = {}  # Номер записи -> узел, созданный поиском child
+        (magic, self.node_count, self._nodes, self._names, names_size,
+         self._data, data_size) = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or self._data + data_size > len(self._mmap) or not self.node_count:
+            self.close()
+            raise ValueError("Файл не является образом VFS или поврежден")
+
+    def _record(self, index):
+        """Запись узла таблицы по номеру"""
+        return NODE.unpack_from(self._mmap, self._nodes + index * NODE.size)
+
+    def _name(self, record):
+        """Имя узла из секции имен"""
+        start = self._names + record[1]
+        return self._mmap[start:start + record[2]].decode('utf-8')
+
+    def root(self):
+        """Корневая директория (узел 0)"""
+        record = self._record(0)
+        return ImageDirNode(self, 0, record[6], record[7], record[9])
+
+    def _node(self, number, record):
+        """Узел VFS для записи таблицы"""
+        _, _, _, kind, _, _, size, extra, created, modified = record
+        if kind == KIND_DIR:
+            return ImageDirNode(self, number, size, extra, modified)
+        data = self._data
+        return FileNode(self._view[data + extra:data + extra + size], None, created, modified)
+
+    def children(self, index):
+        """Дочерние узлы директории index: словарь имя -> узел"""
+        first, count = self._record(index)[4:6]
+        start = self._nodes + first * NODE.size
+        names, view, found = self._names, self._view, self._found
+        result = {}
+        for number, record in enumerate(NODE.iter_unpack(view[start:start + count * NODE.size]), first):
+            name_offset, name_length = record[1], record[2]
+            name = str(view[names + name_offset:names + name_offset + name_length], 'utf-8')
+            node = found.pop(number, None) if found else None
+            result[name] = node if node is not None else self._node(number, record)
+        return result
+
+    def child(self, index, name):
+        """Дочерний узел name директории index двоичным поиском среди ее детей, без разворачивания"""
+        first, count = self._record(index)[4:6]
+        position = bisect_left(range(first, first + count), name,
+                               key=lambda number: self._name(self._record(number)))
+        if position == count:
+            return None
+        number = first + position
+        record = self._record(number)
+        if self._name(record) != name:
+            return None
+        node = self._found.get(number)
+        if node is None:
+            node = self._found[number] = self._node(number, record)
+        return node
+
+    def close(self):
+        """Закрывает образ; отображение освобождается, когда на него не останется срезов"""
+        self._view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass  # Срезы содержимого еще используются узлами VFS
+        self._file.close()
+
+
+def write_image(path, root, read_content):
+    """Записывает дерево VFS в образ (во временный файл с атомарной заменой); возвращает число узлов
+
+    read_content(node) - содержимое файлового узла. Одинаковое содержимое хранится один раз;
+    секция данных и файлы не меньше страницы выровнены по границе страницы.
+    """
+    # Обход в ширину: дети директории получают номера подряд, по возрастанию имени
+    entries = [(0, b"", root)]
+    links = [(0, 0)]  # Первый ребенок и число детей
+    names = bytearray()
+    name_offsets = [0]
+    number = 0
+    while number < len(entries):
+        node = entries[number][2]
+        if node.type is NodeType.DIRECTORY:
+            children = sorted(node.children.items(), key=lambda item: item[0])
+            links[number] = (len(entries), len(children))
+            for name, child in children:
+                encoded = name.encode('utf-8')
+                name_offsets.append(len(names))
+                names += encoded
+                entries.append((number, encoded, child))
+                links.append((0, 0))
+        number += 1
+
+    names_offset = HEADER.size + len(entries) * NODE.size
+    data_offset = _align(names_offset + len(names), PAGE_SIZE)
+    table = bytearray(len(entries) * NODE.size)
+    stored = {}  # Дайджест содержимого -> смещение в секции данных
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.seek(data_offset)
+        data_size = 0
+        for number, (parent, name, node) in enumerate(entries):
+            first, count = links[number]
+            if node.type is NodeType.DIRECTORY:
+                kind, size, extra, created = KIND_DIR, node.total_size, node.file_count, node.modified
+            else:
+                content = read_content(node)
+                digest = hashlib.blake2b(content, digest_size=16).digest()
+                extra = stored.get(digest)
+                if extra is None:
+                    if len(content) >= PAGE_SIZE:
+                        padding = _align(data_size, PAGE_SIZE) - data_size
+                        f.write(b"\0" * padding)
+                        data_size += padding
+                    extra = stored[digest] = data_size
+                    f.write(content)
+                    data_size += len(content)
+                kind, size, created = KIND_FILE, len(content), node.created
+            NODE.pack_into(table, number * NODE.size, parent, name_offsets[number], len(name), kind,
+                           first, count, size, extra, created, node.modified)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, len(entries), HEADER.size, names_offset, len(names), data_offset, data_size))
+        f.write(table)
+        f.write(names)
+        if not data_size:
+            f.truncate(data_offset)  # Пустая секция данных: файл заканчивается на границе страницы
+    os.replace(tmp_path, path)
+    return len(entries)
@@ -0,0 +1,200 @@
+from array import array
+import fnmatch
+
+# Символы регулярного выражения, после которых предыдущий символ может отсутствовать
+OPTIONAL_QUANTIFIERS = "*?{"
+# Экранирования с кодом символа: число символов кода после буквы
+ESCAPE_PAYLOAD = {"x": 2, "u": 4, "U": 8}
+# Замены после str.lower: сигма в конце слова, точка над I (İ -> i + U+0307) и буквы, которые
+# re.IGNORECASE считает равными ASCII (ı, ſ; знак Кельвина str.lower сам переводит в k)
+FOLD_FIXES = (("ς", "σ"), ("\u0307", ""), ("ı", "i"), ("ſ", "s"))
+
+
+def trigrams(text):
+    """Множество триграмм строки (кортежи из трех символов)"""
+    return set(zip(text, text[1:], text[2:]))
+
+
+def fold(text):
+    """Приводит текст к строчным буквам для триграмм; в fold(текста) всегда есть fold(его подстроки)"""
+    text = text.lower()
+    if not text.isascii():
+        for old, new in FOLD_FIXES:
+            text = text.replace(old, new)
+    return text
+
+
+def _class_end(pattern, start):
+    """Индекс закрывающей ']' класса символов, начинающегося в start (-1, если класс не закрыт)"""
+    i = start + 1
+    if i < len(pattern) and pattern[i] == "^":
+        i += 1
+    if i < len(pattern) and pattern[i] == "]":
+        i += 1
+    while i < len(pattern):
+        if pattern[i] == "\\":
+            i += 1
+        elif pattern[i] == "]":
+            return i
+        i += 1
+    return -1
+
+
+def _escape_end(pattern, start):
+    """Индекс последнего символа экранирования с буквой или цифрой в start: у \\x, \\u, \\U, \\N{...},
+    восьмеричных кодов и ссылок на группы символы после буквы - не текст шаблона (-1 - \\N не закрыт)"""
+    escape = pattern[start]
+    if escape in ESCAPE_PAYLOAD:
+        return start + ESCAPE_PAYLOAD[escape]
+    if escape == "N":
+        return pattern.find("}", start)
+    end = start
+    if escape.isdigit():
+        while end < start + 2 and end + 1 < len(pattern) and pattern[end + 1].isdigit():
+            end += 1  # \0, \012, \1 - \99: восьмеричный код или ссылка на группу
+    return end
+
+
+def required_literals(pattern):
+    """Подстроки, которые обязательно входят в любое совпадение с регулярным выражением.
+
+    Разбор консервативный: при альтернативе '|' или встроенных флагах ограничений нет,
+    содержимое групп и классов символов пропускается, символ перед '*', '?' или '{' отбрасывается.
+    """
+    if "|" in pattern or "(?" in pattern:
+        return []
+
+    runs = []
+    run = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        literal = None
+        if char == "\\" and i + 1 < len(pattern):
+            i += 1
+            if not pattern[i].isalnum():
+                literal = pattern[i]  # Экранированный спецсимвол: \. \* ...
+            else:
+                i = _escape_end(pattern, i)
+                if i < 0:
+                    return []
+        elif char == "[":
+            i = _class_end(pattern, i)
+            if i < 0:
+                return []
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char in OPTIONAL_QUANTIFIERS:
+            if run:
+                run.pop()
+            if char == "{":
+                i = pattern.find("}", i)
+                if i < 0:
+                    return []
+        elif char not in ".^$+":
+            literal = char
+
+        if literal is not None and depth == 0:
+            run.append(literal)
+        elif run:
+            runs.append("".join(run))
+            run = []
+        i += 1
+
+    if run:
+        runs.append("".join(run))
+    return runs
+
+
+class VfsIndex:
+    """Поисковый индекс VFS: имена узлов и триграммы текстового содержимого файлов"""
+
+    def __init__(self):
+        self.names = {}      # имя -> множество абсолютных путей
+        self.postings = {}   # триграмма -> array идентификаторов файлов
+        self._ids = {}       # путь -> идентификатор файла
+        self._paths = []     # идентификатор -> путь (None для удаленных)
+
+    def add(self, path, text=None):
+        """Добавляет узел; text - содержимое файла (None для директорий)"""
+        self.names.setdefault(path.rsplit("/", 1)[1], set()).add(path)
+        if text is not None:
+            self.update(path, text)
+
+    def update(self, path, text):
+        """Индексирует новое содержимое файла; старые записи остаются недостижимыми"""
+        self._forget(path)
+        file_id = len(self._paths)
+        self._paths.append(path)
+        self._ids[path] = file_id
+        postings = self.postings
+        for trigram in trigrams(fold(text)):
+            posting = postings.get(trigram)
+            if posting is None:
+                postings[trigram] = posting = array('I')
+            posting.append(file_id)
+
+    def remove(self, path):
+        """Удаляет узел из индекса"""
+        paths = self.names.get(path.rsplit("/", 1)[1])
+        if paths is not None:
+            paths.discard(path)
+        self._forget(path)
+
+    def rename(self, old_path, new_path):
+        """Переносит узел на новый путь, сохраняя проиндексированное содержимое"""
+        paths = self.names.get(old_path.rsplit("/", 1)[1])
+        if paths is not None:
+            paths.discard(old_path)
+        self.names.setdefault(new_path.rsplit("/", 1)[1], set()).add(new_path)
+        file_id = self._ids.pop(old_path, None)
+        if file_id is not None:
+            self._paths[file_id] = new_path
+            self._ids[new_path] = file_id
+
+    def _forget(self, path):
+        """Помечает прежний идентификатор файла удаленным"""
+        file_id = self._ids.pop(path, None)
+        if file_id is not None:
+            self._paths[file_id] = None
+
+    def match_names(self, pattern, ignore_case=False):
+        """Пути узлов, имя которых соответствует glob-шаблону"""
+        if ignore_case:
+            pattern = pattern.lower()
+            names = [name for name in self.names if fnmatch.fnmatchcase(name.lower(), pattern)]
+        else:
+            names = fnmatch.filter(self.names, pattern) if any(c in pattern for c in "*?[") else [pattern]
+
+        result = []
+        for name in names:
+            result.extend(self.names.get(name, ()))
+        return result
+
+    def candidates(self, pattern, ignore_case=False):
+        """Файлы, которые могут содержать совпадение с регулярным выражением (None - любые файлы)
+
+        ignore_case - поиск с re.IGNORECASE: его соответствия букв вне ASCII шире, чем fold,
+        поэтому такие подстроки индекс не сужает.
+        """
+        literals = required_literals(pattern)
+        if ignore_case and not all(literal.isascii() for literal in literals):
+            return None
+        required = set()
+        for literal in literals:
+            required |= trigrams(fold(literal))
+        if not required:
+            return None
+
+        postings = sorted((self.postings.get(trigram, ()) for trigram in required), key=len)
+        file_ids = set(postings[0])
+        for posting in postings[1:]:
+            if not file_ids:
+                break
+            file_ids.intersection_update(posting)
+
+        paths = self._paths
+        return [paths[file_id] for file_id in file_ids if paths[file_id] is not None]
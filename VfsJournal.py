@@ -0,0 +1,172 @@
+import os
+import struct
+import zlib
+
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_GROUP_SIZE = 4096  # Записей на один fsync, если группу не завершили раньше (commit)
+JOURNAL_CHECKPOINT_SIZE = 64 * 1024 * 1024  # Размер журнала, после которого он сворачивается в архив
+
+# Заголовок журнала: сигнатура и штамп архива (размер, mtime, inode), к которому применяются записи
+HEADER = struct.Struct("<8s3Q")
+MAGIC = b"VFSJRNL1"
+# Запись: длина тела и его CRC32, затем тело - код операции, время в нс и поля с длиной
+RECORD = struct.Struct("<2I")
+BODY = struct.Struct("<BQ")
+FIELD = struct.Struct("<I")
+
+# Операции журнала: поля - абсолютные пути и содержимое файлов
+OP_CREATE = 1     # путь, содержимое (touch)
+OP_WRITE = 2      # путь, содержимое
+OP_APPEND = 3     # путь, дописанные данные
+OP_REMOVE = 4     # путь файла
+OP_MKDIR = 5      # путь со всеми недостающими родителями
+OP_RMDIR = 6      # путь директории со всем содержимым
+OP_MOVE = 7       # источник, итоговый путь
+OP_COPY = 8       # источник, итоговый путь файла
+OP_COPY_DIR = 9   # источник, итоговый путь директории
+
+
+def image_stamp(image_path):
+    """Штамп архива: после сохранения изменений он другой, и старый журнал к архиву не применяется"""
+    try:
+        stat = os.stat(image_path)
+    except FileNotFoundError:
+        return 0, 0, 0  # Архива еще нет - журнал применяется к VFS по умолчанию
+    return stat.st_size, stat.st_mtime_ns, stat.st_ino
+
+
+def _fsync_path(path):
+    """Сбрасывает на диск файл или директорию"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _valid_length(data):
+    """Длина целой части журнала (до первой оборванной или поврежденной записи) и число записей в ней"""
+    offset = HEADER.size
+    count = 0
+    end = len(data)
+    while offset + RECORD.size <= end:
+        length, crc = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        if start + length > end or zlib.crc32(data[start:start + length]) != crc:
+            break
+        offset = start + length
+        count += 1
+    return offset, count
+
+
+def _iter_records(data):
+    """Записи целой части журнала: (операция, время в нс, список полей bytes)"""
+    offset = HEADER.size
+    end = len(data)
+    while offset < end:
+        length, _ = RECORD.unpack_from(data, offset)
+        start = offset + RECORD.size
+        offset = start + length
+        op, modified = BODY.unpack_from(data, start)
+        fields = []
+        position = start + BODY.size
+        while position < offset:
+            size, = FIELD.unpack_from(data, position)
+            position += FIELD.size
+            fields.append(data[position:position + size])
+            position += size
+        yield op, modified, fields
+
+
+class VfsJournal:
+    """Журнал изменений VFS, дописываемый рядом с архивом (write-ahead log)
+
+    Каждая запись сразу передается ОС одним write и переживает аварийное завершение процесса;
+    fsync выполняется один раз на группу записей (commit - после каждой строки команд) и
+    защищает от сбоя системы. При загрузке записи журнала применяются к архиву, сохранение
+    изменений в архив (checkpoint) начинает журнал заново.
+    """
+
+    def __init__(self, image_path, group_size=JOURNAL_GROUP_SIZE):
+        self.image_path = image_path
+        self.path = image_path + JOURNAL_SUFFIX
+        self.group_size = group_size  # 1 - fsync после каждой записи
+        self.size = 0      # Байт в журнале
+        self.records = 0   # Записей в журнале
+        self.commits = 0   # Выполненных fsync
+        self._pending = 0  # Записей после последнего fsync
+        self._fd = None
+
+    def recover(self):
+        """Открывает журнал для дописывания и возвращает итератор его записей для текущего архива
+
+        Оборванная при сбое последняя запись отбрасывается; журнал от другой версии архива
+        (сбой между сохранением архива и сбросом журнала) уже учтен в архиве и начинается заново.
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        if data[:HEADER.size] != HEADER.pack(MAGIC, *image_stamp(self.image_path)):
+            self.checkpoint()
+            return iter(())
+
+        valid, self.records = _valid_length(data)
+        if valid < len(data):
+            os.truncate(self.path, valid)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self.size = valid
+        return _iter_records(memoryview(data)[:valid])
+
+    def append(self, op, modified, *fields):
+        """Дописывает запись об изменении; fsync - когда набралась группа"""
+        parts = [BODY.pack(op, modified)]
+        for field in fields:
+            if isinstance(field, str):
+                field = field.encode('utf-8')
+            parts.append(FIELD.pack(len(field)))
+            parts.append(field)
+        body = b"".join(parts)
+        record = RECORD.pack(len(body), zlib.crc32(body)) + body
+        os.write(self._fd, record)
+        self.size += len(record)
+        self.records += 1
+        self._pending += 1
+        if self._pending >= self.group_size:
+            self.commit()
+
+    def commit(self):
+        """Завершает группу записей: один fsync на все записи после предыдущего"""
+        if self._pending:
+            os.fsync(self._fd)
+            self._pending = 0
+            self.commits += 1
+
+    def checkpoint(self):
+        """Начинает пустой журнал для сохраненного архива
+
+        Архив сбрасывается на диск до замены журнала: после сбоя либо старый журнал применяется
+        к старому архиву, либо новый архив открывается с пустым журналом.
+        """
+        if os.path.exists(self.image_path):
+            _fsync_path(self.image_path)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, *image_stamp(self.image_path)))
+            f.flush()
+            os.fsync(f.fileno())
+        self.close()
+        os.replace(tmp_path, self.path)
+        _fsync_path(os.path.dirname(os.path.abspath(self.path)))
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        self.size = HEADER.size
+        self.records = 0
+        self._pending = 0
+
+    def close(self):
+        """Сбрасывает последнюю группу записей и закрывает журнал"""
+        if self._fd is not None:
+            self.commit()
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,124 @@
+from datetime import datetime
+from enum import Enum
+from functools import lru_cache
+import time
+
+
+class NodeType(Enum):
+    """Тип узла VFS"""
+    FILE = "file"
+    DIRECTORY = "directory"
+
+
+def ns_to_iso(timestamp_ns):
+    """Переводит время в наносекундах эпохи в строку ISO 8601"""
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat()
+
+
+def ns_to_display(timestamp_ns):
+    """Переводит время в наносекундах эпохи в краткую строку для ls -l"""
+    return _minute_to_display(timestamp_ns // 60_000_000_000)
+
+
+@lru_cache(maxsize=4096)
+def _minute_to_display(minute):
+    """Строка времени с точностью до минуты; у файлов одной загрузки она общая"""
+    return datetime.fromtimestamp(minute * 60).strftime("%Y-%m-%d %H:%M")
+
+
+def iso_to_ns(value):
+    """Переводит строку ISO 8601 во время в наносекундах эпохи"""
+    return int(datetime.fromisoformat(value).timestamp() * 1e9)
+
+
+class FileNode:
+    """Файл VFS: содержимое (bytes или memoryview на архив) и временные метки в нс"""
+    __slots__ = ("content", "source", "created", "modified")
+    type = NodeType.FILE
+
+    def __init__(self, content=b"", source=None, created=None, modified=None):
+        if created is None:
+            created = time.time_ns()
+        self.content = content
+        self.source = source  # ZipInfo для ленивой загрузки содержимого из архива
+        self.created = created
+        self.modified = created if modified is None else modified
+
+    def copy(self):
+        """Копия узла с тем же содержимым (содержимое не копируется)"""
+        return FileNode(self.content, self.source, self.created, self.modified)
+
+    @property
+    def size(self):
+        """Размер содержимого файла"""
+        if self.content is None and self.source is not None:
+            return self.source.file_size
+        return len(self.content)
+
+    def __getitem__(self, key):
+        """Доступ в старом формате словаря: node["type"], node["content"], node["created"], ..."""
+        if key == "type":
+            return self.type.value
+        if key == "content":
+            return None if self.content is None else str(self.content, 'utf-8', errors='replace')
+        if key in ("created", "modified"):
+            return ns_to_iso(getattr(self, key))
+        if key == "size":
+            return self.size
+        if key == "zipinfo" and self.source is not None:
+            return self.source
+        if key == "crc" and self.source is not None:
+            return self.source.CRC
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        """Запись в старом формате словаря"""
+        if key == "content":
+            self.content = value.encode('utf-8') if isinstance(value, str) else value
+        elif key in ("created", "modified"):
+            setattr(self, key, iso_to_ns(value) if isinstance(value, str) else value)
+        else:
+            raise KeyError(key)
+
+
+class DirNode:
+    """Директория VFS: словарь имя -> дочерний узел и сводные данные поддерева"""
+    __slots__ = ("children", "total_size", "file_count", "modified", "owner")
+    type = NodeType.DIRECTORY
+
+    def __init__(self, children=None, modified=None):
+        self.children = {} if children is None else children
+        # Сводные данные поддерева поддерживает VirtualFileSystem
+        self.total_size = 0  # Суммарный размер файлов, байт
+        self.file_count = 0
+        self.modified = time.time_ns() if modified is None else modified  # Последнее изменение в поддереве
+        self.owner = None  # Поколение VFS, которому принадлежит узел (см. VirtualFileSystem.fork)
+
+    def copy(self, owner):
+        """Копия директории для копирования при записи: дочерние узлы общие"""
+        node = DirNode(dict(self.children), self.modified)
+        node.total_size = self.total_size
+        node.file_count = self.file_count
+        node.owner = owner
+        return node
+
+    def child(self, name):
+        """Дочерний узел по имени или None"""
+        return self.children.get(name)
+
+    @property
+    def size(self):
+        """Суммарный размер файлов поддерева"""
+        return self.total_size
+
+    def __getitem__(self, key):
+        """Доступ в старом формате словаря: node["type"], node["content"], ..."""
+        if key == "type":
+            return self.type.value
+        if key == "content":
+            return self.children
+        if key == "modified":
+            return ns_to_iso(self.modified)
+        if key == "size":
+            return self.total_size
+        raise KeyError(key)
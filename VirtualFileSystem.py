@@ -1,141 +1,354 @@
-import base64
-from datetime import datetime
+from collections import OrderedDict
+import copy
+import fnmatch
+import io
 import os
+import sys
+import time
 import zipfile
 
+from VfsArchive import VfsArchive, append_members, can_remove_members, write_archive
+from VfsBlobs import BlobStore
+from VfsImage import IMAGE_SUFFIX, VfsImage, is_image, write_image
+from VfsIndex import VfsIndex
+from VfsJournal import (JOURNAL_CHECKPOINT_SIZE, OP_APPEND, OP_COPY, OP_COPY_DIR, OP_CREATE, OP_MKDIR, OP_MOVE,
+                        OP_REMOVE, OP_RMDIR, OP_WRITE, VfsJournal)
+from VfsNodes import DirNode, FileNode, NodeType, ns_to_iso
+
+# Перемещаемое поддерево с большим числом файлов не переиндексируется: плоский индекс сбрасывается
+# и заполняется по мере обращений, а изменения сохраняются перезаписью архива
+REKEY_LIMIT = 4096
+
 
 class VirtualFileSystem:
     """Виртуальная файловая система на основе ZIP-архива"""
 
-    def __init__(self, vfs_path=None):
+    def __init__(self, vfs_path=None, lazy=False, cache_size=64 * 1024 * 1024, workers=1, out=None,
+                 search_index=False, journal=False):
         """Инициализация VFS: загружает из архива или создает по умолчанию"""
+        self.out = out or sys.stdout  # Поток для сообщений VFS
         self.vfs_path = vfs_path
         self.filesystem = {}
         self.current_vfs_dir = "/"
 
+        # Ленивый режим: содержимое файлов читается из архива при первом обращении
+        self.lazy = lazy
+        self.workers = workers  # Потоков распаковки при полной загрузке
+        self._archive = None
+        self._archive_shared = False  # На архив ссылаются ленивые узлы ответвлений
+        self.image_format = False  # Загружен образ VFS (.vfsimg), а не ZIP-архив
+        self._content_cache = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_bytes = 0
+
+        # Содержимое прочитанных и созданных файлов: одинаковое хранится один раз
+        self.blobs = BlobStore()
+
+        # Изменения с момента загрузки или последнего сохранения: абсолютные пути
+        self._changed = set()
+        self._removed = set()
+        self._rewrite = False  # Изменения можно сохранить только перезаписью архива (compact)
+        self._detached = False  # Архив на диске перезаписан, узлы читают из прежнего отображения
+
+        # Поисковый индекс имен и триграмм содержимого для find и grep -r
+        self.index_on_load = search_index
+        self.search_index = None
+
+        # Копирование при записи: узлы чужого поколения общие со снимками и ответвлениями VFS
+        self._generation = None  # None - дерево ни с кем не разделено
+        self._index_complete = True  # False - плоский индекс заполняется по мере обращений
+        self.snapshots = {}
+
+        # Журнал изменений рядом с архивом: изменения переживают сбой до сохранения в архив
+        self.journal = None
+        self.checkpoint_size = JOURNAL_CHECKPOINT_SIZE
+
+        loaded = True
         if vfs_path and os.path.exists(vfs_path):
-            self.load_vfs(vfs_path)
+            loaded = self.load_vfs(vfs_path)
         else:
             # Создаем минимальную VFS по умолчанию
             self.filesystem = {
-                "/": {
-                    "type": "directory",
-                    "content": {
-                        "home": {
-                            "type": "directory",
-                            "content": {
-                                "text.txt": {
-                                    "type": "file",
-                                    "content": "Текст файла",
-                                    "created": datetime.now().isoformat(),
-                                    "modified": datetime.now().isoformat()
-                                }
-                            },
-                        },
-                        "tmp": {"type": "directory", "content": {}},
-                        "readme.txt": {
-                            "type": "file",
-                            "content": "Добро пожаловать в VFS!",
-                            "created": datetime.now().isoformat(),
-                            "modified": datetime.now().isoformat()
-                        }
-                    }
-                }
+                "/": DirNode({
+                    "home": DirNode({
+                        "text.txt": self._new_file("Текст файла".encode('utf-8')),
+                    }),
+                    "tmp": DirNode(),
+                    "readme.txt": self._new_file("Добро пожаловать в VFS!".encode('utf-8')),
+                })
             }
+            self._build_index()
+
+        if journal and vfs_path and loaded:
+            self._open_journal()
 
     def load_vfs(self, vfs_path):
-        """Загружает структуру VFS из ZIP-архива в память"""
+        """Загружает VFS из ZIP-архива или образа VFS (формат - по содержимому файла); False - файл не прочитан"""
+        self._changed.clear()
+        self._removed.clear()
+        self._rewrite = False
+        self._detached = False
+        self.snapshots.clear()  # Ленивые узлы снимков ссылаются на смещения в прежнем архиве
+        self.blobs = BlobStore()
+        self.image_format = False
         try:
-            if not zipfile.is_zipfile(vfs_path):
-                raise ValueError("Файл не является ZIP-архивом")
-
-            with zipfile.ZipFile(vfs_path, 'r') as zip_ref:
-                self.filesystem = {"/": {"type": "directory", "content": {}}}
-
-                for file_info in zip_ref.filelist:
-                    path_parts = file_info.filename.split('/')
-                    current_dir = self.filesystem["/"]["content"]
-
-                    # Строим структуру директорий
-                    for i, part in enumerate(path_parts):
-                        if i == len(path_parts) - 1:  # Файл
-                            if part:  # Не пустое имя файла
-                                with zip_ref.open(file_info.filename) as f:
-                                    content = f.read()
-                                    # Пытаемся декодировать как текст, иначе оставляем бинарным
-                                    try:
-                                        content = content.decode('utf-8')
-                                    except UnicodeDecodeError:
-                                        content = base64.b64encode(content).decode('utf-8')
-
-                                current_dir[part] = {
-                                    "type": "file",
-                                    "content": content,
-                                    "created": datetime.now().isoformat(),
-                                    "modified": datetime.now().isoformat()
-                                }
-                        else:  # Директория
-                            if part not in current_dir:
-                                current_dir[part] = {
-                                    "type": "directory",
-                                    "content": {}
-                                }
-                            current_dir = current_dir[part]["content"]
-
-                print(f"VFS успешно загружена из {vfs_path}")
+            if is_image(vfs_path):
+                self._load_image(vfs_path)
+            elif not zipfile.is_zipfile(vfs_path):
+                raise ValueError("Файл не является ZIP-архивом или образом VFS")
+            elif self.lazy:
+                self._load_vfs_lazy(vfs_path)
+            else:
+                self._load_vfs_eager(vfs_path)
+            print(f"VFS успешно загружена из {vfs_path}", file=self.out)
+            loaded = True
 
         except Exception as e:
-            print(f"Ошибка загрузки VFS: {e}")
+            print(f"Ошибка загрузки VFS: {e}", file=self.out)
             # Создаем минимальную VFS при ошибке
+            self.blobs = BlobStore()
             self.filesystem = {
-                "/": {
-                    "type": "directory",
-                    "content": {
-                        "error.txt": {
-                            "type": "file",
-                            "content": f"Ошибка загрузки VFS: {e}",
-                            "created": datetime.now().isoformat(),
-                            "modified": datetime.now().isoformat()
-                        }
-                    }
-                }
+                "/": DirNode({
+                    "error.txt": self._new_file(f"Ошибка загрузки VFS: {e}".encode('utf-8')),
+                })
             }
+            loaded = False
 
-    def resolve_path(self, path):
-        """Преобразует путь в указатель на содержимое директории в VFS"""
-        path = os.path.normpath(path).replace('\\', '/')
-        if path.startswith("/"):
-            current_dir = self.filesystem["/"]["content"]
-            path_parts = path[1:].split("/")
+        self._build_index()
+        return loaded
+
+    def _load_vfs_eager(self, vfs_path):
+        """Читает все файлы архива: несжатые - срезами mmap, сжатые - распаковкой в память"""
+        self._close_archive()
+        self._archive = VfsArchive(vfs_path)
+        if self.workers <= 1:
+            self._build_tree(self._archive, self._archive.read)
+            return
+
+        # Дерево строится последовательно, распаковка содержимого - в пуле потоков
+        from concurrent.futures import ThreadPoolExecutor  # Заметно замедляет импорт модуля
+        nodes = self._build_tree(self._archive, None)
+        with ThreadPoolExecutor(self.workers) as pool:
+            contents = pool.map(lambda node: self._archive.read(node.source), nodes)
+            for node, content in zip(nodes, contents):
+                node.content = self.blobs.add(content)
+                node.source = None
+
+    def _load_vfs_lazy(self, vfs_path):
+        """Строит дерево VFS только по центральному каталогу архива, не читая содержимое файлов"""
+        self._close_archive()
+        self._archive = VfsArchive(vfs_path)
+        self._build_tree(self._archive, None)
+
+    def _load_image(self, vfs_path):
+        """Открывает образ VFS: дерево не строится, директории разворачиваются из таблицы узлов при обращении"""
+        self._close_archive()
+        self._archive = VfsImage(vfs_path)
+        self.filesystem = {"/": self._archive.root()}
+        self.image_format = True
+
+    def _build_tree(self, zip_ref, read_member):
+        """Строит дерево узлов по файлам архива и возвращает список файловых узлов"""
+        # read_member=None - содержимое не читается, узлы ссылаются на ZipInfo
+        now = time.time_ns()
+        root = DirNode(modified=now)
+        nodes = []
+        self.filesystem = {"/": root}
+
+        for file_info in zip_ref.infolist():
+            *dir_parts, name = file_info.filename.split('/')
+            current_dir = root.children
+
+            # Строим структуру директорий
+            for part in dir_parts:
+                if part not in current_dir:
+                    current_dir[part] = DirNode(modified=now)
+                current_dir = current_dir[part].children
+
+            if name:  # Не пустое имя файла
+                if read_member is None:
+                    node = FileNode(None, file_info, now, now)
+                else:
+                    node = self._new_file(read_member(file_info), now, now)
+                current_dir[name] = node
+                nodes.append(node)
+        return nodes
+
+    def _new_file(self, content, created=None, modified=None):
+        """Файловый узел, содержимое которого хранится в хранилище блобов"""
+        return FileNode(self.blobs.add(content), None, created, modified)
+
+    def _close_archive(self):
+        """Закрывает архив VFS и очищает кэш содержимого
+
+        Архив, общий с ответвлениями, не закрывается, а только отпускается: их ленивые узлы читают
+        из него, и отображение освободится сборщиком мусора вместе с последним ответвлением.
+        """
+        if self._archive is not None:
+            if not self._archive_shared:
+                self._archive.close()
+            self._archive = None
+            self._archive_shared = False
+        self._content_cache.clear()
+        self._cache_bytes = 0
+
+    def _load_content(self, file_info):
+        """Читает содержимое файла из архива; распакованные файлы хранятся в ограниченном LRU-кэше"""
+        if self._archive.is_zero_copy(file_info):
+            return self._archive.read(file_info)  # Срез mmap - кэшировать нечего
+
+        key = file_info.filename
+        if key in self._content_cache:
+            self._content_cache.move_to_end(key)
+            return self._content_cache[key]
+
+        content = self._archive.read(file_info)
+
+        size = len(content)
+        if size <= self._cache_size:
+            self._content_cache[key] = content
+            self._cache_bytes += size
+            while self._cache_bytes > self._cache_size:
+                _, evicted = self._content_cache.popitem(last=False)
+                self._cache_bytes -= len(evicted)
+        return content
+
+    def _build_index(self):
+        """Строит плоский индекс: абсолютный путь -> узел дерева VFS
+
+        Дерево образа VFS не обходится: сводные данные хранятся в образе, а индекс заполняется
+        по мере обращений.
+        """
+        root = self.filesystem["/"]
+        self._index = {"/": root}
+        directories = []
+        stack = [] if self.image_format else [("", root)]
+        while stack:
+            dir_path, dir_node = stack.pop()
+            directories.append(dir_node)
+            for name, node in dir_node.children.items():
+                node_path = f"{dir_path}/{name}"
+                self._index[node_path] = node
+                if node.type is NodeType.DIRECTORY:
+                    stack.append((node_path, node))
+
+        # Сводные данные считаются снизу вверх: в обратном порядке обхода дети идут раньше родителей
+        for dir_node in reversed(directories):
+            total_size = file_count = 0
+            modified = dir_node.modified
+            for node in dir_node.children.values():
+                if node.type is NodeType.DIRECTORY:
+                    total_size += node.total_size
+                    file_count += node.file_count
+                else:
+                    total_size += node.size
+                    file_count += 1
+                if node.modified > modified:
+                    modified = node.modified
+            dir_node.total_size = total_size
+            dir_node.file_count = file_count
+            dir_node.modified = modified
+
+        self.current_vfs_dir = "/"
+        self._cwd_node = root
+        self._generation = None
+        self._index_complete = not self.image_format
+
+        # Индекс, построенный по запросу, перестраивается вместе с деревом
+        rebuild = self.index_on_load or self.search_index is not None
+        self.search_index = None
+        if rebuild:
+            self.build_search_index()
+
+    def _update_aggregates(self, path, size_delta, count_delta, modified):
+        """Обновляет сводные данные всех директорий-предков path: O(глубины пути)"""
+        dir_path = path
+        while dir_path:
+            dir_path = dir_path.rsplit("/", 1)[0]
+            dir_node = self._node(dir_path or "/")
+            dir_node.total_size += size_delta
+            dir_node.file_count += count_delta
+            if modified > dir_node.modified:
+                dir_node.modified = modified
+
+    def build_search_index(self):
+        """Строит поисковый индекс по всем узлам VFS; содержимое файлов читается целиком"""
+        self.search_index = VfsIndex()
+        count = 0
+        for path, node in self._walk("/"):
+            if path != "/":
+                self._index_node(path, node)
+                count += 1
+        return count
+
+    def _index_node(self, path, node):
+        """Добавляет узел в поисковый индекс, если он построен"""
+        if self.search_index is None:
+            return
+        if node.type is NodeType.FILE:
+            self.search_index.add(path, str(self._file_bytes(node), 'utf-8', errors='replace'))
         else:
-            current_dir = self.get_current_dir_content()
-            path_parts = path.split("/")
+            self.search_index.add(path)
 
-        if ".." in os.path.normpath(os.path.join(self.current_vfs_dir, path)):  # Проверка на выход из корнивой директории
-            print('Путь выходит за пределы корневой директории')
-            return None
+    def _normalize(self, path):
+        """Приводит путь к абсолютному виду, раскрывая '.' и '..' относительно текущей директории"""
+        path = path.replace('\\', '/')
+        if not path.startswith("/"):
+            path = f"{self.current_vfs_dir}/{path}"
 
-        for part in path_parts:
+        parts = []
+        for part in path.split("/"):
             if not part or part == ".":
                 continue
-            elif ".." in part and path.count('.') == len(path):
-                current_vfs_dir = self.current_vfs_dir
-                for step in range(len(part) - 1): current_vfs_dir = os.path.dirname(current_vfs_dir)
-                current_dir = self.resolve_path(current_vfs_dir)
-
-            elif part in current_dir and current_dir[part]["type"] == "directory":
-                current_dir = current_dir[part]["content"]
+            if part == "..":
+                if not parts:  # Проверка на выход из корневой директории
+                    print('Путь выходит за пределы корневой директории', file=self.out)
+                    return None
+                parts.pop()
             else:
-                return None  # Путь не найден
+                parts.append(part)
+        return "/" + "/".join(parts)
 
-        return current_dir
+    def _node(self, abs_path):
+        """Узел по абсолютному нормализованному пути; при неполном индексе - спуском по дереву
+
+        Спуск не разворачивает директории образа VFS: ребенок ищется двоичным поиском в таблице узлов.
+        """
+        node = self._index.get(abs_path)
+        if node is None and not self._index_complete:
+            node = self.filesystem["/"]
+            for part in abs_path.split("/")[1:] if abs_path != "/" else ():
+                if node.type is not NodeType.DIRECTORY:
+                    return None
+                node = node.child(part)
+                if node is None:
+                    return None
+            self._index[abs_path] = node
+        return node
+
+    def _lookup(self, path):
+        """Находит узел по пути через плоский индекс"""
+        node = self._index.get(path)  # Абсолютный нормализованный путь - без разбора
+        if node is not None:
+            return node
+        abs_path = self._normalize(path)
+        if abs_path is None:
+            return None
+        return self._node(abs_path)
+
+    def resolve_path(self, path):
+        """Преобразует путь в указатель на содержимое директории в VFS"""
+        node = self._lookup(path)
+        if node is None or node.type is not NodeType.DIRECTORY:
+            return None  # Путь не найден
+        return node.children
 
     def get_current_dir_content(self):
         """Возвращает содержимое текущей рабочей директории VFS"""
-        return self.resolve_path(self.current_vfs_dir)
+        return self._cwd_node.children
 
-    def list_directory(self, path=".") -> None|list:
-        """Возвращает список файлов и папок в указанной директории VFS"""
+    def list_entries(self, path="."):
+        """Возвращает пары (имя, узел) директории VFS или None, если директории нет"""
         if path == ".":
             dir_content = self.get_current_dir_content()
         else:
@@ -143,92 +356,742 @@ class VirtualFileSystem:
 
         if dir_content is None:
             return None
+        return list(dir_content.items())
 
-        items = []
-        for name, info in dir_content.items():
-            items.append((name, info["type"]))
-        return items
+    def list_directory(self, path=".") -> None|list:
+        """Возвращает список файлов и папок в указанной директории VFS"""
+        entries = self.list_entries(path)
+        if entries is None:
+            return None
+        return [(name, node.type.value) for name, node in entries]
+
+    def stat(self, path):
+        """Возвращает абсолютный путь и узел VFS или None, если пути нет"""
+        node = self._index.get(path)  # Ключи индекса - абсолютные нормализованные пути
+        if node is not None:
+            return path, node
+        abs_path = self._normalize(path)
+        node = None if abs_path is None else self._node(abs_path)
+        if node is None:
+            return None
+        return abs_path, node
+
+    def iter_directories(self, path="."):
+        """Обходит директории поддерева path в прямом порядке: пары (абсолютный путь, узел)"""
+        found = self.stat(path)
+        if found is None or found[1].type is not NodeType.DIRECTORY:
+            return
+        stack = [found]
+        while stack:
+            dir_path, dir_node = stack.pop()
+            yield dir_path, dir_node
+            prefix = "" if dir_path == "/" else dir_path
+            subdirs = [(f"{prefix}/{name}", node) for name, node in dir_node.children.items()
+                       if node.type is NodeType.DIRECTORY]
+            stack.extend(reversed(subdirs))
 
     def change_directory(self, path):
         """Изменяет текущую рабочую директорию в VFS"""
-        if path == "/":
-            self.current_vfs_dir = "/"
-            return True
-        elif path.startswith("/"):
-            new_dir = self.resolve_path(path)
+        abs_path = self._normalize(path)
+        if abs_path is None:
+            return False
+
+        node = self._node(abs_path)
+        if node is None or node.type is not NodeType.DIRECTORY:
+            return False
+
+        self.current_vfs_dir = abs_path
+        self._cwd_node = node
+        return True
+
+    def _walk(self, abs_path, node=None):
+        """Обходит поддерево: пары (абсолютный путь, узел), начиная с самого abs_path
+
+        node - корень поддерева, уже отсоединенного от дерева или еще не присоединенного к нему.
+        """
+        if node is None:
+            node = self._node(abs_path)
+        yield abs_path, node
+        if node.type is not NodeType.DIRECTORY:
+            return
+        stack = [("" if abs_path == "/" else abs_path, node)]
+        while stack:
+            dir_path, dir_node = stack.pop()
+            for name, child in dir_node.children.items():
+                child_path = f"{dir_path}/{name}"
+                yield child_path, child
+                if child.type is NodeType.DIRECTORY:
+                    stack.append((child_path, child))
+
+    def _subtree_paths(self, abs_path, paths):
+        """Оставляет из paths только пути внутри поддерева abs_path"""
+        if abs_path == "/":
+            return list(paths)
+        prefix = abs_path + "/"
+        return [path for path in paths if path == abs_path or path.startswith(prefix)]
+
+    def find(self, path=".", name=None, ignore_case=False, predicate=None):
+        """Ищет узлы в поддереве path по glob-шаблону имени и условию predicate(node)
+
+        Возвращает отсортированный список абсолютных путей или None, если пути нет.
+        """
+        abs_path = self._normalize(path)
+        if abs_path is None or self._node(abs_path) is None:
+            return None
+
+        if name is not None and self.search_index is not None:
+            paths = self._subtree_paths(abs_path, self.search_index.match_names(name, ignore_case))
+            if abs_path == "/" and self._name_matches("/", name, ignore_case):
+                paths.append("/")  # Корня с пустым именем в индексе имен нет
         else:
-            new_path = os.path.join(self.current_vfs_dir, path).replace("\\", "/")
-            new_dir = self.resolve_path(new_path)
+            paths = [node_path for node_path, _ in self._walk(abs_path)
+                     if name is None or self._name_matches(node_path, name, ignore_case)]
 
-        if new_dir is not None:
-            # Сохраняем нормализованный путь
-            if path.startswith("/"):
-                self.current_vfs_dir = path
-            else:
-                self.current_vfs_dir = os.path.normpath(
-                    os.path.join(self.current_vfs_dir, path)
-                ).replace("\\", "/")
-            return True
-        return False
+        if predicate is not None:
+            paths = [node_path for node_path in paths if predicate(self._node(node_path))]
+        return sorted(paths)
+
+    @staticmethod
+    def _name_matches(path, pattern, ignore_case):
+        """Соответствует ли имя узла glob-шаблону"""
+        name = path.rsplit("/", 1)[1]
+        if ignore_case:
+            return fnmatch.fnmatchcase(name.lower(), pattern.lower())
+        return fnmatch.fnmatchcase(name, pattern)
+
+    def grep_candidates(self, path=".", pattern=None, ignore_case=False):
+        """Файлы поддерева path, которые могут содержать совпадение с pattern (None - все файлы)
+
+        С поисковым индексом остаются только файлы со всеми триграммами обязательных подстрок шаблона.
+        Возвращает отсортированный список абсолютных путей или None, если пути нет.
+        """
+        abs_path = self._normalize(path)
+        if abs_path is None or self._node(abs_path) is None:
+            return None
+
+        candidates = None
+        if pattern is not None and self.search_index is not None:
+            candidates = self.search_index.candidates(pattern, ignore_case)
+        if candidates is None:
+            return sorted(node_path for node_path, node in self._walk(abs_path) if node.type is NodeType.FILE)
+        return sorted(self._subtree_paths(abs_path, candidates))
+
+    def _file_bytes(self, node):
+        """Возвращает содержимое файлового узла (bytes или memoryview), при необходимости читая его из архива"""
+        if node.content is None and node.source is not None:
+            return self._load_content(node.source)
+        return node.content
+
+    def read_bytes(self, path):
+        """Читает содержимое файла из VFS без декодирования"""
+        node = self._lookup(path)
+        if node is None or node.type is not NodeType.FILE:
+            return None
+        return bytes(self._file_bytes(node))
 
     def read_file(self, path):
-        """Читает и возвращает содержимое файла из VFS"""
-        if path.startswith("/"):
-            dir_path = os.path.dirname(path).replace("\\", "/")
-        else:
-            dir_path = os.path.join(self.current_vfs_dir, os.path.dirname(path)).replace("\\", "/")
+        """Читает и возвращает содержимое файла из VFS как текст"""
+        view = self.read_file_view(path)
+        if view is None:
+            return None
+        return str(view, 'utf-8', errors='replace')
+
+    def read_file_view(self, path, start=0, end=None):
+        """Возвращает memoryview на диапазон [start:end) содержимого файла без копирования"""
+        node = self._lookup(path)
+        if node is None or node.type is not NodeType.FILE:
+            return None
+        return memoryview(self._file_bytes(node))[start:end]
+
+    def _split_path(self, path):
+        """Возвращает нормализованный путь, узел родительской директории и имя файла"""
+        abs_path = self._normalize(path)
+        if abs_path is None or abs_path == "/":
+            return abs_path, None, None
+
+        dir_path, filename = abs_path.rsplit("/", 1)
+        dir_node = self._node(dir_path or "/")
+        if dir_node is None or dir_node.type is not NodeType.DIRECTORY:
+            return abs_path, None, filename
+        return abs_path, dir_node, filename
 
-        filename = os.path.basename(path)
-        dir_content = self.resolve_path(dir_path)
+    def _own_dir(self, dir_path):
+        """Директория, которую можно изменять: общие со снимками директории пути копируются от корня (O(глубины))"""
+        node = self._node(dir_path)
+        generation = self._generation
+        if generation is None or node.owner is generation:
+            return node  # Предки директории этого поколения тоже принадлежат ему
 
-        if dir_content and filename in dir_content and dir_content[filename]["type"] == "file":
-            return dir_content[filename]["content"]
-        return None
+        parent = self.filesystem["/"]
+        if parent.owner is not generation:
+            parent = self.filesystem["/"] = self._index["/"] = parent.copy(generation)
+        path = ""
+        for part in dir_path.split("/")[1:] if dir_path != "/" else ():
+            path = f"{path}/{part}"
+            child = parent.children[part]
+            if child.owner is not generation:
+                child = parent.children[part] = self._index[path] = child.copy(generation)
+            parent = child
 
-    def create_file(self, path, content="", display_time=False):
+        self._cwd_node = self._node(self.current_vfs_dir)  # Текущая директория могла быть скопирована
+        return parent
+
+    def _own_parent(self, abs_path):
+        """Изменяемая родительская директория узла abs_path"""
+        return self._own_dir(abs_path.rsplit("/", 1)[0] or "/")
+
+    def _own_file(self, abs_path):
+        """Файл, который можно изменять: при разделенном дереве узел заменяется копией"""
+        dir_node = self._own_parent(abs_path)
+        filename = abs_path.rsplit("/", 1)[1]
+        node = dir_node.children[filename]
+        if self._generation is not None:
+            node = dir_node.children[filename] = self._index[abs_path] = node.copy()
+        return node
+
+    def fork(self):
+        """Ответвление VFS за O(1): дерево общее, изменения каждой стороны копируются при записи
+
+        Ответвление не связано с архивом (сохранить его нельзя), но читает из него ленивые файлы.
+        """
+        self._archive_shared = True  # Ленивые узлы ответвления читают из того же архива
+        fork = copy.copy(self)
+        root = self.filesystem["/"]
+        fork.filesystem = {"/": root}
+        fork._index = {"/": root}
+        fork._index_complete = False
+        fork._cwd_node = fork._node(self.current_vfs_dir)
+        fork.vfs_path = None
+        fork._content_cache = OrderedDict()
+        fork._cache_bytes = 0
+        fork._changed = set()
+        fork._removed = set()
+        fork._rewrite = False
+        fork._detached = False
+        fork.search_index = None
+        fork.snapshots = {}
+        fork.blobs = self.blobs.copy()
+        fork.journal = None
+
+        # Обе стороны получают новые поколения: существующие узлы становятся общими
+        fork._generation = object()
+        self._generation = object()
+        return fork
+
+    def snapshot(self, name):
+        """Запоминает текущее дерево под именем name за O(1)"""
+        self.snapshots[name] = (self.filesystem["/"], set(self._changed), set(self._removed), self.blobs.copy())
+        self._generation = object()  # Дальнейшие изменения не затрагивают снимок
+
+    def restore(self, name):
+        """Возвращает дерево из снимка name; False, если снимка нет"""
+        if name not in self.snapshots:
+            return False
+        root, changed, removed, blobs = self.snapshots[name]
+        self.filesystem = {"/": root}
+        self._index = {"/": root}
+        self._index_complete = False
+        self._generation = object()  # Снимок остается неизменным для повторного восстановления
+        self._changed = set(changed)
+        self._removed = set(removed)
+        self.blobs = blobs.copy()
+        self._rewrite = True  # Архив мог быть сохранен после снимка - сохранять только перезаписью
+        self.search_index = None
+        if not self.change_directory(self.current_vfs_dir):
+            self.change_directory("/")
+        if self.journal is not None:
+            self._rewrite_archive()  # Журнал не может описать возврат к снимку - состояние сразу пишется в архив
+        return True
+
+    def create_file(self, path, content=b"", display_time=False):
         """Создает новый файл в VFS (команда touch)"""
-        dir_path = os.path.dirname(path)
-        filename = os.path.basename(path)
-        dir_content = self.resolve_path(dir_path)
+        abs_path, dir_node, filename = self._split_path(path)
 
-        if dir_content is None:
+        if dir_node is None:
             return False, "Нет такой директории"
 
+        dir_content = dir_node.children
         if filename in dir_content:
-            if dir_content[filename]["type"] == "file":
+            node = dir_content[filename]
+            if node.type is NodeType.FILE:
                 if display_time:
-                    return True, (f'\tВремя создания: {dir_content[filename]["created"]}\n'
-                                  f'\t\tВремя модификации: {dir_content[filename]["modified"]}')
+                    return True, (f'\tВремя создания: {ns_to_iso(node.created)}\n'
+                                  f'\t\tВремя модификации: {ns_to_iso(node.modified)}')
                 # Файл существует - обновляем время модификации
-                dir_content[filename]["modified"] = datetime.now().isoformat()
+                node = self._own_file(abs_path)
+                node.modified = time.time_ns()
+                self._update_aggregates(abs_path, 0, 0, node.modified)
+                self._changed.add(abs_path)
+                self._log(OP_CREATE, node.modified, abs_path, b"")
                 return True, "Тайминг файла обновлен"
             else:
                 return False, "Невозможно создать файл - директория с таким именем уже существует"
 
         # Создаем новый файл
-        dir_content[filename] = {
-            "type": "file",
-            "content": content,
-            "created": datetime.now().isoformat(),
-            "modified": datetime.now().isoformat()
-        }
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        node = self._new_file(content)
+        self._own_parent(abs_path).children[filename] = node
+        self._index[abs_path] = node
+        self._index_node(abs_path, node)
+        self._update_aggregates(abs_path, node.size, 1, node.modified)
+        self._changed.add(abs_path)
+        self._log(OP_CREATE, node.modified, abs_path, content)
         return True, "Файл создан"
 
+    def write_file(self, path, data, append=False):
+        """Записывает данные (итератор частей str или bytes) в файл VFS, создавая его при необходимости"""
+        abs_path, dir_node, filename = self._split_path(path)
+
+        if dir_node is None:
+            return False, "Нет такой директории"
+
+        node = dir_node.children.get(filename)
+        if node is not None and node.type is not NodeType.FILE:
+            return False, "Это директория"
+
+        appended = append and node is not None
+        buffer = bytearray(self._file_bytes(node) if appended else b"")
+        start = len(buffer)  # В журнал попадают только дописанные данные
+        for chunk in data:
+            buffer += chunk.encode('utf-8') if isinstance(chunk, str) else chunk
+
+        if node is None:
+            node = self._new_file(bytes(buffer))
+            self._own_parent(abs_path).children[filename] = node
+            self._index[abs_path] = node
+            self._index_node(abs_path, node)
+            self._update_aggregates(abs_path, node.size, 1, node.modified)
+        else:
+            node = self._own_file(abs_path)
+            old_size = node.size
+            self.blobs.release(node.content)
+            node.content = self.blobs.add(bytes(buffer))
+            node.source = None
+            node.modified = time.time_ns()
+            self._update_aggregates(abs_path, node.size - old_size, 0, node.modified)
+            if self.search_index is not None:
+                self.search_index.update(abs_path, str(node.content, 'utf-8', errors='replace'))
+        self._changed.add(abs_path)
+        if appended:
+            self._log(OP_APPEND, node.modified, abs_path, memoryview(buffer)[start:])
+        else:
+            self._log(OP_WRITE, node.modified, abs_path, node.content)
+        return True, "Файл записан"
+
     def remove_file(self, path):
         """Удаляет файл из VFS (команда rm)"""
-        dir_path = os.path.dirname(path)
-        filename = os.path.basename(path)
-        dir_content = self.resolve_path(dir_path)
+        abs_path, dir_node, filename = self._split_path(path)
 
-        if dir_content is None:
+        if dir_node is None:
             return False, "Нет такой директории"
 
+        dir_content = dir_node.children
         if filename not in dir_content:
             return False, "Нет такого файла"
 
-        if dir_content[filename]["type"] != "file":
+        if dir_content[filename].type is not NodeType.FILE:
             return False, "Невозможно удалить - это директория"
 
-        # Удаляем файл из VFS
-        del dir_content[filename]
-        return True, "Файл удален"
\ No newline at end of file
+        # Удаляем файл из VFS; удаление считается изменением родительских директорий
+        dir_content = self._own_parent(abs_path).children
+        node = dir_content.pop(filename)
+        self.blobs.release(node.content)
+        now = time.time_ns()
+        self._update_aggregates(abs_path, -node.size, -1, now)
+        self._index.pop(abs_path, None)
+        if self.search_index is not None:
+            self.search_index.remove(abs_path)
+        self._changed.discard(abs_path)
+        self._removed.add(abs_path)
+        self._log(OP_REMOVE, now, abs_path)
+        return True, "Файл удален"
+
+    def _target_path(self, source_path, target):
+        """Путь назначения cp и mv: в существующую директорию target - под именем источника"""
+        found = self.stat(target)
+        if found is not None and found[1].type is NodeType.DIRECTORY:
+            dir_path = "" if found[0] == "/" else found[0]
+            target = f"{dir_path}/{source_path.rsplit('/', 1)[1]}"
+        return self._split_path(target)
+
+    def make_directory(self, path, parents=False):
+        """Создает директорию VFS (команда mkdir); parents - вместе с недостающими родителями (mkdir -p)"""
+        abs_path = self._normalize(path)
+        if abs_path is None:
+            return False, "Нет такой директории"
+        node = self._node(abs_path)
+        if node is not None:
+            if parents and node.type is NodeType.DIRECTORY:
+                return True, "Директория уже существует"
+            return False, "Файл или директория уже существует"
+
+        missing = []  # Несуществующие директории пути, от самой глубокой
+        dir_path = abs_path
+        while node is None:
+            missing.append(dir_path)
+            dir_path = dir_path.rsplit("/", 1)[0] or "/"
+            node = self._node(dir_path)
+        if node.type is not NodeType.DIRECTORY:
+            return False, "Не является директорией"
+        if len(missing) > 1 and not parents:
+            return False, "Нет такой директории"
+
+        now = time.time_ns()
+        for dir_path in reversed(missing):
+            node = DirNode(modified=now)
+            node.owner = self._generation
+            self._own_parent(dir_path).children[dir_path.rsplit("/", 1)[1]] = node
+            self._index[dir_path] = node
+            self._index_node(dir_path, node)
+        self._update_aggregates(missing[-1], 0, 0, now)
+        self._changed.add(abs_path)  # Пустая директория сохраняется явной записью "имя/"
+        self._log(OP_MKDIR, now, abs_path)
+        return True, "Директория создана"
+
+    def remove_directory(self, path, recursive=False):
+        """Удаляет пустую директорию (rmdir) или директорию со всем содержимым (rm -r)"""
+        abs_path, dir_node, name = self._split_path(path)
+        if abs_path == "/":
+            return False, "Невозможно удалить корневую директорию"
+        if dir_node is None:
+            return False, "Нет такой директории"
+        node = dir_node.children.get(name)
+        if node is None:
+            return False, "Нет такого файла или директории"
+        if node.type is not NodeType.DIRECTORY:
+            return False, "Не является директорией"
+        if node.children and not recursive:
+            return False, "Директория не пуста"
+
+        del self._own_parent(abs_path).children[name]
+        now = time.time_ns()
+        self._update_aggregates(abs_path, -node.total_size, -node.file_count, now)
+        for node_path, child in self._walk(abs_path, node):
+            self._index.pop(node_path, None)
+            if self.search_index is not None:
+                self.search_index.remove(node_path)
+            self._changed.discard(node_path)
+            if child.type is NodeType.FILE:
+                self.blobs.release(child.content)
+                self._removed.add(node_path)
+            else:
+                self._removed.add(node_path + "/")  # Явная запись директории в архиве, если она есть
+
+        if self._inside(self.current_vfs_dir, abs_path):
+            self.change_directory("/")
+        self._log(OP_RMDIR, now, abs_path)
+        return True, "Директория удалена"
+
+    @staticmethod
+    def _inside(path, dir_path):
+        """Лежит ли path в поддереве dir_path (включая сам dir_path); в поддереве корня - любой путь"""
+        return path == dir_path or path.startswith(dir_path.rstrip("/") + "/")
+
+    def move(self, source, target):
+        """Перемещает или переименовывает файл или директорию (команда mv)
+
+        Узел перевешивается в новую родительскую директорию за O(1), сводные данные обновляются
+        за O(глубины). Поддерево больше REKEY_LIMIT файлов не обходится: плоский индекс сбрасывается.
+        """
+        found = self.stat(source)
+        if found is None:
+            return False, "Нет такого файла или директории"
+        source_path, node = found
+        if source_path == "/":
+            return False, "Невозможно переместить корневую директорию"
+
+        abs_path, dir_node, name = self._target_path(source_path, target)
+        if dir_node is None:
+            return False, "Нет такой директории"
+        if abs_path == source_path:
+            return False, "Источник и назначение совпадают"
+        is_dir = node.type is NodeType.DIRECTORY
+        if is_dir and self._inside(abs_path, source_path):
+            return False, "Невозможно переместить директорию в саму себя"
+        old_node = dir_node.children.get(name)
+        if old_node is not None:
+            if is_dir or old_node.type is NodeType.DIRECTORY:
+                return False, "Назначение уже существует"
+            self.remove_file(abs_path)  # Файл заменяет существующий файл
+
+        size, count = (node.total_size, node.file_count) if is_dir else (node.size, 1)
+        now = time.time_ns()
+        del self._own_parent(source_path).children[source_path.rsplit("/", 1)[1]]
+        self._update_aggregates(source_path, -size, -count, now)
+        self._own_parent(abs_path).children[name] = node
+        self._update_aggregates(abs_path, size, count, now)
+
+        if not is_dir or node.file_count <= REKEY_LIMIT or self.search_index is not None:
+            self._rekey(source_path, abs_path, node)
+        else:
+            root = self.filesystem["/"]
+            self._index = {"/": root}  # Старые пути поддерева больше не должны разрешаться
+            self._index_complete = False
+            self._rewrite = True  # Пути всех файлов поддерева изменились
+
+        if is_dir and self._inside(self.current_vfs_dir, source_path):
+            # Текущая директория переехала вместе с поддеревом
+            self.current_vfs_dir = abs_path + self.current_vfs_dir[len(source_path):]
+        self._log(OP_MOVE, now, source_path, abs_path)
+        return True, "Перемещено"
+
+    def _rekey(self, old_path, new_path, node):
+        """Переносит пути перемещенного поддерева в индексах и списках изменений"""
+        for node_path, child in self._walk(new_path, node):
+            moved_from = old_path + node_path[len(new_path):]
+            self._index.pop(moved_from, None)
+            self._index[node_path] = child
+            if self.search_index is not None:
+                self.search_index.rename(moved_from, node_path)
+            self._changed.discard(moved_from)
+            if child.type is NodeType.FILE:
+                self._removed.add(moved_from)
+                self._changed.add(node_path)
+            else:
+                self._removed.add(moved_from + "/")
+                if not child.children:
+                    self._changed.add(node_path)
+
+    def copy_directory(self, source, target):
+        """Копирует директорию со всем содержимым (команда cp -r)
+
+        Копия разделяет узлы с исходным поддеревом: после копирования VFS переходит в новое
+        поколение, и изменения любой из копий копируют затронутые директории при записи.
+        Содержимое файлов не копируется.
+        """
+        found = self.stat(source)
+        if found is None:
+            return False, "Нет такого файла или директории"
+        source_path, node = found
+        if node.type is not NodeType.DIRECTORY:
+            return self.copy_file(source, target)
+
+        abs_path, dir_node, name = self._target_path(source_path, target)
+        if dir_node is None:
+            return False, "Нет такой директории"
+        if self._inside(abs_path, source_path):
+            return False, "Невозможно скопировать директорию в саму себя"
+        if name in dir_node.children:
+            return False, "Назначение уже существует"
+
+        self._own_parent(abs_path).children[name] = node
+        now = time.time_ns()
+        self._update_aggregates(abs_path, node.total_size, node.file_count, now)
+        self._generation = object()  # Узлы поддерева теперь достижимы по двум путям
+
+        for node_path, child in self._walk(abs_path, node):
+            self._index[node_path] = child
+            self._index_node(node_path, child)
+            if child.type is NodeType.FILE:
+                self.blobs.acquire(child.content)
+                self._changed.add(node_path)
+            elif not child.children:
+                self._changed.add(node_path)
+        self._log(OP_COPY_DIR, now, source_path, abs_path)
+        return True, "Директория скопирована"
+
+    def copy_file(self, source, target):
+        """Копирует файл VFS (команда cp): копия ссылается на то же содержимое, данные не копируются
+
+        Если target - директория, копия создается в ней под именем исходного файла.
+        """
+        found = self.stat(source)
+        if found is None:
+            return False, "Нет такого файла"
+        source_path, source_node = found
+        if source_node.type is not NodeType.FILE:
+            return False, "Это директория"
+
+        abs_path, dir_node, filename = self._target_path(source_path, target)
+        if dir_node is None:
+            return False, "Нет такой директории"
+        if abs_path == source_path:
+            return False, "Файл нельзя скопировать в самого себя"
+        old_node = dir_node.children.get(filename)
+        if old_node is not None and old_node.type is not NodeType.FILE:
+            return False, "Это директория"
+
+        node = FileNode(source_node.content, source_node.source)
+        self.blobs.acquire(node.content)
+        self._own_parent(abs_path).children[filename] = node
+        self._index[abs_path] = node
+        if old_node is None:
+            self._index_node(abs_path, node)
+            self._update_aggregates(abs_path, node.size, 1, node.modified)
+        else:
+            self.blobs.release(old_node.content)
+            self._update_aggregates(abs_path, node.size - old_node.size, 0, node.modified)
+            if self.search_index is not None:
+                self.search_index.update(abs_path, str(self._file_bytes(node), 'utf-8', errors='replace'))
+        self._changed.add(abs_path)
+        self._log(OP_COPY, node.modified, source_path, abs_path)
+        return True, "Файл скопирован"
+
+    def _open_journal(self):
+        """Открывает журнал изменений архива и применяет записи, не сохраненные в архив до сбоя"""
+        journal = VfsJournal(self.vfs_path)
+        count = self._replay(journal.recover())
+        self.journal = journal  # Во время применения записи не журналируются повторно
+        if count:
+            print(f"Журнал VFS: применено изменений: {count}", file=self.out)
+
+    def _replay(self, records):
+        """Применяет записи журнала к загруженному дереву; возвращает их число"""
+        count = 0
+        for op, modified, fields in records:
+            path = str(fields[0], 'utf-8')
+            if op == OP_REMOVE:
+                self.remove_file(path)
+            elif op == OP_MKDIR:
+                self.make_directory(path, parents=True)
+            elif op == OP_RMDIR:
+                self.remove_directory(path, recursive=True)
+            elif op == OP_MOVE:
+                self.move(path, str(fields[1], 'utf-8'))
+            elif op == OP_COPY_DIR:
+                self.copy_directory(path, str(fields[1], 'utf-8'))
+            else:
+                # Файл создается или изменяется: восстанавливаются и его временные метки
+                if op == OP_COPY:
+                    path, created = str(fields[1], 'utf-8'), True
+                    self.copy_file(str(fields[0], 'utf-8'), path)
+                else:
+                    created = self._node(path) is None
+                    if op == OP_CREATE:
+                        self.create_file(path, bytes(fields[1]))
+                    else:
+                        self.write_file(path, (fields[1],), append=op == OP_APPEND)
+                node = self._node(path)
+                if node is not None and node.type is NodeType.FILE:
+                    node.modified = modified
+                    if created:
+                        node.created = modified
+            count += 1
+        return count
+
+    def _log(self, op, modified, *fields):
+        """Записывает изменение в журнал, если он ведется"""
+        if self.journal is not None:
+            self.journal.append(op, modified, *fields)
+
+    def commit(self):
+        """Завершает группу изменений (строку команд): fsync журнала; большой журнал сворачивается в архив"""
+        journal = self.journal
+        if journal is None:
+            return
+        if journal.size >= self.checkpoint_size:
+            self.sync()
+        journal.commit()
+
+    def has_changes(self):
+        """Есть ли несохраненные изменения"""
+        return bool(self._changed or self._removed or self._rewrite)
+
+    def sync(self):
+        """Сохраняет изменения в архив: дописывает новые и измененные файлы, удаленные исключает из каталога"""
+        if not self.vfs_path:
+            return False, "VFS не связана с архивом"
+        if (not os.path.exists(self.vfs_path) or self._rewrite or self.image_format
+                or self._detached and self.has_changes()):
+            # Образ VFS не дописывается - только перезаписывается целиком; снимки при этом сохраняются
+            return self._rewrite_archive() if self.snapshots else self.compact()
+        if not self.has_changes():
+            if self.journal is not None:
+                self.journal.checkpoint()
+            return True, "Нет изменений"
+
+        members = []
+        for path in sorted(self._changed):
+            node = self._node(path)
+            if node.type is NodeType.FILE:
+                members.append((path[1:], bytes(self._file_bytes(node)), node.modified))
+            else:
+                members.append((path[1:] + "/", b"", node.modified))  # Созданная директория
+
+        # Директория, оставшаяся пустой после удаления, сохраняется явной записью "имя/"
+        now = time.time_ns()
+        for dir_path in sorted({path.rsplit("/", 1)[0] for path in self._removed}):
+            dir_node = self._node(dir_path) if dir_path else None
+            if dir_path and dir_node is not None and not dir_node.children:
+                members.append((dir_path[1:] + "/", b"", now))
+
+        if not members and not can_remove_members():
+            return self.compact()  # Только удаления, а zipfile не умеет перезаписать один каталог
+        self._close_archive()
+        append_members(self.vfs_path, members, [path[1:] for path in self._removed])
+        self._archive = VfsArchive(self.vfs_path)  # Смещения старых файлов не изменились
+        if self.journal is not None:
+            self.journal.checkpoint()  # Изменения журнала теперь в архиве
+
+        count = len(self._changed) + len(self._removed)
+        self._changed.clear()
+        self._removed.clear()
+        return True, f"Сохранено изменений: {count}"
+
+    def compact(self):
+        """Перезаписывает архив целиком, освобождая место, занятое удаленными и старыми версиями файлов"""
+        if not self.vfs_path:
+            return False, "VFS не связана с архивом"
+
+        count = self.export(self.vfs_path, self.image_format or None)
+
+        # Перечитываем архив: смещения файлов изменились
+        cwd = self.current_vfs_dir
+        self.load_vfs(self.vfs_path)
+        self.change_directory(cwd)
+        if self.journal is not None:
+            self.journal.checkpoint()
+        return True, f"Архив перезаписан: {count} записей"
+
+    def _rewrite_archive(self):
+        """Перезаписывает архив текущим деревом, не перечитывая его (снимки остаются)
+
+        Новый архив атомарно заменяет прежний, а открытое отображение прежнего остается действительным:
+        ленивые узлы дерева и снимков продолжают читать из него. До перечитывания (compact, load_vfs)
+        изменения сохраняются только такой перезаписью.
+        """
+        count = self.export(self.vfs_path, self.image_format or None)
+        self._changed.clear()
+        self._removed.clear()
+        self._rewrite = False
+        self._detached = True
+        if self.journal is not None:
+            self.journal.checkpoint()
+        return True, f"Архив перезаписан: {count} записей"
+
+    def export(self, path, image=None):
+        """Записывает все дерево VFS в файл path; возвращает число записей
+
+        image - записать образ VFS вместо ZIP-архива; None - по расширению path (.vfsimg).
+        """
+        if image is None:
+            image = path.endswith(IMAGE_SUFFIX)
+        if image:
+            return write_image(path, self.filesystem["/"], self._file_bytes)
+
+        members = []
+        now = time.time_ns()
+        for node_path, node in sorted(self._walk("/"), key=lambda item: item[0]):
+            if node.type is NodeType.FILE:
+                members.append((node_path[1:], bytes(self._file_bytes(node)), node.modified))
+            elif node_path != "/" and not node.children:
+                members.append((node_path[1:] + "/", b"", now))
+        write_archive(path, members)
+        return len(members)
+
+
+def convert_vfs(source_path, target_path):
+    """Преобразует VFS из ZIP-архива или образа в файл target_path (формат - по расширению, .vfsimg - образ)"""
+    if not os.path.exists(source_path):
+        return False, f"Нет такого файла: {source_path}"
+    vfs = VirtualFileSystem(lazy=True, out=io.StringIO())
+    if not vfs.load_vfs(source_path):
+        return False, vfs.out.getvalue().strip()
+    try:
+        count = vfs.export(target_path)
+    except OSError as e:
+        return False, f"{target_path}: {e.strerror}"
+    finally:
+        vfs._close_archive()
+    return True, f"{source_path} -> {target_path}: записей {count}"
@@ -0,0 +1,41 @@
+"""Бенчмарк: пропускная способность пакетного режима (команд в секунду)"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UnixShellEmulator import UnixShellEmulator
+
+
+def make_script(count):
+    """Скрипт из смеси команд VFS"""
+    pattern = ["touch /tmp/f{i}.txt", "ls /tmp", "cat /readme.txt", "cd home", "pwd", "cd ..",
+               "echo шаг {i}", "rm /tmp/f{i}.txt"]
+    commands = ["vfs on"]
+    for i in range(count // len(pattern)):
+        commands.extend(cmd.format(i=i) for cmd in pattern)
+    return commands
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    commands = make_script(count)
+
+    with open(os.devnull, 'w', encoding='utf-8', buffering=1 << 16) as out:
+        shell = UnixShellEmulator(startup_script=commands, out=out)
+        start = time.perf_counter()
+        shell.run_startup_script()
+        interactive = time.perf_counter() - start
+
+        shell = UnixShellEmulator(out=out)
+        start = time.perf_counter()
+        shell.run_batch(commands)
+        batch = time.perf_counter() - start
+
+    print(f"стартовый скрипт с приглашениями: {len(commands) / interactive:,.0f} команд/с")
+    print(f"пакетный режим:                   {len(commands) / batch:,.0f} команд/с")
+
+
+if __name__ == "__main__":
+    main()
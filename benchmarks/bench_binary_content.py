@@ -0,0 +1,68 @@
+"""Бенчмарк: хранение бинарных файлов в bytes против старой схемы с base64"""
+import base64
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+
+def legacy_content(zip_ref):
+    """Старая схема: попытка декодирования UTF-8, иначе base64-строка"""
+    def read_member(file_info):
+        content = zip_ref.read(file_info)
+        try:
+            return content.decode('utf-8')
+        except UnicodeDecodeError:
+            return base64.b64encode(content).decode('utf-8')
+    return read_member
+
+
+def measure(vfs_path, legacy):
+    """Возвращает время загрузки (мс), объем дерева (КБ) и время чтения всех файлов (мс)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        vfs = VirtualFileSystem()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    with zipfile.ZipFile(vfs_path) as zip_ref:
+        vfs._build_tree(zip_ref, legacy_content(zip_ref) if legacy else zip_ref.read)
+    load_time = (time.perf_counter() - start) * 1000
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    vfs._build_index()
+
+    start = time.perf_counter()
+    for path, node in vfs._index.items():
+        if node.type.value == "file":
+            if legacy:
+                len(node.content)
+            else:
+                view = vfs.read_file_view(path)
+                for offset in range(0, len(view), 64 * 1024):
+                    len(view[offset:offset + 64 * 1024])
+    read_time = (time.perf_counter() - start) * 1000
+    return load_time, memory / 1024, read_time
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'binary.vfs.zip'), count, file_size=64 * 1024,
+                                compression=zipfile.ZIP_STORED, binary_ratio=0.9)
+        for label, legacy in (("base64 (старая схема)", True), ("bytes + memoryview", False)):
+            load_time, memory, read_time = measure(vfs_path, legacy)
+            print(f"{label:<24} загрузка {load_time:8.1f} мс, память {memory:10.0f} КБ, "
+                  f"чтение {read_time:7.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
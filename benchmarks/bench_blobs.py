@@ -0,0 +1,82 @@
+"""Бенчмарк: дедупликация содержимого в хранилище блобов, экономия памяти и стоимость хэширования
+
+Использование: python bench_blobs.py [файлов] [доля_копий]
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VfsArchive import VfsArchive
+from VfsBlobs import BlobStore
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+COPIES = 10_000
+
+
+def load(vfs_path):
+    """Полная загрузка архива без вывода сообщений"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return VirtualFileSystem(vfs_path)
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    duplicate_ratio = float(sys.argv[2]) if len(sys.argv) > 2 else 0.4
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'blobs.vfs.zip'), file_count, depth=3, fanout=10,
+                                duplicate_ratio=duplicate_ratio)
+
+        # Без хранилища каждый файл держал бы свою распакованную копию содержимого
+        archive = VfsArchive(vfs_path)
+        infos = [info for info in archive.infolist() if not info.is_dir()]
+        tracemalloc.start()
+        contents = [archive.read(info) for info in infos]
+        separate, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        start = time.perf_counter()
+        for content in contents:
+            hash(content)  # Хэш, по которому хранилище ищет содержимое
+        hashing = time.perf_counter() - start
+        del contents
+
+        # То же содержимое в хранилище: уникальные блобы плюс хэши и счетчики ссылок
+        tracemalloc.start()
+        store = BlobStore()
+        contents = [store.add(archive.read(info)) for info in infos]
+        deduplicated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del contents, store
+        archive.close()
+
+        start = time.perf_counter()
+        vfs = load(vfs_path)
+        elapsed = time.perf_counter() - start
+        blobs = vfs.blobs
+        print(f"файлов: {blobs.references}, уникальных блобов: {blobs.unique_count()}, "
+              f"доля копий в архиве: {duplicate_ratio:.0%}")
+        print(f"содержимое: {blobs.logical_size / 2**20:.1f} МБ, хранится: {blobs.stored_size / 2**20:.1f} МБ, "
+              f"дедупликация {blobs.dedup_ratio():.2f}x")
+        print(f"загрузка: {elapsed:.2f} с, из них хэширование содержимого ~{hashing:.2f} с "
+              f"({hashing / elapsed:.0%}, {blobs.logical_size / 2**20 / hashing:.0f} МБ/с)")
+        print(f"память под содержимое: отдельные копии {separate / 2**20:.1f} МБ, "
+              f"хранилище блобов {deduplicated / 2**20:.1f} МБ (экономия {(separate - deduplicated) / 2**20:.1f} МБ)")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            vfs.write_file("/big.bin", [b"x" * 2**20])
+        start = time.perf_counter()
+        for i in range(COPIES):
+            vfs.copy_file("/big.bin", f"/big{i}.bin")
+        print(f"cp файла 1 МБ: {(time.perf_counter() - start) / COPIES * 1e6:.1f} мкс, "
+              f"хранится после {COPIES} копий: {vfs.blobs.stored_size / 2**20:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Бенчмарк: память и задержка cat для большого файла VFS при потоковом и полном выводе"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UnixShellEmulator import UnixShellEmulator
+
+
+class NullSink:
+    """Приемник вывода, отмечающий время первой записи"""
+
+    def __init__(self):
+        self.first_write = None
+
+    def write(self, text):
+        if self.first_write is None:
+            self.first_write = time.perf_counter()
+
+    def flush(self):
+        pass
+
+
+def measure(shell, streaming):
+    """Возвращает задержку первого вывода, общее время (мс) и пиковую дополнительную память (МБ)"""
+    sink = NullSink()
+    tracemalloc.start()
+    start = time.perf_counter()
+    if streaming:
+        shell.execute_command("cat", ["/big.txt"], out=sink)
+    else:
+        sink.write(shell.vfs.read_file("/big.txt") + "\n")  # Вывод одной строкой, как print(content)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (sink.first_write - start) * 1000, elapsed * 1000, peak / 2 ** 20
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    shell = UnixShellEmulator(out=NullSink())
+    shell.in_vfs_mode = True
+    shell.vfs.create_file("/big.txt", b"0123456789abcdef" * (size_mb * 2 ** 16))
+
+    for label, streaming in (("полный вывод", False), ("потоковый cat", True)):
+        latency, elapsed, peak = measure(shell, streaming)
+        print(f"{label:<14} {size_mb} МБ: первый вывод {latency:8.1f} мс, всего {elapsed:8.1f} мс, "
+              f"пик памяти {peak:8.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Бенчмарк: задержка дополнения по Tab в директориях со 100k записей - двоичный поиск против перебора
+
+Использование: python bench_completion.py [записей_в_директории]
+
+Перебор - как дополнение без индекса: проход по всем именам директории с startswith и сортировкой
+найденного на каждое нажатие Tab.
+"""
+import io
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ShellCompleter import ShellCompleter
+from UnixShellEmulator import UnixShellEmulator
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+REPEATS = 200
+
+
+def latencies(complete, prefixes):
+    """Медиана и 99-й перцентиль задержки дополнения по списку префиксов, мкс"""
+    samples = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        complete(prefix)
+        samples.append((time.perf_counter() - start) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99)]
+
+
+def scan_vfs(vfs, dir_path, prefix):
+    """Дополнение перебором имен директории VFS"""
+    children = vfs.stat(dir_path)[1].children
+    return sorted(name for name in children if name.startswith(prefix))
+
+
+def scan_host(dir_path, prefix):
+    """Дополнение перебором имен директории хоста"""
+    with os.scandir(dir_path) as entries:
+        return sorted(entry.name for entry in entries if entry.name.startswith(prefix))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        # Все файлы архива - в одной директории /d0
+        vfs_path = make_archive(os.path.join(tmp, 'completion.vfs.zip'), count, depth=1, fanout=1)
+        shell = UnixShellEmulator(vfs=VirtualFileSystem(vfs_path, lazy=True, out=io.StringIO()),
+                                  out=io.StringIO())
+        host_dir = os.path.join(tmp, "host")
+        os.makedirs(host_dir)
+        for i in range(count):
+            open(os.path.join(host_dir, f"file{i}.txt"), 'w').close()
+        shell.current_dir = tmp
+        completer = ShellCompleter(shell, history_file=os.path.join(tmp, "history"))
+
+        # Префиксы, под которые подходят ~1, ~10 и ~100 имен
+        names = [f"file{rng.randrange(count)}" for _ in range(REPEATS)]
+        cases = [(f"{len(str(count - 1)) - digits} цифр", [name[:len(name) - digits] for name in names])
+                 for digits in (0, 1, 2)]
+
+        for mode, directory, scan in (("VFS", "/d0", lambda prefix: scan_vfs(shell.vfs, "/d0", prefix)),
+                                      ("хост", "host", lambda prefix: scan_host(host_dir, prefix))):
+            shell.in_vfs_mode = mode == "VFS"
+            start = time.perf_counter()
+            completer.matches("cat ", f"{directory}/")
+            print(f"{mode}, {count} записей: построение индекса {(time.perf_counter() - start) * 1000:.1f} мс")
+            for title, prefixes in cases:
+                found = len(completer.matches("cat ", f"{directory}/{prefixes[0]}"))
+                indexed = latencies(lambda prefix: completer.matches("cat ", f"{directory}/{prefix}"), prefixes)
+                naive = latencies(scan, prefixes[:REPEATS // 10])
+                print(f"  префикс file + {title} (вариантов ~{found}): индекс {indexed[0]:8.1f} мкс "
+                      f"(p99 {indexed[1]:8.1f}), перебор {naive[0]:9.1f} мкс (p99 {naive[1]:9.1f})")
+
+
+if __name__ == "__main__":
+    main()
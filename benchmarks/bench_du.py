@@ -0,0 +1,71 @@
+"""Бенчмарк: du -s и ls -lR по сводным данным директорий против наивного обхода дерева"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UnixShellEmulator import UnixShellEmulator
+from VfsNodes import NodeType, ns_to_display
+from bench_cat_stream import NullSink
+from synthetic import make_archive
+
+
+def naive_du(dir_node):
+    """Размер поддерева обходом всех узлов"""
+    total = 0
+    for node in dir_node.children.values():
+        total += naive_du(node) if node.type is NodeType.DIRECTORY else node.size
+    return total
+
+
+def naive_ls_lr(dir_path, dir_node, out):
+    """ls -lR с размером директорий, посчитанным обходом поддерева"""
+    out.write(f"{dir_path}:\n")
+    for name, node in dir_node.children.items():
+        if node.type is NodeType.DIRECTORY:
+            out.write(f"d {naive_du(node):>10} {name}/\n")
+        else:
+            out.write(f"- {node.size:>10} {ns_to_display(node.modified)} {name}\n")
+    for name, node in dir_node.children.items():
+        if node.type is NodeType.DIRECTORY:
+            naive_ls_lr(f"{dir_path.rstrip('/')}/{name}", node, out)
+
+
+def timed(action):
+    """Время выполнения (мс)"""
+    start = time.perf_counter()
+    action()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'du.vfs.zip'), file_count, depth=3, fanout=10, file_size=64)
+        with contextlib.redirect_stdout(io.StringIO()):
+            shell = UnixShellEmulator(vfs_path, lazy_vfs=True)
+        shell.run_line("vfs on", out=NullSink())
+        root = shell.vfs.filesystem["/"]
+        print(f"файлов: {file_count}")
+
+        results = [
+            ("du -s /", timed(lambda: shell.run_line("du -s /", out=NullSink())),
+             timed(lambda: naive_du(root))),
+            ("ls -lR /", timed(lambda: shell.run_line("ls -lR /", out=NullSink())),
+             timed(lambda: naive_ls_lr("/", root, NullSink()))),
+        ]
+        for label, aggregated, naive in results:
+            print(f"{label:<10} сводные данные {aggregated:10.2f} мс, обход дерева {naive:10.2f} мс")
+
+        start = time.perf_counter()
+        for i in range(10_000):
+            shell.vfs.create_file(f"/d1/d2/d3/new{i}.txt", b"x" * 64)
+        print(f"create_file с обновлением сводных данных: {(time.perf_counter() - start) / 10_000 * 1e6:.1f} мкс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Бенчмарк: ответвления VFS с копированием при записи против перезагрузки архива и глубокого копирования"""
+import contextlib
+import copy
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+FORKS = 10_000
+SLOW_RUNS = 3  # Перезагрузка и глубокое копирование дороги - замеряются несколько раз
+
+
+def scenario(vfs, i):
+    """Несколько изменений, как в тестовом сценарии: touch и rm"""
+    vfs.create_file(f"/d{i % 10}/d1/new{i}.txt", b"scenario")
+    vfs.create_file(f"/d{i % 10}/d2/d3/other{i}.txt")
+    vfs.remove_file(f"/d{i % 10}/d1/new{i}.txt")
+    vfs.create_file("/top.txt")
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    forks = int(sys.argv[2]) if len(sys.argv) > 2 else FORKS
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'fork.vfs.zip'), file_count, depth=3, fanout=10, file_size=64)
+        with contextlib.redirect_stdout(io.StringIO()):
+            base = VirtualFileSystem(vfs_path, lazy=True)
+        print(f"узлов в образе: {sum(1 for _ in base._walk('/'))}")
+
+        start = time.perf_counter()
+        for _ in range(forks):
+            base.fork()
+        print(f"fork без изменений: {(time.perf_counter() - start) / forks * 1e6:.1f} мкс")
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        kept = []
+        for i in range(forks):
+            fork = base.fork()
+            scenario(fork, i)
+            kept.append(fork)
+        elapsed = time.perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"fork + сценарий: {forks} раз за {elapsed:.2f} с, {elapsed / forks * 1e6:.1f} мкс на ответвление, "
+              f"{memory / forks / 1024:.1f} КБ на ответвление")
+        del kept
+
+        start = time.perf_counter()
+        for i in range(SLOW_RUNS):
+            with contextlib.redirect_stdout(io.StringIO()):
+                scenario(VirtualFileSystem(vfs_path, lazy=True), i)
+        print(f"перезагрузка архива + сценарий: {(time.perf_counter() - start) / SLOW_RUNS * 1e3:.1f} мс")
+
+        start = time.perf_counter()
+        for _ in range(SLOW_RUNS):
+            copy.deepcopy(base.filesystem)
+        print(f"deepcopy дерева: {(time.perf_counter() - start) / SLOW_RUNS * 1e3:.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
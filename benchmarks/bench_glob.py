@@ -0,0 +1,75 @@
+"""Бенчмарк: rm **/*.tmp с раскрытием шаблона против отдельной команды rm на каждый файл
+
+Использование: python bench_glob.py [файлов_в_архиве] [временных_файлов]
+"""
+import contextlib
+import fnmatch
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ShellGlob import VfsGlobSource, expand_glob
+from UnixShellEmulator import UnixShellEmulator
+from VirtualFileSystem import VirtualFileSystem
+from bench_cat_stream import NullSink
+from synthetic import make_archive
+
+
+def shell_for(vfs):
+    """Эмулятор в режиме VFS над ответвлением базовой VFS: каждый замер начинается с того же дерева"""
+    shell = UnixShellEmulator(vfs=vfs.fork())
+    shell.in_vfs_mode = True
+    return shell
+
+
+def timed(run):
+    """Время выполнения run(), мс"""
+    start = time.perf_counter()
+    run()
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tmp_count = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000
+    sink = NullSink()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'glob.vfs.zip'), file_count, depth=3, fanout=10)
+        with contextlib.redirect_stdout(io.StringIO()):
+            base = VirtualFileSystem(vfs_path, lazy=True)
+        rng = random.Random(0)
+        tmp_paths = []
+        for i in range(tmp_count):
+            path = "/" + "/".join(f"d{rng.randrange(10)}" for _ in range(3)) + f"/build{i}.tmp"
+            base.create_file(path)
+            tmp_paths.append(path)
+        print(f"файлов: {file_count + tmp_count}, из них *.tmp: {tmp_count}")
+
+        shell = shell_for(base)
+        per_file = timed(lambda: [shell.run_line(f"rm {path}", out=sink) for path in tmp_paths])
+        print(f"rm по одной команде на файл:   {per_file:8.1f} мс")
+
+        shell = shell_for(base)
+        expanded = timed(lambda: shell.run_line("rm **/*.tmp", out=sink))
+        left = len(expand_glob("**/*.tmp", VfsGlobSource(shell.vfs)))
+        print(f"rm **/*.tmp:                  {expanded:8.1f} мс (осталось *.tmp: {left})")
+
+        source = VfsGlobSource(base)
+        print(f"раскрытие **/*.tmp:           {timed(lambda: expand_glob('**/*.tmp', source)):8.1f} мс")
+
+        # Литеральный префикс разрешается через индекс, сопоставляется одна директория
+        pattern = "/d1/d2/d3/*.tmp"
+        narrow = timed(lambda: expand_glob(pattern, source))
+        full_scan = timed(lambda: [path for path in base._index if fnmatch.fnmatchcase(path, pattern)])
+        print(f"раскрытие {pattern}:   {narrow:8.3f} мс, "
+              f"fnmatch по всем {len(base._index)} путям: {full_scan:8.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
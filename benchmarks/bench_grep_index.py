@@ -0,0 +1,51 @@
+"""Бенчмарк: grep -r и find по VFS с поисковым индексом и без него"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UnixShellEmulator import UnixShellEmulator
+from bench_cat_stream import NullSink
+from synthetic import make_archive
+
+QUERIES = [
+    'grep -r "строка 4242 " /',
+    'grep -rl "file9999[0-9]\\.txt" /',
+    'grep -rl "d1/d2/d3" /d1',
+    'find / -name "file4242*"',
+]
+
+
+def timed(shell, line):
+    """Время выполнения строки команд (мс)"""
+    start = time.perf_counter()
+    shell.run_line(line, out=NullSink())
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'grep.vfs.zip'), file_count, depth=3, fanout=10)
+        with contextlib.redirect_stdout(io.StringIO()):
+            shell = UnixShellEmulator(vfs_path)
+        shell.run_line("vfs on", out=NullSink())
+        print(f"файлов: {file_count}")
+
+        plain = [timed(shell, line) for line in QUERIES]
+
+        start = time.perf_counter()
+        shell.vfs.build_search_index()
+        print(f"построение индекса: {(time.perf_counter() - start) * 1000:.0f} мс")
+
+        indexed = [timed(shell, line) for line in QUERIES]
+        for line, without, with_index in zip(QUERIES, plain, indexed):
+            print(f"{line:<36} без индекса {without:9.1f} мс, с индексом {with_index:9.1f} мс")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Бенчмарк: время до первого ls и пиковая память (RSS) - ZIP-архив против образа VFS (.vfsimg)
+
+Использование: python bench_image.py [число_файлов ...]
+
+Каждый замер - отдельный процесс эмулятора: python main.py -v <файл> -c 'vfs on; ls /'.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from VirtualFileSystem import convert_vfs
+from synthetic import make_archive
+
+RUNS = 3
+COMMANDS = "vfs on; ls /"
+
+# Замер ведет маленький промежуточный процесс: пиковый RSS в Linux наследуется через fork и exec,
+# и процесс эмулятора, запущенный прямо из бенчмарка, унаследовал бы память сгенерированных архивов
+LAUNCHER = """
+import resource, subprocess, sys, time
+start = time.perf_counter()
+subprocess.run(sys.argv[1:], stdout=subprocess.DEVNULL, check=True)
+print(time.perf_counter() - start, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+"""
+
+
+def first_ls(vfs_path, *flags):
+    """Лучшее время (с) и пиковый RSS (МБ) процесса эмулятора, выполняющего первый ls"""
+    best_time = best_rss = float("inf")
+    for _ in range(RUNS):
+        result = subprocess.run([sys.executable, "-c", LAUNCHER, sys.executable, os.path.join(ROOT, "main.py"),
+                                 "-v", vfs_path, *flags, "-c", COMMANDS],
+                                capture_output=True, text=True, check=True)
+        elapsed, rss = result.stdout.split()
+        best_time = min(best_time, float(elapsed))
+        best_rss = min(best_rss, int(rss) / 1024)  # ru_maxrss в Linux - в КБ
+    return best_time, best_rss
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            zip_path = make_archive(os.path.join(tmp, f"{size}.vfs.zip"), size, depth=3, fanout=10)
+            image_path = os.path.join(tmp, f"{size}.vfsimg")
+            start = time.perf_counter()
+            success, message = convert_vfs(zip_path, image_path)
+            if not success:
+                raise RuntimeError(message)
+            converted = time.perf_counter() - start
+            print(f"{size} файлов: ZIP {os.path.getsize(zip_path) / 2**20:.1f} МБ, "
+                  f"образ {os.path.getsize(image_path) / 2**20:.1f} МБ (преобразование {converted:.2f} с)")
+            for title, path, flags in (("ZIP", zip_path, ()), ("ZIP --lazy", zip_path, ("--lazy",)),
+                                       ("образ", image_path, ())):
+                elapsed, rss = first_ls(path, *flags)
+                print(f"  {title:11} первый ls: {elapsed * 1000:8.0f} мс, RSS: {rss:7.1f} МБ")
+            os.remove(zip_path)
+            os.remove(image_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Бенчмарк: журнал изменений VFS - fsync на каждую запись против группового, восстановление из журнала
+
+Использование: python bench_journal.py [изменений_для_пропускной_способности] [записей_журнала] [директория]
+
+Директория должна быть на диске, для которого измеряется fsync (по умолчанию - временная).
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import VfsJournal
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+GROUPS = (1, 16, 256, 4096)  # Изменений на один fsync (строку команд)
+
+
+def load(vfs_path, journal):
+    """VFS из архива без вывода сообщений"""
+    return VirtualFileSystem(vfs_path, out=io.StringIO(), journal=journal)
+
+
+def mutate(vfs, count, group):
+    """count изменений - создание, дописывание и удаление файлов; commit после каждых group изменений"""
+    for i in range(count):
+        kind = i % 10
+        path = f"/d{i // 10 % 10}/new{i - kind}.txt"  # Десяток изменений приходится на файлы одного десятка
+        if kind < 4:
+            vfs.create_file(f"/d{i // 10 % 10}/new{i}.txt")
+        elif kind < 9:
+            vfs.write_file(path, (f"строка {i}\n",), append=True)
+        else:
+            vfs.remove_file(path)
+        if i % group == group - 1:
+            vfs.commit()
+    vfs.commit()
+
+
+def throughput(vfs_path, count, group):
+    """Изменений в секунду и число fsync; group=None - без журнала"""
+    vfs = load(vfs_path, group is not None)
+    if vfs.journal is not None:
+        vfs.journal.group_size = group
+    start = time.perf_counter()
+    mutate(vfs, count, group or count)
+    elapsed = time.perf_counter() - start
+    commits = vfs.journal.commits if vfs.journal is not None else 0
+    if vfs.journal is not None:
+        vfs.journal.close()
+        os.remove(vfs.journal.path)
+    return count / elapsed, commits
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    records = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    with tempfile.TemporaryDirectory(dir=sys.argv[3] if len(sys.argv) > 3 else None) as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'journal.vfs.zip'), 10_000, depth=1, fanout=10)
+
+        rate, _ = throughput(vfs_path, count, None)
+        print(f"без журнала:                 {rate:10.0f} изменений/с")
+        for group in GROUPS:
+            rate, commits = throughput(vfs_path, count, group)
+            title = "fsync на каждую запись" if group == 1 else f"групповой fsync по {group}"
+            print(f"{title + ':':28} {rate:10.0f} изменений/с, fsync: {commits}")
+
+        # Журнал на records изменений, затем восстановление после "сбоя" (без сохранения в архив)
+        vfs = load(vfs_path, True)
+        vfs.checkpoint_size = float("inf")
+        start = time.perf_counter()
+        mutate(vfs, records, VfsJournal.JOURNAL_GROUP_SIZE)
+        written = time.perf_counter() - start
+        size = vfs.journal.size
+        vfs.journal.close()
+        del vfs
+        print(f"журнал: {records} записей, {size / 2**20:.1f} МБ, запись {written:.2f} с")
+
+        start = time.perf_counter()
+        load(vfs_path, False)
+        base = time.perf_counter() - start
+        start = time.perf_counter()
+        recovered = load(vfs_path, True)
+        total = time.perf_counter() - start
+        print(f"загрузка архива: {base:.2f} с, с применением журнала: {total:.2f} с "
+              f"({recovered.journal.records / (total - base):.0f} записей/с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Бенчмарк: время запуска и пиковая память при жадной и ленивой загрузке VFS"""
+import contextlib
+import glob
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+
+def measure(vfs_path, lazy):
+    """Возвращает время загрузки (мс) и пиковую память (КБ)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        vfs = VirtualFileSystem(vfs_path, lazy=lazy)
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    vfs._close_archive()
+    return elapsed, peak / 1024
+
+
+def main():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    archives = sorted(glob.glob(os.path.join(root, 'tests', 'zip', '*.vfs.zip')))
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        archives.append(make_archive(os.path.join(tmp, f'synthetic_{count}.vfs.zip'), count))
+
+        print(f"{'архив':<28}{'жадно, мс':>12}{'лениво, мс':>12}{'жадно, КБ':>12}{'лениво, КБ':>12}")
+        for vfs_path in archives:
+            eager_time, eager_mem = measure(vfs_path, lazy=False)
+            lazy_time, lazy_mem = measure(vfs_path, lazy=True)
+            print(f"{os.path.basename(vfs_path):<28}{eager_time:>12.1f}{lazy_time:>12.1f}"
+                  f"{eager_mem:>12.0f}{lazy_mem:>12.0f}")
+
+
+if __name__ == "__main__":
+    main()
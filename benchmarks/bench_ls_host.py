@@ -0,0 +1,132 @@
+"""Бенчмарк: ls на директориях хоста - os.scandir против os.listdir + os.path.isdir
+
+Использование: python bench_ls_host.py [файлов_в_плоской_директории] [файлов_в_дереве]
+
+Считаются обращения к ФС из Python, каждое из которых - системный вызов: чтения директорий
+(listdir/scandir) и stat (os.stat/os.lstat, в том числе внутри os.path.isdir). Вызовы DirEntry.stat
+выполняются в C и не перехватываются - их по одному на запись только с -l, -t и -S.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import UnixShellEmulator as shell_module
+from UnixShellEmulator import UnixShellEmulator
+from bench_cat_stream import NullSink
+
+RUNS = 3
+LATENCY = 0.002  # Имитация задержки чтения директории на сетевой ФС, с
+
+
+class CallCounter:
+    """Подменяет функции модуля os обертками со счетчиком вызовов"""
+
+    def __init__(self, names):
+        self.names = names
+        self.count = 0
+        self.saved = {}
+
+    def __enter__(self):
+        for name in self.names:
+            original = self.saved[name] = getattr(os, name)
+
+            def counted(*args, _original=original, **kwargs):
+                self.count += 1
+                return _original(*args, **kwargs)
+            setattr(os, name, counted)
+        return self
+
+    def __exit__(self, *exc):
+        for name, original in self.saved.items():
+            setattr(os, name, original)
+
+
+def legacy_ls(target_dir, recursive=False):
+    """Прежняя реализация: os.listdir и os.path.isdir для каждой записи (-R - тем же способом рекурсивно)"""
+    lines = []
+    stack = [target_dir]
+    while stack:
+        dir_path = stack.pop()
+        for item in os.listdir(dir_path):
+            item_path = os.path.join(dir_path, item)
+            if os.path.isdir(item_path):
+                lines.append(f"\033[93m{item}/\033[0m\n")
+                if recursive:
+                    stack.append(item_path)
+            else:
+                lines.append(f"{item}\n")
+    return "".join(lines)
+
+
+def make_tree(root, flat_count, tree_count):
+    """Плоская директория с flat_count файлами и дерево из tree_count файлов по 100 в директории"""
+    flat = os.path.join(root, "flat")
+    os.makedirs(flat)
+    for i in range(flat_count):
+        open(os.path.join(flat, f"file{i}.txt"), 'w').close()
+    tree = os.path.join(root, "tree")
+    for i in range(tree_count):
+        dir_path = os.path.join(tree, f"d{i // 1000}", f"s{i // 100 % 10}")
+        if i % 100 == 0:
+            os.makedirs(dir_path)
+        open(os.path.join(dir_path, f"file{i}.txt"), 'w').close()
+    return flat, tree
+
+
+def measure(run):
+    """Лучшее время из RUNS запусков (мс) и число перехваченных обращений к ФС за один запуск"""
+    best = float("inf")
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    with CallCounter(["stat", "lstat", "listdir", "scandir"]) as counter:
+        run()
+    return best * 1000, counter.count
+
+
+def main():
+    flat_count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    tree_count = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    shell = UnixShellEmulator()
+    sink = NullSink()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        flat, tree = make_tree(tmp, flat_count, tree_count)
+        shell.current_dir = tmp
+
+        cases = [
+            (f"ls ({flat_count} файлов)", lambda: legacy_ls(flat), lambda: shell.run_line("ls flat", out=sink)),
+            (f"ls -l ({flat_count} файлов)", None, lambda: shell.run_line("ls -l flat", out=sink)),
+            (f"ls -R ({tree_count} файлов)", lambda: legacy_ls(tree, recursive=True),
+             lambda: shell.run_line("ls -R tree", out=sink)),
+        ]
+        for title, legacy, current in cases:
+            print(title)
+            if legacy is not None:
+                elapsed, calls = measure(legacy)
+                print(f"  listdir + isdir: {elapsed:8.1f} мс, обращений к ФС: {calls}")
+            elapsed, calls = measure(current)
+            print(f"  scandir:         {elapsed:8.1f} мс, обращений к ФС: {calls}")
+
+        # Параллельный обход выигрывает, когда чтение директории ждет сеть, а не CPU
+        workers, scan = shell_module.LS_WORKERS, shell_module.scan_host_directory
+
+        def slow_scan(path, options):
+            time.sleep(LATENCY)
+            return scan(path, options)
+
+        for latency, scanner in ((0, scan), (LATENCY, slow_scan)):
+            shell_module.scan_host_directory = scanner
+            for count in (1, workers):
+                shell_module.LS_WORKERS = count
+                elapsed, _ = measure(lambda: shell.run_line("ls -lR tree", out=sink))
+                print(f"ls -lR, задержка {latency * 1000:.0f} мс на директорию, потоков {count:>2}: {elapsed:8.1f} мс")
+        shell_module.LS_WORKERS, shell_module.scan_host_directory = workers, scan
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Бенчмарк: время открытия и RSS для загрузчика zipfile и mmap-бэкенда на несжатых архивах"""
+import contextlib
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+
+def run_variant(variant, vfs_path):
+    """Загружает архив выбранным способом и печатает время (мс) и пиковый RSS (КБ)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        if variant == "zipfile":
+            vfs = VirtualFileSystem()
+            with zipfile.ZipFile(vfs_path) as zip_ref:
+                vfs._build_tree(zip_ref, zip_ref.read)
+        else:
+            vfs = VirtualFileSystem(vfs_path, lazy=variant == "mmap-lazy")
+        elapsed = (time.perf_counter() - start) * 1000
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{elapsed:.1f} {rss}")
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--variant":
+        run_variant(sys.argv[2], sys.argv[3])
+        return
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    file_size = int(sys.argv[2]) if len(sys.argv) > 2 else 64 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'stored.vfs.zip'), count, file_size=file_size,
+                                compression=zipfile.ZIP_STORED)
+        print(f"архив {os.path.getsize(vfs_path) / 2 ** 20:.0f} МБ, {count} несжатых файлов")
+        for variant in ("zipfile", "mmap-eager", "mmap-lazy"):
+            output = subprocess.run([sys.executable, __file__, "--variant", variant, vfs_path],
+                                    capture_output=True, text=True, check=True).stdout
+            elapsed, rss = output.split()
+            print(f"{variant:<12} открытие {float(elapsed):8.1f} мс, RSS {int(rss) / 1024:8.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Бенчмарк: память на узел VFS для словарей и узлов со __slots__"""
+from datetime import datetime
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VfsNodes import DirNode, FileNode
+
+
+def build_dict_tree(count, fanout):
+    """Дерево в старом формате: вложенные словари и ISO-строки времени"""
+    root = {"type": "directory", "content": {}}
+    for d in range(count // fanout):
+        children = {}
+        for f in range(fanout):
+            children[f"file{f}.txt"] = {
+                "type": "file",
+                "content": "",
+                "created": datetime.now().isoformat(),
+                "modified": datetime.now().isoformat()
+            }
+        root["content"][f"dir{d}"] = {"type": "directory", "content": children}
+    return root
+
+
+def build_node_tree(count, fanout):
+    """Дерево из FileNode/DirNode с временем в наносекундах"""
+    root = DirNode()
+    now = time.time_ns()
+    for d in range(count // fanout):
+        children = {}
+        for f in range(fanout):
+            children[f"file{f}.txt"] = FileNode("", None, now, now)
+        root.children[f"dir{d}"] = DirNode(children)
+    return root
+
+
+def measure(builder, count, fanout):
+    """Возвращает байт на узел по данным tracemalloc"""
+    tracemalloc.start()
+    tree = builder(count, fanout)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return current / (count + count // fanout)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    fanout = 100
+    before = measure(build_dict_tree, count, fanout)
+    after = measure(build_node_tree, count, fanout)
+    print(f"{count} файлов: словари {before:.0f} Б/узел, __slots__ {after:.0f} Б/узел "
+          f"({before / after:.1f}x меньше)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Бенчмарк: масштабирование полной загрузки VFS по числу потоков распаковки"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    file_size = int(sys.argv[2]) if len(sys.argv) > 2 else 16 * 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'deflated.vfs.zip'), count, file_size=file_size,
+                                compression=zipfile.ZIP_DEFLATED)
+        print(f"{count} сжатых файлов, {os.cpu_count()} ядер")
+
+        baseline = None
+        for workers in (1, 2, 4, 8, 16):
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                vfs = VirtualFileSystem(vfs_path, workers=workers)
+                elapsed = time.perf_counter() - start
+            vfs._close_archive()
+            baseline = baseline or elapsed
+            print(f"{workers:>3} потоков: {elapsed * 1000:9.1f} мс, ускорение {baseline / elapsed:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
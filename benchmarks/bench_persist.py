@@ -0,0 +1,42 @@
+"""Бенчмарк: сохранение одного измененного файла дозаписью против полной перезаписи архива"""
+import contextlib
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+
+def timed_save(vfs_path, method):
+    """Загружает архив, меняет один файл и замеряет время сохранения (мс)"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        vfs = VirtualFileSystem(vfs_path, lazy=True)
+        vfs.create_file("/changed.txt", b"one changed file")
+        start = time.perf_counter()
+        getattr(vfs, method)()
+        elapsed = (time.perf_counter() - start) * 1000
+    vfs._close_archive()
+    return elapsed
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 1024
+    with tempfile.TemporaryDirectory() as tmp:
+        source = make_archive(os.path.join(tmp, 'source.vfs.zip'), size_mb, file_size=1024 * 1024,
+                              compression=zipfile.ZIP_STORED, binary_ratio=1.0)
+        print(f"архив {os.path.getsize(source) / 2 ** 20:.0f} МБ")
+        for method, label in (("sync", "дозапись (vfs sync)"), ("compact", "полная перезапись")):
+            vfs_path = shutil.copy(source, os.path.join(tmp, f'{method}.vfs.zip'))
+            elapsed = timed_save(vfs_path, method)
+            print(f"{label:<22} {elapsed:10.1f} мс, размер {os.path.getsize(vfs_path) / 2 ** 20:.0f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Бенчмарк: конвейер из нескольких стадий над большим файлом VFS, пиковая память"""
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from UnixShellEmulator import UnixShellEmulator
+from bench_cat_stream import NullSink
+
+
+def materialized(shell):
+    """Старая схема: полный вывод каждой стадии собирается в память и разбирается заново"""
+    lines = shell.vfs.read_file("/big.txt").split("\n")
+    lines = [line for line in lines if "7" in line]
+    lines = [line for line in lines if "3" not in line]
+    return len(lines)
+
+
+def main():
+    size_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    shell = UnixShellEmulator(out=NullSink())
+    shell.in_vfs_mode = True
+    line = b"".join(b"%08d some log line payload\n" % i for i in range(10_000))
+    shell.vfs.create_file("/big.txt", line * max(1, size_mb * 2 ** 20 // len(line)))
+
+    for label, run in (("материализация", lambda: materialized(shell)),
+                       ("конвейер", lambda: shell.run_line("cat /big.txt | grep 7 | grep -v 3 | wc -l"))):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+
+        # Память замеряется отдельным прогоном: tracemalloc сильно замедляет выполнение
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:<16} {size_mb} МБ: {elapsed:7.2f} с, пик памяти {peak / 2 ** 20:8.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Бенчмарк: стоимость диспетчеризации команды с профилировщиком и без него"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from ShellProfiler import CommandProfiler
+from UnixShellEmulator import UnixShellEmulator
+from bench_cat_stream import NullSink
+
+CALLS = 200_000
+LINES = ["echo x", "pwd", "vfs status"]
+
+
+def per_call(shell, line, calls=CALLS):
+    """Среднее время выполнения строки команд (мкс)"""
+    sink = NullSink()
+    run_line = shell.run_line
+    start = time.perf_counter()
+    for _ in range(calls):
+        run_line(line, out=sink)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else CALLS
+    plain = UnixShellEmulator()
+    profiled = UnixShellEmulator(profiler=CommandProfiler())
+    for shell in (plain, profiled):
+        shell.run_line("vfs on", out=NullSink())  # VFS создается до замеров
+
+    for line in LINES:
+        off = per_call(plain, line, calls)
+        on = per_call(profiled, line, calls)
+        print(f"{line:<12} без профилирования {off:6.2f} мкс, с профилированием {on:6.2f} мкс "
+              f"(+{on - off:.2f} мкс)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Бенчмарк: смешанные обращения к путям VFS на глубоком дереве"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from VirtualFileSystem import VirtualFileSystem
+
+
+def main():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    vfs_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(root, 'tests', 'zip', 'deep_structure.vfs.zip')
+    total = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        vfs = VirtualFileSystem(vfs_path)
+    vfs.change_directory("/level1/level2")
+
+    operations = [
+        (vfs.resolve_path, "/level1/level2/level3/level4"),
+        (vfs.resolve_path, "level3/level4"),
+        (vfs.resolve_path, "level3/../level3/level4/."),
+        (vfs.resolve_path, "../../other/branch"),
+        (vfs.read_file, "/level1/level2/level3/level4/file4.txt"),
+        (vfs.read_file, "level3/file3.txt"),
+        (vfs.read_file, "../file1.txt"),
+        (vfs.resolve_path, "/level1/missing/level3"),
+    ]
+
+    start = time.perf_counter()
+    for i in range(total // len(operations)):
+        for func, path in operations:
+            func(path)
+    elapsed = time.perf_counter() - start
+    print(f"{total} обращений: {elapsed:.2f} с, {total / elapsed:,.0f} обращений/с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Нагрузочный клиент сервера эмулятора: сеансов/с, команд/с и память на сеанс
+
+Использование: python bench_server.py [сеансов] [параллельно] [файлов_в_архиве]
+"""
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from synthetic import make_archive
+
+SESSION_COMMANDS = ["vfs on", "cd /d1", "ls", "pwd", "cat /d1/d2/d3/file0.txt", "echo hi > /tmp_file.txt",
+                    "wc -l /tmp_file.txt", "cd /", "du -s /"]
+IDLE_SESSIONS = 200
+
+
+def rss_kb(pid):
+    """Резидентная память процесса, КБ"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+async def run_session(socket_path, commands):
+    """Сеанс: отправляет команды и exit, читает вывод до закрытия соединения"""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write("".join(f"{command}\n" for command in commands + ["exit"]).encode('utf-8'))
+    await writer.drain()
+    while await reader.read(65536):
+        pass
+    writer.close()
+    await writer.wait_closed()
+
+
+async def load(socket_path, sessions, concurrency):
+    """Выполняет sessions сеансов не более чем по concurrency одновременно"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await run_session(socket_path, SESSION_COMMANDS)
+
+    await asyncio.gather(*(limited() for _ in range(sessions)))
+
+
+async def open_idle(socket_path, count):
+    """Открывает count сеансов с включенным режимом VFS и оставляет их открытыми"""
+    connections = []
+    for _ in range(count):
+        reader, writer = await asyncio.open_unix_connection(socket_path)
+        writer.write(b"vfs on\ncd /d1\n")
+        await writer.drain()
+        connections.append((reader, writer))
+    for reader, _ in connections:
+        await reader.readuntil(b"/d1$ ")
+    return connections
+
+
+def standalone_rss_kb(vfs_path):
+    """Пиковая память отдельного процесса эмулятора с той же VFS, КБ"""
+    before = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    subprocess.run([sys.executable, 'main.py', '-v', vfs_path, '-c', 'vfs on; ls /'], cwd=ROOT,
+                   stdout=subprocess.DEVNULL, check=True)
+    return max(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss, before)
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    file_count = int(sys.argv[3]) if len(sys.argv) > 3 else 20_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'server.vfs.zip'), file_count, depth=3, fanout=10)
+        socket_path = os.path.join(tmp, 'shell.sock')
+        server = subprocess.Popen([sys.executable, 'main.py', '-v', vfs_path, '--serve', socket_path],
+                                  cwd=ROOT, stdout=subprocess.PIPE, text=True)
+        try:
+            while "слушает" not in server.stdout.readline():
+                pass
+
+            async def measure_idle():
+                base = rss_kb(server.pid)
+                connections = await open_idle(socket_path, IDLE_SESSIONS)
+                loaded = rss_kb(server.pid)
+                for _, writer in connections:
+                    writer.close()
+                return base, loaded
+
+            base, loaded = asyncio.run(measure_idle())
+            print(f"память сервера: {base / 1024:.1f} МБ, с {IDLE_SESSIONS} открытыми сеансами "
+                  f"{loaded / 1024:.1f} МБ ({(loaded - base) / IDLE_SESSIONS:.1f} КБ на сеанс)")
+            print(f"отдельный процесс эмулятора с той же VFS: {standalone_rss_kb(vfs_path) / 1024:.1f} МБ")
+
+            start = time.perf_counter()
+            asyncio.run(load(socket_path, sessions, concurrency))
+            elapsed = time.perf_counter() - start
+            commands = sessions * (len(SESSION_COMMANDS) + 1)
+            print(f"сеансов: {sessions} (по {concurrency} одновременно), команд в сеансе: {len(SESSION_COMMANDS) + 1}")
+            print(f"{sessions / elapsed:10.0f} сеансов/с")
+            print(f"{commands / elapsed:10.0f} команд/с")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
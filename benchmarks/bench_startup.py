@@ -0,0 +1,75 @@
+"""Бенчмарк холодного старта: разбивка импорта (-X importtime) и время запуска main.py -s с пустым скриптом
+
+Использование: python bench_startup.py [порог_мс]
+Код завершения 1, если накладные расходы запуска сверх пустого интерпретатора превышают порог.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RUNS = 20
+DEFAULT_THRESHOLD_MS = 40
+TOP_IMPORTS = 10
+
+
+def python_env():
+    """Окружение запуска: байткод кэшируется, как при обычном запуске"""
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def wall_clock(args, runs=RUNS):
+    """Медианное время запуска процесса (мс)"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT, env=python_env(), stdin=subprocess.DEVNULL,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def import_breakdown(module):
+    """Самые долгие импорты модуля: список (накопленное время мкс, имя модуля)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            cwd=ROOT, env=python_env(), capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        imports.append((int(cumulative), name.strip()))
+    return sorted(imports, reverse=True)[:TOP_IMPORTS]
+
+
+def main():
+    threshold = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_THRESHOLD_MS
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, 'empty.txt')
+        open(script, 'w').close()
+
+        command = [sys.executable, 'main.py', '-s', script]
+        wall_clock(command, runs=1)  # Прогрев: компиляция байткода
+
+        print("импорт UnixShellEmulator (накопленное время):")
+        for cumulative, name in import_breakdown('UnixShellEmulator'):
+            print(f"  {cumulative / 1000:8.2f} мс  {name}")
+
+        interpreter = wall_clock([sys.executable, '-c', 'pass'])
+        startup = wall_clock(command)
+        overhead = startup - interpreter
+        print(f"пустой интерпретатор  {interpreter:8.2f} мс")
+        print(f"main.py -s <пустой>   {startup:8.2f} мс (сверх интерпретатора {overhead:.2f} мс, порог {threshold:.0f} мс)")
+
+    if overhead > threshold:
+        print("РЕГРЕССИЯ: время запуска превышает порог")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
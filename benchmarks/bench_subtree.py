@@ -0,0 +1,83 @@
+"""Бенчмарк: mv, cp -r и rm -r поддерева против пофайловых операций
+
+Использование: python bench_subtree.py [файлов_в_архиве]
+
+Верхний уровень архива - две директории, поэтому поддерево /d0 содержит около половины файлов.
+Каждый замер выполняется на ответвлении базовой VFS.
+"""
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import VirtualFileSystem as vfs_module
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+
+def timed(run):
+    """Время выполнения run(), мс"""
+    start = time.perf_counter()
+    run()
+    return (time.perf_counter() - start) * 1000
+
+
+def per_file_move(vfs, source, target):
+    """mv через копирование и удаление каждого файла - как без перемещения узла целиком"""
+    per_file_copy(vfs, source, target)
+    for path in [path for path, node in vfs._walk(source) if node.type.value == 'file']:
+        vfs.remove_file(path)
+    vfs.remove_directory(source, recursive=True)
+
+
+def per_file_copy(vfs, source, target):
+    """cp -r через copy_file для каждого файла"""
+    for path, node in list(vfs._walk(source)):
+        new_path = target + path[len(source):]
+        if node.type.value == 'directory':
+            vfs.make_directory(new_path, parents=True)
+        else:
+            vfs.copy_file(path, new_path)
+
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        vfs_path = make_archive(os.path.join(tmp, 'subtree.vfs.zip'), file_count, depth=3, fanout=2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            base = VirtualFileSystem(vfs_path)
+        subtree = base.stat('/d0')[1]
+        print(f"файлов: {file_count}, в поддереве /d0: {subtree.file_count}, REKEY_LIMIT: {vfs_module.REKEY_LIMIT}")
+
+        cases = [
+            ("mv /d0 /moved", lambda v: v.move('/d0', '/moved'), lambda v: per_file_move(v, '/d0', '/moved')),
+            ("cp -r /d0 /copy", lambda v: v.copy_directory('/d0', '/copy'), lambda v: per_file_copy(v, '/d0', '/copy')),
+            ("rm -r /d0", lambda v: v.remove_directory('/d0', recursive=True), None),
+        ]
+        for title, subtree_op, per_file_op in cases:
+            print(title)
+            if per_file_op is not None:
+                print(f"  по файлам:    {timed(lambda: per_file_op(base.fork())):9.1f} мс")
+            print(f"  поддеревом:   {timed(lambda: subtree_op(base.fork())):9.3f} мс")
+
+        # Маленькое поддерево переиндексируется сразу, большое - сбрасывает плоский индекс
+        small = vfs_module.REKEY_LIMIT // 2
+        base.make_directory("/small")
+        for i in range(small):
+            base.create_file(f"/small/f{i}.txt")
+        fork = base.fork()
+        print(f"mv поддерева из {small} файлов (переиндексация): "
+              f"{timed(lambda: fork.move('/small', '/d1/small')):8.3f} мс")
+        fork = base.fork()
+        fork.move('/d0', '/moved')
+        print(f"первое обращение к перемещенному файлу после сброса индекса: "
+              f"{timed(lambda: fork.stat('/moved/d1/d1/file1.txt')):8.3f} мс")
+
+
+if __name__ == "__main__":
+    main()
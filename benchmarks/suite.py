@@ -0,0 +1,334 @@
+"""Набор бенчмарков с машиночитаемыми результатами и сравнением с базовой линией
+
+Использование: python suite.py [--preset quick|full] [--scenario имя ...] [--json путь]
+               [--baseline путь] [--threshold доля] [--seed N] [--repeat N]
+
+Архив генерируется детерминированно по параметрам набора (synthetic.make_archive), каждый замер -
+лучший из нескольких прогонов. --json записывает результаты; файл, записанный на той же машине,
+служит базовой линией для --baseline. Код завершения 1, если хоть одна метрика хуже базовой
+линии больше чем на threshold.
+"""
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from UnixShellEmulator import UnixShellEmulator
+from VirtualFileSystem import VirtualFileSystem
+from synthetic import make_archive
+
+FORMAT_VERSION = 1
+DEFAULT_THRESHOLD = 0.25  # Допустимое ухудшение метрики относительно базовой линии
+RUNS = 5
+CALIBRATION_SIZE = 100_000
+CALIBRATION_TOLERANCE = 0.1  # Расхождение эталонной нагрузки, при котором сравнение с базой ненадежно
+
+# Параметры архива и объем работы сценариев
+PRESETS = {
+    "quick": {
+        "archive": {"file_count": 5_000, "depth": 3, "fanout": 10, "file_size": 1024,
+                    "size_distribution": "lognormal", "binary_ratio": 0.1, "stored_ratio": 0.3},
+        "lookups": 200_000, "commands": 2_000, "script_lines": 20_000,
+    },
+    "full": {
+        "archive": {"file_count": 100_000, "depth": 3, "fanout": 10, "file_size": 1024,
+                    "size_distribution": "lognormal", "binary_ratio": 0.1, "stored_ratio": 0.3},
+        "lookups": 1_000_000, "commands": 20_000, "script_lines": 200_000,
+    },
+}
+
+
+def metric(value, unit, better):
+    """Запись метрики: значение, единица и направление улучшения ("lower" или "higher")"""
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def best_time(run, runs=RUNS, setup=None):
+    """Лучшее время выполнения run() (с): меньше всего зависит от фоновой нагрузки; setup() перед
+    каждым прогоном не замеряется, его результат передается в run"""
+    times = []
+    for number in range(runs):
+        arg = setup(number) if setup is not None else None
+        start = time.perf_counter()
+        run() if setup is None else run(arg)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def calibration():
+    """Время эталонной нагрузки на чистом Python (мс): скорость машины в момент замеров"""
+    def workload():
+        table = {}
+        for i in range(CALIBRATION_SIZE):
+            table[f"/d{i % 10}/file{i}"] = i
+        return sum(table[key] for key in sorted(table))
+    return best_time(workload) * 1000
+
+
+def quiet_vfs(archive, **options):
+    """VFS из архива без сообщений о загрузке"""
+    return VirtualFileSystem(archive, out=io.StringIO(), **options)
+
+
+class Context:
+    """Общие данные сценариев: архив, его файлы и директории, параметры набора"""
+
+    def __init__(self, archive, preset, seed):
+        self.archive = archive
+        self.preset = preset
+        self.rng = random.Random(seed)
+        with zipfile.ZipFile(archive) as zip_ref:
+            self.files = ["/" + name for name in zip_ref.namelist()]
+        self.dirs = sorted({path.rpartition("/")[0] for path in self.files})
+
+    def sample(self, population, count):
+        """count случайных элементов с повторами (детерминированно по зерну набора)"""
+        return self.rng.choices(population, k=count)
+
+    def shell(self, out):
+        """Эмулятор с загруженной VFS в режиме VFS"""
+        shell = UnixShellEmulator(vfs_path=self.archive, out=out)
+        shell.run_line("vfs on")
+        return shell
+
+
+def scenario_load(ctx):
+    """Загрузка архива: жадная, ленивая и в несколько потоков"""
+    results = {}
+    for name, options in (("eager", {}), ("lazy", {"lazy": True}), ("workers4", {"workers": 4})):
+        results[f"load_{name}"] = metric(best_time(lambda: quiet_vfs(ctx.archive, **options)._close_archive())
+                                         * 1000, "мс", "lower")
+    return results
+
+
+def scenario_lookup(ctx):
+    """Разрешение путей: абсолютные, относительные с '..' и несуществующие"""
+    vfs = quiet_vfs(ctx.archive)
+    count = ctx.preset["lookups"]
+    absolute = ctx.sample(ctx.files, count)
+    base = ctx.dirs[len(ctx.dirs) // 2]
+    relative = [f"../{path.rpartition('/')[2]}" for path in ctx.sample(ctx.files, count)]
+    missing = [f"{path}.missing/x" for path in ctx.sample(ctx.files, count)]
+
+    def resolve(paths):
+        resolve_path = vfs.resolve_path
+        for path in paths:
+            resolve_path(path)
+
+    vfs.change_directory(base)
+    results = {}
+    for name, paths in (("absolute", absolute), ("relative", relative), ("missing", missing)):
+        elapsed = best_time(lambda: resolve(paths))
+        results[f"lookup_{name}"] = metric(count / elapsed, "оп/с", "higher")
+    return results
+
+
+def _command_rate(shell, lines, runs=RUNS):
+    """Команд в секунду при выполнении строк через run_line (разбор, диспетчеризация, вывод);
+    lines(number) - строки прогона number"""
+    def run(batch):
+        for line in batch:
+            shell.run_line(line)
+    batches = [lines(number) for number in range(runs)]
+    return len(batches[0]) / best_time(run, runs, setup=batches.__getitem__)
+
+
+def scenario_commands(ctx):
+    """Пропускная способность ls, cat, touch и rm, а также диспетчеризации пустой команды"""
+    count = ctx.preset["commands"]
+    with open(os.devnull, 'w', encoding='utf-8') as out:
+        shell = ctx.shell(out)
+        directories = ctx.sample(ctx.dirs, count)
+        dirs = [f"ls {path}" for path in ctx.sample(ctx.dirs, count)]
+        files = [f"cat {path}" for path in ctx.sample(ctx.files, count)]
+        rates = {
+            "ls": _command_rate(shell, lambda number: dirs),
+            "cat": _command_rate(shell, lambda number: files),
+            # Каждый прогон touch создает свои файлы, прогон rm с тем же номером их удаляет
+            "touch": _command_rate(shell, lambda number: [f"touch {directory}/bench{number}_{i}.txt"
+                                                          for i, directory in enumerate(directories)]),
+            "rm": _command_rate(shell, lambda number: [f"rm {directory}/bench{number}_{i}.txt"
+                                                       for i, directory in enumerate(directories)]),
+            "pwd": _command_rate(shell, lambda number: ["pwd"] * count),
+        }
+    return {f"command_{name}": metric(rate, "команд/с", "higher") for name, rate in rates.items()}
+
+
+def make_script(ctx, count):
+    """Стартовый скрипт: смесь навигации, чтения и изменения файлов VFS"""
+    pattern = ["cd {dir}", "ls", "cat {file}", "touch {dir}/script{i}.txt", "echo шаг {i}",
+               "stat {file}", "rm {dir}/script{i}.txt", "cd /"]
+    lines = ["vfs on"]
+    for i, (directory, path) in enumerate(zip(ctx.sample(ctx.dirs, count // len(pattern)),
+                                              ctx.sample(ctx.files, count // len(pattern)))):
+        lines.extend(line.format(dir=directory, file=path, i=i) for line in pattern)
+    return lines
+
+
+def scenario_script(ctx):
+    """Большой стартовый скрипт: в процессе (run_startup_script) и целиком процессом main.py --batch"""
+    lines = make_script(ctx, ctx.preset["script_lines"])
+    with open(os.devnull, 'w', encoding='utf-8') as out:
+        def loaded_shell(number):
+            shell = UnixShellEmulator(vfs_path=ctx.archive, startup_script=lines, out=out)
+            shell.vfs  # Загрузка архива не входит в замер
+            return shell
+        elapsed = best_time(lambda shell: shell.run_startup_script(), runs=3, setup=loaded_shell)
+
+    script = os.path.join(os.path.dirname(ctx.archive), "script.txt")
+    with open(script, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines))
+    process = best_time(lambda: subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "-v", ctx.archive, "-s", script, "--batch"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True), runs=3)
+    return {"script_lines": metric(len(lines) / elapsed, "строк/с", "higher"),
+            "script_process": metric(process * 1000, "мс", "lower")}
+
+
+SCENARIOS = {
+    "load": scenario_load,
+    "lookup": scenario_lookup,
+    "commands": scenario_commands,
+    "script": scenario_script,
+}
+
+
+def git_revision():
+    """Текущий коммит репозитория или None"""
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def better(current, candidate):
+    """Лучшая из двух записей одной метрики"""
+    if current is None:
+        return candidate
+    if current["better"] == "lower":
+        return min(current, candidate, key=lambda entry: entry["value"])
+    return max(current, candidate, key=lambda entry: entry["value"])
+
+
+def run_suite(preset_name, scenarios, seed, repeat=3):
+    """Выполняет сценарии repeat раз и возвращает отчет: описание окружения и лучшие значения метрик
+
+    Повторы всего набора, а не только прогонов внутри сценария, разнесены во времени и сглаживают
+    периоды фоновой нагрузки длиной в секунды.
+    """
+    preset = PRESETS[preset_name]
+    report = {
+        "format": FORMAT_VERSION,
+        "preset": preset_name,
+        "seed": seed,
+        "repeat": repeat,
+        "config": preset,
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "revision": git_revision(),
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "calibration_ms": None,
+        },
+        "metrics": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        archive = make_archive(os.path.join(tmp, "suite.vfs.zip"), seed=seed, **preset["archive"])
+        print(f"архив: {preset['archive']['file_count']} файлов, {os.path.getsize(archive) / 2**20:.1f} МБ "
+              f"(генерация {time.perf_counter() - start:.1f} с)", file=sys.stderr)
+        metrics = report["metrics"]
+        calibrations = []
+        for round_number in range(repeat):
+            calibrations.append(calibration())
+            ctx = Context(archive, preset, seed)  # Одни и те же выборки в каждом повторе
+            for name in scenarios:
+                start = time.perf_counter()
+                for key, value in SCENARIOS[name](ctx).items():
+                    metrics[key] = better(metrics.get(key), value)
+                print(f"повтор {round_number + 1}/{repeat}: {name} ({time.perf_counter() - start:.1f} с)",
+                      file=sys.stderr)
+        report["environment"]["calibration_ms"] = round(min(calibrations), 3)
+    for key, value in report["metrics"].items():
+        print(f"  {key:24} {value['value']:14,.1f} {value['unit']}", file=sys.stderr)
+    return report
+
+
+def compare(report, baseline, threshold):
+    """Сравнивает метрики с базовой линией; возвращает список регрессий"""
+    if (baseline.get("format") != report["format"] or baseline.get("preset") != report["preset"]
+            or baseline.get("seed") != report["seed"]):
+        print(f"предупреждение: базовая линия снята с другими параметрами "
+              f"({baseline.get('preset')}, зерно {baseline.get('seed')})", file=sys.stderr)
+    base_calibration = baseline.get("environment", {}).get("calibration_ms")
+    calibration_ms = report["environment"]["calibration_ms"]
+    if base_calibration and abs(calibration_ms / base_calibration - 1) > CALIBRATION_TOLERANCE:
+        print(f"предупреждение: эталонная нагрузка {calibration_ms:.1f} мс против {base_calibration:.1f} мс "
+              f"в базовой линии - машина или ее загрузка отличаются", file=sys.stderr)
+    regressions = []
+    print(f"{'метрика':26}{'база':>14}{'сейчас':>14}{'скорость':>10}", file=sys.stderr)
+    for key, current in report["metrics"].items():
+        base = baseline.get("metrics", {}).get(key)
+        if base is None or not base["value"] or not current["value"]:
+            continue
+        # Скорость относительно базовой линии: для "lower" - во сколько раз уменьшилось значение,
+        # для "higher" - во сколько раз выросло; регрессия - замедление больше чем на threshold
+        if current["better"] == "lower":
+            speed = base["value"] / current["value"]
+        else:
+            speed = current["value"] / base["value"]
+        mark = ""
+        if 1 / speed - 1 > threshold:
+            regressions.append(key)
+            mark = "  РЕГРЕССИЯ"
+        print(f"{key:26}{base['value']:>14,.1f}{current['value']:>14,.1f}{f'x{speed:.2f}':>10}{mark}",
+              file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Набор бенчмарков эмулятора")
+    parser.add_argument("--preset", choices=PRESETS, default="quick", help="размер архива и объем работы")
+    parser.add_argument("--scenario", choices=SCENARIOS, action="append", help="сценарий (по умолчанию - все)")
+    parser.add_argument("--json", help="записать результаты в файл (- - в stdout)")
+    parser.add_argument("--baseline", help="сравнить с результатами из файла")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="допустимое ухудшение (доля)")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генерации архива и выборок")
+    parser.add_argument("--repeat", type=int, default=3, help="повторов всего набора; берется лучшее значение")
+    args = parser.parse_args()
+
+    report = run_suite(args.preset, args.scenario or list(SCENARIOS), args.seed, args.repeat)
+    if args.json == "-":
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"РЕГРЕССИЯ: {', '.join(regressions)} (порог {args.threshold:.0%})", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
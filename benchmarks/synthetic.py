@@ -0,0 +1,89 @@
+"""Генератор синтетических VFS-архивов для бенчмарков
+
+Использование: python synthetic.py [путь] [--files N] [--depth N] [--fanout N] [--size байт]
+               [--sizes fixed|uniform|lognormal] [--binary доля] [--stored доля] [--duplicates доля] [--seed N]
+"""
+import argparse
+import math
+import os
+import random
+import zipfile
+
+SIZE_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+LOGNORMAL_SIGMA = 1.0  # Разброс логнормальных размеров: много мелких файлов и редкие крупные
+MAX_SIZE_FACTOR = 64  # Логнормальный размер ограничен file_size * MAX_SIZE_FACTOR
+MEMBER_TIME = (2024, 1, 1, 0, 0, 0)
+
+
+def _file_size(rng, file_size, distribution):
+    """Размер очередного файла: fixed - ровно file_size, uniform - от 0 до 2*file_size,
+    lognormal - с медианой file_size"""
+    if distribution == "fixed":
+        return file_size
+    if distribution == "uniform":
+        return rng.randrange(2 * file_size + 1)
+    size = int(rng.lognormvariate(math.log(max(file_size, 1)), LOGNORMAL_SIGMA))
+    return min(size, file_size * MAX_SIZE_FACTOR)
+
+
+def make_archive(path, file_count=1000, depth=3, fanout=10, file_size=256,
+                 compression=zipfile.ZIP_DEFLATED, binary_ratio=0.0, seed=0, duplicate_ratio=0.0, templates=50,
+                 size_distribution="fixed", stored_ratio=None):
+    """Создает ZIP-архив с file_count файлами в дереве заданной глубины
+
+    binary_ratio - доля бинарных файлов; duplicate_ratio - доля копий одного из templates общих
+    файлов (пустые файлы, шаблоны, вендоренные библиотеки). size_distribution - распределение
+    размеров (SIZE_DISTRIBUTIONS); stored_ratio - доля файлов без сжатия, остальные сжимаются
+    compression (None - все файлы с compression).
+    """
+    if size_distribution not in SIZE_DISTRIBUTIONS:
+        raise ValueError(f"Неизвестное распределение размеров: {size_distribution}")
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    shared = [b""] + [f"шаблон {t}\n".encode('utf-8') * rng.randrange(1, file_size // 4)
+                      for t in range(templates - 1)]
+
+    with zipfile.ZipFile(path, 'w', compression) as zip_ref:
+        for i in range(file_count):
+            parts = [f"d{rng.randrange(fanout)}" for _ in range(depth)]
+            size = _file_size(rng, file_size, size_distribution)
+            if duplicate_ratio and rng.random() < duplicate_ratio:
+                name = "/".join(parts + [f"copy{i}.txt"])
+                content = rng.choice(shared)
+            elif rng.random() < binary_ratio:
+                name = "/".join(parts + [f"image{i}.bin"])
+                content = b"\x89PNG" + rng.randbytes(max(size - 4, 0))
+            else:
+                name = "/".join(parts + [f"file{i}.txt"])
+                line = f"строка {i} файла {name}\n"
+                content = (line * (size // len(line) + 1))[:size]
+            # Фиксированное время членов: архив с теми же параметрами совпадает побайтно
+            info = zipfile.ZipInfo(name, date_time=MEMBER_TIME)
+            info.compress_type = compression
+            if stored_ratio is not None and rng.random() < stored_ratio:
+                info.compress_type = zipfile.ZIP_STORED
+            zip_ref.writestr(info, content)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генератор синтетических VFS-архивов")
+    parser.add_argument("path", help="путь создаваемого архива (.vfs.zip)")
+    parser.add_argument("--files", type=int, default=1000, help="число файлов")
+    parser.add_argument("--depth", type=int, default=3, help="глубина дерева директорий")
+    parser.add_argument("--fanout", type=int, default=10, help="поддиректорий на уровне")
+    parser.add_argument("--size", type=int, default=256, help="размер файла (медиана для lognormal), байт")
+    parser.add_argument("--sizes", choices=SIZE_DISTRIBUTIONS, default="fixed", help="распределение размеров")
+    parser.add_argument("--binary", type=float, default=0.0, help="доля бинарных файлов")
+    parser.add_argument("--stored", type=float, default=None, help="доля файлов без сжатия")
+    parser.add_argument("--duplicates", type=float, default=0.0, help="доля файлов-копий общих шаблонов")
+    parser.add_argument("--seed", type=int, default=0, help="зерно генератора")
+    args = parser.parse_args()
+    make_archive(args.path, args.files, args.depth, args.fanout, args.size, binary_ratio=args.binary,
+                 seed=args.seed, duplicate_ratio=args.duplicates, size_distribution=args.sizes,
+                 stored_ratio=args.stored)
+    print(f"{args.path}: {args.files} файлов, {os.path.getsize(args.path) / 2**20:.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
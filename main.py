@@ -2,29 +2,84 @@ import os
 import sys
 from UnixShellEmulator import UnixShellEmulator
 
+BATCH_BUFFER_SIZE = 1 << 16
+
 
 def parse_arguments():
     """Обрабатывает аргументы командной строки для настройки эмулятора"""
-    vfs_path = None
-    startup_script = None
+    options = {
+        'vfs_path': None,
+        'startup_script': None,
+        'lazy_vfs': False,
+        'autosave': False,
+        'vfs_workers': 1,
+        'vfs_index': False,
+        'vfs_journal': False,
+        'batch': False,
+        'batch_commands': None,
+        'echo': False,
+        'profile': False,
+        'cprofile_path': None,
+        'tracemalloc_path': None,
+        'serve': None,
+    }
 
     args = sys.argv[1:]
     i = 0
     while i < len(args):
         if (args[i] == '--vfs' or args[i] == '-v') and i + 1 < len(args):
-            vfs_path = args[i + 1]
+            options['vfs_path'] = args[i + 1]
             i += 1
         elif (args[i] == '--script' or args[i] == '-s') and i + 1 < len(args):
-            startup_script = args[i + 1]
+            options['startup_script'] = args[i + 1]
+            i += 1
+        elif args[i] == '--lazy':
+            options['lazy_vfs'] = True
+        elif args[i] == '--autosave':
+            options['autosave'] = True
+        elif args[i] == '--vfs-workers' and i + 1 < len(args):
+            options['vfs_workers'] = int(args[i + 1])
+            i += 1
+        elif args[i] == '--vfs-index':
+            options['vfs_index'] = True
+        elif args[i] == '--journal':
+            options['vfs_journal'] = True
+        elif args[i] == '--batch':
+            options['batch'] = True
+        elif args[i] == '-c' and i + 1 < len(args):
+            options['batch'] = True
+            options['batch_commands'] = args[i + 1]
+            i += 1
+        elif args[i] == '--echo':
+            options['echo'] = True
+        elif args[i] == '--profile':
+            options['profile'] = True
+        elif args[i] == '--cprofile' and i + 1 < len(args):
+            options['cprofile_path'] = args[i + 1]
+            i += 1
+        elif args[i] == '--tracemalloc' and i + 1 < len(args):
+            options['tracemalloc_path'] = args[i + 1]
+            i += 1
+        elif args[i] == '--serve' and i + 1 < len(args):
+            options['serve'] = args[i + 1]
             i += 1
         i += 1
 
-    return vfs_path, startup_script
+    return options
 
 
 def main():
     """Главная функция: парсит аргументы и запускает эмулятор"""
-    vfs_path, startup_script = parse_arguments()
+    options = parse_arguments()
+    startup_script = options['startup_script']
+
+    if options['serve']:
+        # Режим сервера: сеансы по сокету над одной общей VFS
+        from ShellServer import ShellServer
+        server = ShellServer(vfs_path=options['vfs_path'], lazy_vfs=options['lazy_vfs'],
+                             vfs_workers=options['vfs_workers'], vfs_index=options['vfs_index'],
+                             vfs_journal=options['vfs_journal'], autosave=options['autosave'])
+        sys.exit(server.run(options['serve']))
 
     # Комплексный тестовый скрипт для всех команд включая touch и rm
     comprehensive_test_commands = [
@@ -56,8 +111,33 @@ def main():
     else:
         startup_commands = []
 
+    # Пакетный режим: вывод через общий буфер вместо построчной записи в stdout
+    out = None
+    if options['batch']:
+        out = open(sys.stdout.fileno(), 'w', encoding='utf-8', buffering=BATCH_BUFFER_SIZE, closefd=False)
+
+    # Профилировщик загружается только по флагам профилирования
+    profiler = None
+    if options['profile'] or options['cprofile_path'] or options['tracemalloc_path']:
+        from ShellProfiler import CommandProfiler
+        profiler = CommandProfiler(options['cprofile_path'], options['tracemalloc_path'])
+
     # Создаем и запускаем эмулятор
-    shell = UnixShellEmulator(vfs_path=vfs_path, startup_script=startup_commands)
+    shell = UnixShellEmulator(vfs_path=options['vfs_path'], startup_script=startup_commands,
+                              lazy_vfs=options['lazy_vfs'], autosave=options['autosave'],
+                              vfs_workers=options['vfs_workers'], vfs_index=options['vfs_index'],
+                              vfs_journal=options['vfs_journal'], out=out, profiler=profiler)
+
+    if options['batch']:
+        # Команды из -c, скрипта или stdin; выполняются без интерактивного цикла
+        if options['batch_commands'] is not None:
+            commands = options['batch_commands'].split('\n')
+        elif startup_script:
+            commands = startup_commands
+        else:
+            commands = [line.strip() for line in sys.stdin if line.strip() and not line.startswith('#')]
+        sys.exit(shell.run_batch(commands, echo=options['echo']))
+
     shell.run()
 
 